@@ -0,0 +1,453 @@
+import pandas as pd
+import numpy as np
+import warnings
+from statements_table import METRIC_FIELDS
+
+# 연간 거래일 수
+TRADING_DAYS = 252
+
+# 백테스트에 사용하는 재무비율 필드 (calculate_financial_ratios의 키와 동일)
+RATIO_FIELDS = ['현재가', '시가총액', 'PER', 'PBR', 'PSR', 'ROE', 'ROA', '부채비율', '배당수익률']
+
+# 재무제표에서 계산하는 성장성/이익의 질 필드 (calculate_financial_ratios에 함께 포함됨)
+STATEMENT_FIELDS = list(METRIC_FIELDS)
+
+# 주가에 비례해서 움직이는 필드 (스냅샷 이후 주가 변동을 반영할 때 사용)
+PRICE_SCALED_FIELDS = ['현재가', '시가총액', 'PER', 'PBR', 'PSR']
+# 주가에 반비례하는 필드
+PRICE_INVERSE_FIELDS = ['배당수익률', 'FCF수익률']
+
+
+def _steps(value, thresholds, points, default=0.0):
+    """구간별 가산점 계산 (np.select 래퍼, 조건은 위에서부터 우선 적용)"""
+    conditions = [cond(value) for cond in thresholds]
+    return np.select(conditions, points, default=default)
+
+
+def _valid(value):
+    """결측이 아닌 값 마스크"""
+    return np.isfinite(value)
+
+
+def profitability_score(f):
+    """수익성 점수 (_calculate_profitability_score의 벡터 버전)"""
+    roe, roa = f['ROE'], f['ROA']
+    with np.errstate(invalid='ignore'):
+        score = 50 + np.where(_valid(roe), _steps(roe, [
+            lambda x: x > 0.20, lambda x: x > 0.15, lambda x: x > 0.10, lambda x: x < 0
+        ], [20, 15, 10, -20]), 0)
+        score = score + np.where(_valid(roa), _steps(roa, [
+            lambda x: x > 0.10, lambda x: x > 0.05, lambda x: x < 0
+        ], [15, 10, -15]), 0)
+    return np.clip(score, 0, 100)
+
+
+def stability_score(f):
+    """안정성 점수 (_calculate_stability_score의 벡터 버전)"""
+    debt, dividend = f['부채비율'], f['배당수익률']
+    with np.errstate(invalid='ignore'):
+        score = 50 + np.where(_valid(debt), _steps(debt, [
+            lambda x: x < 0.3, lambda x: x < 0.5, lambda x: x > 1.0
+        ], [20, 10, -20]), 0)
+        score = score + np.where(_valid(dividend), _steps(dividend, [
+            lambda x: x > 3.0, lambda x: x > 2.0
+        ], [15, 10]), 0)
+    return np.clip(score, 0, 100)
+
+
+def valuation_score(f):
+    """가치평가 점수 (_calculate_valuation_score의 벡터 버전)"""
+    per, pbr = f['PER'], f['PBR']
+    with np.errstate(invalid='ignore'):
+        score = 50 + np.where(_valid(per) & (per > 0), _steps(per, [
+            lambda x: x < 10, lambda x: x < 15, lambda x: x < 20, lambda x: x > 30
+        ], [20, 15, 10, -15]), 0)
+        score = score + np.where(_valid(pbr) & (pbr > 0), _steps(pbr, [
+            lambda x: x < 1, lambda x: x < 1.5, lambda x: x > 3
+        ], [15, 10, -10]), 0)
+    return np.clip(score, 0, 100)
+
+
+def comprehensive_score(f):
+    """종합 점수 (수익성/안정성/가치평가 평균)"""
+    return np.round((profitability_score(f) + stability_score(f) + valuation_score(f)) / 3, 1)
+
+
+def low_per_score(f):
+    """저PER 가치투자 전략 점수"""
+    per, roe = f['PER'], f['ROE']
+    with np.errstate(invalid='ignore'):
+        score = 50 + np.where(_valid(per) & (per > 0), _steps(per, [
+            lambda x: x < 8, lambda x: x < 12, lambda x: x < 15, lambda x: x < 20, lambda x: x > 30
+        ], [40, 30, 20, 10, -20]), 0)
+        score = score + np.where(_valid(roe) & (roe > 0), 10, 0)
+    return np.clip(score, 0, 100)
+
+
+def low_pbr_score(f):
+    """저PBR 자산가치 투자 전략 점수"""
+    pbr, debt = f['PBR'], f['부채비율']
+    with np.errstate(invalid='ignore'):
+        score = 50 + np.where(_valid(pbr) & (pbr > 0), _steps(pbr, [
+            lambda x: x < 0.8, lambda x: x < 1.0, lambda x: x < 1.5, lambda x: x < 2.0, lambda x: x > 4
+        ], [40, 30, 20, 10, -20]), 0)
+        score = score + np.where(_valid(debt) & (debt < 0.5), 10, 0)
+    return np.clip(score, 0, 100)
+
+
+def high_roe_score(f):
+    """고ROE 수익성 투자 전략 점수"""
+    roe, roa = f['ROE'], f['ROA']
+    with np.errstate(invalid='ignore'):
+        score = 50 + np.where(_valid(roe), _steps(roe, [
+            lambda x: x > 0.25, lambda x: x > 0.20, lambda x: x > 0.15, lambda x: x > 0.10, lambda x: x < 0
+        ], [40, 30, 20, 10, -30]), 0)
+        score = score + np.where(_valid(roa) & (roa > 0.05), 10, 0)
+    return np.clip(score, 0, 100)
+
+
+def high_dividend_score(f):
+    """고배당 투자 전략 점수"""
+    dividend, debt = f['배당수익률'], f['부채비율']
+    with np.errstate(invalid='ignore'):
+        score = 50 + np.where(_valid(dividend), _steps(dividend, [
+            lambda x: x > 5.0, lambda x: x > 4.0, lambda x: x > 3.0, lambda x: x > 2.0
+        ], [40, 30, 20, 10], default=-10), -20)
+        score = score + np.where(_valid(debt) & (debt < 0.6), 10, 0)
+    return np.clip(score, 0, 100)
+
+
+def growth_score(f):
+    """성장 투자 전략 점수"""
+    roe, psr, high_ratio = f['ROE'], f['PSR'], f['52주_고점대비']
+    revenue_growth = f.get('매출성장률', np.full(np.shape(roe), np.nan))
+    eps_growth = f.get('EPS성장률', np.full(np.shape(roe), np.nan))
+    accruals = f.get('발생액비율', np.full(np.shape(roe), np.nan))
+    with np.errstate(invalid='ignore'):
+        # 재무제표 성장률이 있으면 사용하고, 없으면 ROE로 대체 평가
+        has_growth = _valid(revenue_growth) | _valid(eps_growth)
+        statement_points = np.where(_valid(revenue_growth), _steps(revenue_growth, [
+            lambda x: x > 0.20, lambda x: x > 0.10, lambda x: x > 0.05, lambda x: x < 0
+        ], [20, 15, 5, -15]), 0) + np.where(_valid(eps_growth), _steps(eps_growth, [
+            lambda x: x > 0.20, lambda x: x > 0.10, lambda x: x < 0
+        ], [15, 10, -10]), 0)
+        roe_points = np.where(_valid(roe) & (roe > 0.15), 20, 0)
+        score = 50 + np.where(has_growth, statement_points, roe_points)
+        score = score - np.where(_valid(accruals) & (accruals > 0.10), 10, 0)
+        score = score + np.where(_valid(psr), _steps(psr, [
+            lambda x: (x > 3) & (x < 8), lambda x: x > 8
+        ], [15, -10]), 0)
+        score = score + np.where(_valid(high_ratio) & (high_ratio > 90), 15, 0)
+    return np.clip(score, 0, 100)
+
+
+STRATEGY_SCORERS = {
+    'low_per': low_per_score,
+    'low_pbr': low_pbr_score,
+    'high_roe': high_roe_score,
+    'high_dividend': high_dividend_score,
+    'growth': growth_score,
+    'comprehensive': comprehensive_score,
+}
+
+
+# 커스텀 전략의 재무제표 기반 최소 기준 키 → 필드
+STATEMENT_CRITERIA = {
+    'revenue_growth_min': '매출성장률',
+    'eps_growth_min': 'EPS성장률',
+    'fcf_yield_min': 'FCF수익률',
+    'operating_margin_min': '영업이익률',
+    'interest_coverage_min': '이자보상배율',
+}
+
+# 재무제표 기반 기준을 만족할 때의 가산점과 가중치 키 (기준 키 → (가산점, 가중치 키))
+STATEMENT_POINTS = {
+    'revenue_growth_min': (20, 'growth_focus'),
+    'eps_growth_min': (15, 'growth_focus'),
+    'fcf_yield_min': (15, 'value_focus'),
+    'operating_margin_min': (15, 'quality_focus'),
+    'interest_coverage_min': (10, 'quality_focus'),
+}
+
+
+def custom_strategy_score(f, strategy_config):
+    """커스텀 전략 점수 (_calculate_custom_strategy_score의 벡터 버전)"""
+    criteria = strategy_config.get('criteria', {}) or {}
+    weights = strategy_config.get('weights', {}) or {}
+    value_w = weights.get('value_focus', 25) / 100
+    quality_w = weights.get('quality_focus', 25) / 100
+    dividend_w = weights.get('dividend_focus', 25) / 100
+    growth_w = weights.get('growth_focus', 25) / 100
+
+    per, pbr, roe, roa = f['PER'], f['PBR'], f['ROE'], f['ROA']
+    dividend, debt, market_cap = f['배당수익률'], f['부채비율'], f['시가총액']
+    high_ratio = f['52주_고점대비']
+
+    score = np.full(np.shape(per), 50.0)
+    with np.errstate(invalid='ignore'):
+        per_ok = _valid(per) & (per > 0)
+        if criteria.get('per_max'):
+            score += np.where(per_ok & (per <= criteria['per_max']), 20 * value_w, 0)
+            score -= np.where(per_ok & (per > criteria['per_max'] * 1.5), 15, 0)
+        if criteria.get('per_min'):
+            score += np.where(per_ok & (per >= criteria['per_min']), 15 * value_w, 0)
+
+        pbr_ok = _valid(pbr) & (pbr > 0)
+        if criteria.get('pbr_max'):
+            score += np.where(pbr_ok & (pbr <= criteria['pbr_max']), 15 * value_w, 0)
+            score -= np.where(pbr_ok & (pbr > criteria['pbr_max'] * 1.5), 10, 0)
+
+        if criteria.get('roe_min'):
+            score += np.where(_valid(roe) & (roe >= criteria['roe_min']), 25 * quality_w, 0)
+            score -= np.where(_valid(roe) & (roe < criteria['roe_min'] * 0.7), 20, 0)
+
+        if criteria.get('roa_min'):
+            score += np.where(_valid(roa) & (roa >= criteria['roa_min']), 15 * quality_w, 0)
+
+        if criteria.get('dividend_min'):
+            dividend_min_percent = criteria['dividend_min'] * 100
+            score += np.where(_valid(dividend) & (dividend >= dividend_min_percent), 30 * dividend_w, 0)
+            score -= np.where(_valid(dividend) & (dividend < dividend_min_percent * 0.5), 15, 0)
+
+        if criteria.get('debt_ratio_max'):
+            debt_max_percent = criteria['debt_ratio_max'] * 100
+            score += np.where(_valid(debt) & (debt <= debt_max_percent), 15 * quality_w, 0)
+            score -= np.where(_valid(debt) & (debt > debt_max_percent * 1.5), 20, 0)
+
+        if criteria.get('market_cap_min'):
+            score += np.where(_valid(market_cap) & (market_cap / 1e9 >= criteria['market_cap_min']),
+                              10 * quality_w, 0)
+
+        if criteria.get('price_to_52week_high_min'):
+            score += np.where(_valid(high_ratio) & (high_ratio / 100 >= criteria['price_to_52week_high_min']),
+                              15 * growth_w, 0)
+
+        # 재무제표 기반 기준
+        for key, field in STATEMENT_CRITERIA.items():
+            points, weight_key = STATEMENT_POINTS[key]
+            if criteria.get(key) and field in f:
+                score += np.where(_valid(f[field]) & (f[field] >= criteria[key]),
+                                  points * weights.get(weight_key, 25) / 100, 0)
+
+    return np.clip(score, 0, 100)
+
+
+def custom_criteria_mask(f, strategy_config):
+    """커스텀 전략의 필수 조건을 모두 만족하는지 (_meets_required_criteria_with_reason의 벡터 버전)"""
+    criteria = strategy_config.get('criteria', {}) or {}
+    per, pbr = f['PER'], f['PBR']
+    mask = np.ones(np.shape(per), dtype=bool)
+
+    with np.errstate(invalid='ignore'):
+        checks = [
+            ('per_max', lambda v: _valid(per) & (per > 0) & (per <= v)),
+            ('per_min', lambda v: _valid(per) & (per > 0) & (per >= v)),
+            ('pbr_max', lambda v: _valid(pbr) & (pbr > 0) & (pbr <= v)),
+            ('pbr_min', lambda v: _valid(pbr) & (pbr > 0) & (pbr >= v)),
+            ('roe_min', lambda v: f['ROE'] >= v),
+            ('roa_min', lambda v: f['ROA'] >= v),
+            ('dividend_min', lambda v: f['배당수익률'] >= v * 100),
+            ('debt_ratio_max', lambda v: f['부채비율'] <= v * 100),
+            ('market_cap_min', lambda v: f['시가총액'] / 1e9 >= v),
+            ('price_to_52week_high_min', lambda v: f['52주_고점대비'] / 100 >= v),
+        ]
+        checks += [(key, lambda v, field=field: f.get(field, np.nan) >= v) for key, field in STATEMENT_CRITERIA.items()]
+        for key, check in checks:
+            if criteria.get(key) is not None:
+                mask &= check(criteria[key])
+
+    return mask
+
+
+def score_strategy(fields, strategy='comprehensive', require_criteria=True):
+    """전략 점수 행렬 계산
+
+    fields는 재무비율 이름 → 동일한 모양의 배열(보통 리밸런싱 날짜 x 종목) 딕셔너리이며,
+    strategy는 기본 전략 이름 또는 analyze_natural_language_strategy가 반환한 커스텀 설정입니다.
+    선택 대상이 될 수 없는 종목(커스텀 필수 조건 미충족)의 점수는 NaN입니다.
+    """
+    if isinstance(strategy, dict):
+        scores = custom_strategy_score(fields, strategy)
+        if require_criteria:
+            scores = np.where(custom_criteria_mask(fields, strategy), scores, np.nan)
+        return scores
+
+    scorer = STRATEGY_SCORERS.get(strategy, comprehensive_score)
+    return scorer(fields)
+
+
+def rebalance_indices(dates, rebalance='M'):
+    """리밸런싱 날짜 인덱스 ('D', 'W', 'M', 'Q' 또는 거래일 간격 정수)"""
+    if isinstance(rebalance, int):
+        return np.arange(0, len(dates), max(rebalance, 1))
+    if rebalance == 'D':
+        return np.arange(len(dates))
+
+    periods = pd.DatetimeIndex(dates).to_period(rebalance).asi8
+    change = np.empty(len(periods), dtype=bool)
+    change[:1] = True
+    change[1:] = periods[1:] != periods[:-1]
+    return np.flatnonzero(change)
+
+
+def build_field_panel(fundamentals, dates, tickers, closes, reprice=True):
+    """리밸런싱 시점의 재무비율 패널 구성
+
+    fundamentals가 필드 → DataFrame(날짜 x 종목)이면 각 날짜 기준으로 가장 최근 값(as-of)을
+    사용하고, 필드 → Series(종목)인 단일 스냅샷이면 모든 날짜에 같은 값을 쓰되 reprice=True일 때
+    주가 배수 지표를 스냅샷 이후 주가 변동에 맞춰 보정합니다.
+    """
+    n_dates, n_tickers = closes.shape
+    panel = {}
+
+    for field in RATIO_FIELDS + STATEMENT_FIELDS:
+        values = fundamentals.get(field) if fundamentals else None
+        if values is None:
+            panel[field] = np.full((n_dates, n_tickers), np.nan)
+        elif isinstance(values, pd.DataFrame):
+            frame = values.reindex(columns=tickers).sort_index()
+            frame.index = pd.DatetimeIndex(frame.index)
+            frame = frame.reindex(frame.index.union(dates)).ffill().reindex(dates)
+            panel[field] = frame.to_numpy(dtype='float64')
+        else:
+            row = pd.Series(values).reindex(tickers).to_numpy(dtype='float64')
+            panel[field] = np.broadcast_to(row, (n_dates, n_tickers)).copy()
+
+            if reprice and field in PRICE_SCALED_FIELDS + PRICE_INVERSE_FIELDS:
+                # 스냅샷은 마지막 날짜 기준이라고 보고 주가 비율만큼 보정
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    price_ratio = closes / closes[-1]
+                if field in PRICE_INVERSE_FIELDS:
+                    price_ratio = 1.0 / price_ratio
+                panel[field] = panel[field] * price_ratio
+
+    # 52주 고점 대비 현재가는 주가 행렬에서 시점별로 직접 계산
+    rolling_high = pd.DataFrame(closes).rolling(TRADING_DAYS, min_periods=1).max().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        panel['52주_고점대비'] = closes / rolling_high * 100
+
+    return panel
+
+
+def run_backtest(dates, tickers, closes, fundamentals=None, strategy='comprehensive',
+                 top_k=10, rebalance='M', cost_bps=10.0, reprice=True):
+    """상위 top_k 동일가중 포트폴리오를 주기적으로 리밸런싱하는 백테스트
+
+    점수 계산, 종목 선택, 포트폴리오 평가가 모두 (날짜 x 종목) 배열 연산으로 처리되므로
+    수년치 일별 데이터와 수백 개 종목도 수 초 안에 계산됩니다.
+    """
+    dates = pd.DatetimeIndex(dates)
+    closes = pd.DataFrame(closes).ffill().to_numpy(dtype='float64')
+    n_tickers = closes.shape[1]
+    if closes.shape[0] < 2 or n_tickers == 0:
+        return None
+
+    # 상장 전 등으로 보유 가능한 종목이 top_k보다 적은 앞부분 날짜는 제외
+    available = np.isfinite(closes).sum(axis=1)
+    first = int(np.argmax(available >= min(top_k, n_tickers)))
+    dates, closes = dates[first:], closes[first:]
+    n_dates = closes.shape[0]
+    if n_dates < 2:
+        return None
+
+    # 1) 리밸런싱 시점별 점수 및 상위 종목 선택
+    reb = rebalance_indices(dates, rebalance)
+    panel = build_field_panel(fundamentals, dates, tickers, closes, reprice=reprice)
+    fields = {name: values[reb] for name, values in panel.items()}
+    scores = np.asarray(score_strategy(fields, strategy), dtype='float64')
+
+    tradable = np.isfinite(closes[reb]) & (closes[reb] > 0)
+    scores = np.where(tradable & np.isfinite(scores), scores, -np.inf)
+
+    k = min(top_k, n_tickers)
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    picked = np.zeros_like(scores, dtype=bool)
+    np.put_along_axis(picked, order, True, axis=1)
+    picked &= np.isfinite(scores)
+
+    counts = picked.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(picked, 1.0 / counts, 0.0)
+
+    # 2) 각 날짜가 속한 보유 구간 (리밸런싱 다음 날부터 다음 리밸런싱 날까지)
+    start = reb[0]
+    days = np.arange(start, n_dates)
+    period = np.searchsorted(reb, days, side='left') - 1
+    period[0] = 0
+    period_start = reb[period]
+
+    # 3) 구간 시작 대비 가치 비율 (가중치 x 가격 상대비)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = closes[days] / closes[period_start]
+    growth = np.where(np.isfinite(growth), growth, 1.0)
+    relative = (weights[period] * growth).sum(axis=1)
+    relative[counts[period, 0] == 0] = 1.0  # 보유 종목이 없으면 현금
+
+    # 4) 리밸런싱 시점의 매매 회전율과 거래비용
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drift_growth = np.ones_like(weights)
+        drift_growth[1:] = closes[reb[1:]] / closes[reb[:-1]]
+    drift_growth = np.where(np.isfinite(drift_growth), drift_growth, 1.0)
+    drifted = np.zeros_like(weights)
+    drifted[1:] = weights[:-1] * drift_growth[1:]
+    drifted_sum = drifted.sum(axis=1, keepdims=True)
+    drifted = np.divide(drifted, drifted_sum, out=np.zeros_like(drifted), where=drifted_sum > 0)
+
+    traded = np.abs(weights - drifted).sum(axis=1)
+    turnover = traded / 2  # 편도 회전율
+    cost_factor = 1.0 - traded * cost_bps / 10000
+
+    # 5) 구간 수익률을 이어붙여 누적 자산 곡선 계산
+    period_end = np.append(reb[1:], n_dates - 1) - start
+    period_growth = relative[period_end]
+    period_growth[-1] = 1.0  # 마지막 구간은 아래 relative에 이미 포함
+    start_value = np.cumprod(np.concatenate([[1.0], period_growth[:-1]])) * np.cumprod(cost_factor)
+
+    equity = pd.Series(start_value[period] * relative, index=dates[start:], name='equity')
+
+    # 비교용 동일가중 유니버스 (매일 리밸런싱)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        universe_returns = closes[start + 1:] / closes[start:-1] - 1.0
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        universe_mean = np.nan_to_num(np.nanmean(np.where(np.isfinite(universe_returns),
+                                                           universe_returns, np.nan), axis=1))
+    benchmark = pd.Series(np.concatenate([[1.0], np.cumprod(1 + universe_mean)]),
+                          index=dates[start:], name='benchmark')
+
+    drawdown = equity / equity.cummax() - 1.0
+    holdings = pd.Series(
+        [[tickers[i] for i in np.flatnonzero(row)] for row in picked],
+        index=dates[reb], name='holdings'
+    )
+
+    return {
+        'equity': equity,
+        'benchmark_equity': benchmark,
+        'drawdown': drawdown,
+        'turnover': pd.Series(turnover, index=dates[reb], name='turnover'),
+        'holdings': holdings,
+        'metrics': performance_metrics(equity, drawdown, turnover),
+    }
+
+
+def performance_metrics(equity, drawdown, turnover):
+    """수익률, 변동성, 최대낙폭, 회전율 요약"""
+    daily = equity.pct_change().dropna()
+    n_days = max(len(equity) - 1, 1)
+    total_return = equity.iloc[-1] / equity.iloc[0] - 1.0
+
+    volatility = daily.std() * np.sqrt(TRADING_DAYS) if len(daily) > 1 else np.nan
+    sharpe = (daily.mean() / daily.std() * np.sqrt(TRADING_DAYS)
+              if len(daily) > 1 and daily.std() > 0 else np.nan)
+
+    return {
+        '총수익률': round(float(total_return) * 100, 2),
+        '연환산수익률': round(float((1 + total_return) ** (TRADING_DAYS / n_days) - 1) * 100, 2),
+        '연간변동성': round(float(volatility) * 100, 2),
+        '샤프지수': round(float(sharpe), 2),
+        '최대낙폭': round(float(drawdown.min()) * 100, 2),
+        # 최초 매수는 제외한 리밸런싱당 평균 편도 회전율
+        '평균회전율': round(float(np.mean(turnover[1:])) * 100, 2) if len(turnover) > 1 else 0.0,
+        '리밸런싱횟수': int(len(turnover)),
+    }
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# 봉 크기 → pandas 리샘플 규칙 (None이면 일봉 그대로)
+try:
+    pd.tseries.frequencies.to_offset('ME')
+    _MONTH_END = 'ME'
+except ValueError:  # pandas 2.2 미만
+    _MONTH_END = 'M'
+BAR_RULES = {'D': None, 'W': 'W-FRI', 'M': _MONTH_END}
+BAR_LABELS = {'D': '일봉', 'W': '주봉', 'M': '월봉'}
+
+# 봉 크기별 대략적인 거래일 수
+BAR_DAYS = {'D': 1, 'W': 5, 'M': 21}
+
+# 조회 기간 → (달력 일수, 대략적인 거래일 수), 'max'는 제한 없음
+PERIOD_SPANS = {
+    '1mo': (31, 21), '3mo': (92, 63), '6mo': (183, 126), '1y': (366, 252),
+    '2y': (731, 504), '5y': (1827, 1260), '10y': (3653, 2520), 'max': (None, 7560),
+}
+
+# 차트 기본 너비와 캔들 하나에 필요한 최소 픽셀 (이보다 좁으면 더 큰 봉 사용)
+DEFAULT_CHART_WIDTH = 800
+MIN_BAR_PIXELS = 4
+
+# 캔들 가격 반올림 자릿수 (브라우저로 보내는 데이터 크기 축소)
+PRICE_DECIMALS = 2
+
+
+def choose_bar_size(period, width=None):
+    """기간과 차트 너비(px)에 맞는 봉 크기 ('D' / 'W' / 'M')
+
+    캔들 하나가 MIN_BAR_PIXELS보다 좁아지지 않는 가장 작은 봉을 고릅니다.
+    """
+    max_bars = max(1, (width or DEFAULT_CHART_WIDTH) // MIN_BAR_PIXELS)
+    trading_days = PERIOD_SPANS.get(period, PERIOD_SPANS['1y'])[1]
+    for bar_size in ('D', 'W'):
+        if trading_days / BAR_DAYS[bar_size] <= max_bars:
+            return bar_size
+    return 'M'
+
+
+def resample_ohlc(frame, bar_size):
+    """일봉 OHLCV를 주봉 / 월봉으로 변환 (각 봉의 날짜는 구간의 마지막 거래일)"""
+    rule = BAR_RULES[bar_size]
+    columns = [col for col in ('Open', 'High', 'Low', 'Close', 'Volume') if col in frame]
+    if rule is None or frame.empty:
+        return frame[columns]
+
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    grouped = frame[columns].resample(rule)
+    bars = grouped.agg({col: agg[col] for col in columns})
+    # 주말 / 월말 휴일 날짜 대신 실제 마지막 거래일을 봉 날짜로 사용 (차트의 주말 제거와 충돌 방지)
+    last_dates = frame.index.to_series().resample(rule).last()
+    bars.index = pd.DatetimeIndex(last_dates.values, name=frame.index.name)
+    return bars.dropna(subset=['Close'])
+
+
+def _compact(frame):
+    """가격 반올림 / 거래량 정수 변환 (차트 전송용)"""
+    frame = frame.copy()
+    for col in ('Open', 'High', 'Low', 'Close'):
+        if col in frame:
+            # float32로 저장된 가격도 반올림 결과가 정확히 표현되도록 float64로 변환 후 반올림
+            frame[col] = frame[col].astype('float64').round(PRICE_DECIMALS)
+    if 'Volume' in frame:
+        frame['Volume'] = frame['Volume'].fillna(0).astype(np.int64)
+    return frame
+
+
+class ResamplePyramid:
+    """티커별 일/주/월봉 피라미드 캐시
+
+    가장 긴 기간의 일봉을 기준으로 세 단계를 한 번에 만들어 두고, 짧은 기간 요청은 잘라서 돌려줍니다.
+    요청 기간이 기준 데이터보다 길거나 ttl초가 지나면 다시 만들며, 최근 사용한 max_tickers개만 보관합니다.
+    """
+
+    def __init__(self, ttl=3600, max_tickers=64):
+        self.ttl = ttl
+        self.max_tickers = max_tickers
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _span_days(period):
+        return PERIOD_SPANS.get(period, PERIOD_SPANS['1y'])[0]
+
+    def _covers(self, entry, period):
+        span = self._span_days(period)
+        if entry['span'] is None:
+            return True
+        return span is not None and span <= entry['span']
+
+    def get(self, ticker, period):
+        """캐시된 피라미드 (없거나 기간이 모자라거나 만료됐으면 None)"""
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None or time.time() - entry['built'] > self.ttl or not self._covers(entry, period):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(ticker)
+            self.hits += 1
+            return entry
+
+    def put(self, ticker, period, frame):
+        """일봉 OHLCV로 피라미드 생성 후 저장"""
+        frame = frame.copy()
+        index = pd.to_datetime(frame.index)
+        frame.index = index.tz_localize(None) if index.tz is not None else index
+        frame = frame.sort_index()
+        entry = {
+            'span': self._span_days(period),
+            'built': time.time(),
+            'levels': {bar_size: _compact(resample_ohlc(frame, bar_size)) for bar_size in BAR_RULES},
+        }
+        with self._lock:
+            self._entries[ticker] = entry
+            self._entries.move_to_end(ticker)
+            while len(self._entries) > self.max_tickers:
+                self._entries.popitem(last=False)
+        return entry
+
+    @classmethod
+    def slice(cls, entry, period, bar_size):
+        """피라미드에서 기간만큼 잘라낸 봉 데이터"""
+        bars = entry['levels'][bar_size]
+        span = cls._span_days(period)
+        if span is None or bars.empty:
+            return bars
+        start = bars.index[-1] - pd.Timedelta(days=span)
+        return bars[bars.index > start]
+
+    def stats(self):
+        with self._lock:
+            return {'tickers': len(self._entries), 'hits': self.hits, 'misses': self.misses}
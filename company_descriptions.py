@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 프로세스 내 잠금만 사용
+    fcntl = None
+
+# yfinance 섹터 → 한글 이름
+SECTOR_NAMES_KO = {
+    'Technology': '정보기술',
+    'Healthcare': '헬스케어',
+    'Financial Services': '금융',
+    'Consumer Cyclical': '경기소비재',
+    'Consumer Defensive': '필수소비재',
+    'Communication Services': '커뮤니케이션 서비스',
+    'Industrials': '산업재',
+    'Energy': '에너지',
+    'Utilities': '유틸리티',
+    'Real Estate': '부동산',
+    'Basic Materials': '소재',
+}
+
+# 본사 국가 → 한글 이름 (없으면 그대로 표시)
+COUNTRY_NAMES_KO = {
+    'United States': '미국', 'United Kingdom': '영국', 'Ireland': '아일랜드', 'Switzerland': '스위스',
+    'Canada': '캐나다', 'Netherlands': '네덜란드', 'Bermuda': '버뮤다', 'Israel': '이스라엘', 'China': '중국',
+}
+
+# 프롬프트에 넣는 사업 설명 최대 길이 (토큰 절약)
+SUMMARY_CHARS = 600
+
+
+def template_description(ticker, info):
+    """캐시된 info 필드만으로 만드는 짧은 한글 회사 설명 (LLM 설명이 준비되기 전 사용)"""
+    info = info or {}
+    name = info.get('longName') or info.get('shortName') or ticker
+    sector = SECTOR_NAMES_KO.get(info.get('sector'), info.get('sector'))
+    industry = info.get('industry')
+
+    country = COUNTRY_NAMES_KO.get(info.get('country'), info.get('country'))
+    location = " ".join(part for part in (country, info.get('city')) if part)
+    if sector and industry:
+        business = f"{sector} 섹터의 {industry} 기업"
+    elif sector or industry:
+        business = f"{sector or industry} 기업"
+    else:
+        business = "기업"
+    first = f"{name}({ticker})은 {location + '에 본사를 둔 ' if location else ''}{business}입니다."
+
+    details = []
+    market_cap = info.get('marketCap')
+    if isinstance(market_cap, (int, float)) and market_cap > 0:
+        details.append(f"시가총액 약 ${market_cap / 1e9:,.0f}B")
+    employees = info.get('fullTimeEmployees')
+    if isinstance(employees, (int, float)) and employees > 0:
+        details.append(f"임직원 약 {employees:,.0f}명")
+    if details:
+        first += f" {', '.join(details)} 규모입니다."
+    return first
+
+
+def _summary_line(ticker, info):
+    """묶음 프롬프트에 넣을 종목 한 줄 (이름, 섹터, 업종, 사업 설명 앞부분)"""
+    info = info or {}
+    summary = re.sub(r'\s+', ' ', info.get('longBusinessSummary') or '').strip()
+    if len(summary) > SUMMARY_CHARS:
+        summary = summary[:SUMMARY_CHARS].rsplit(' ', 1)[0] + '...'
+    name = info.get('longName') or info.get('shortName') or ticker
+    return f"- {ticker} ({name}) | {info.get('sector') or 'N/A'} / {info.get('industry') or 'N/A'} | {summary or 'N/A'}"
+
+
+def build_description_prompt(infos):
+    """여러 종목의 회사 설명을 한 번에 요청하는 프롬프트 (infos: 티커 → info)"""
+    lines = "\n".join(_summary_line(ticker, info) for ticker, info in infos.items())
+    return f"""
+아래 종목들의 회사 설명을 종목별로 한국어 2-3문장으로 작성해주세요.
+
+각 줄은 "티커 (회사명) | 섹터 / 업종 | 영문 사업 설명" 형식입니다:
+{lines}
+
+작성 규칙:
+1. 주어진 사업 설명에 있는 내용만 사용하세요 (추측 금지)
+2. 주요 사업 분야, 대표 제품이나 서비스, 업계에서의 특징을 포함하세요
+3. 투자자가 이해하기 쉽게 간결하게 작성하세요
+
+다음 JSON 형태로만 응답하세요 (코드블록, 설명 없이 순수 JSON만):
+{{"descriptions": {{"티커": "회사 설명", ...}}}}
+"""
+
+
+def parse_descriptions(response_text, tickers):
+    """묶음 응답에서 요청한 종목의 설명만 추출"""
+    text = response_text.strip()
+    if '```json' in text:
+        text = text.split('```json')[1].split('```')[0]
+    elif '```' in text:
+        text = text.split('```')[1].split('```')[0]
+
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        return {}
+    if isinstance(parsed, dict) and isinstance(parsed.get('descriptions'), dict):
+        parsed = parsed['descriptions']
+    if not isinstance(parsed, dict):
+        return {}
+
+    descriptions = {}
+    for ticker in tickers:
+        value = parsed.get(ticker)
+        if isinstance(value, str) and value.strip():
+            descriptions[ticker] = re.sub(r'\s+', ' ', value).strip()
+    return descriptions
+
+
+class DescriptionStore:
+    """회사 설명 저장소 (티커 → 설명, 출처, 데이터 버전을 JSON 파일 하나에 보관)
+
+    데이터 버전은 종목 데이터가 갱신된 시각이며, 버전이 바뀐 종목만 다시 생성합니다.
+    출처는 'llm'(묶음 생성) 또는 'template'(캐시 필드로 만든 임시 설명)입니다.
+    여러 워커 프로세스가 같은 파일에 쓰므로, 저장할 때는 잠금을 잡고 파일을 다시 읽어 합친 뒤 기록하고
+    조회할 때는 파일 수정 시각이 바뀌었으면 다시 읽습니다.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._mark = None
+        self._reload()
+
+    def __len__(self):
+        self._reload()
+        return len(self._entries)
+
+    def _file_mark(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self, force=False):
+        """파일이 바뀌었으면 (다른 프로세스가 저장한 경우 등) 다시 읽기"""
+        mark = self._file_mark()
+        with self._lock:
+            if mark is None or (not force and mark == self._mark):
+                return
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+                self._mark = mark
+            except Exception as e:
+                print(f"회사 설명 저장소 로드 실패: {e}")
+
+    @contextmanager
+    def _write_lock(self):
+        """스레드 간 + 프로세스 간 배타 잠금 (다시 읽기부터 기록까지 한 번에 한 쓰기만)"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path.with_name(f".{self.path.name}.lock"), 'a+b') as handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def get(self, ticker, version=None):
+        """저장된 항목 (version이 주어지면 버전이 같을 때만)"""
+        self._reload()
+        entry = self._entries.get(ticker)
+        if entry is None or (version is not None and entry.get('version') != version):
+            return None
+        return entry
+
+    def put_many(self, entries):
+        """여러 항목을 한 번에 저장 (entries: 티커 → {'text', 'source', 'version'})
+
+        다른 프로세스가 그사이 저장한 항목을 덮어쓰지 않도록 잠금 안에서 파일을 다시 읽어 합칩니다.
+        """
+        if not entries:
+            return
+        with self._write_lock():
+            self._reload(force=True)
+            self._entries.update(entries)
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._mark = self._file_mark()
+            except Exception as e:
+                print(f"회사 설명 저장 실패: {e}")
+
+    def stats(self):
+        """출처별 항목 수"""
+        self._reload()
+        counts = {}
+        for entry in self._entries.values():
+            counts[entry.get('source')] = counts.get(entry.get('source'), 0) + 1
+        return {'entries': len(self._entries), 'by_source': counts}
@@ -0,0 +1,345 @@
+import pandas as pd
+import numpy as np
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+# 스냅샷에 저장하는 재무비율 필드 → yfinance info 키 (앞에서부터 먼저 있는 값 사용)
+FIELD_SOURCES = {
+    '현재가': ('currentPrice',),
+    '시가총액': ('marketCap',),
+    'PER': ('forwardPE', 'trailingPE'),
+    'PBR': ('priceToBook',),
+    'PSR': ('priceToSalesTrailing12Months',),
+    'ROE': ('returnOnEquity',),
+    'ROA': ('returnOnAssets',),
+    '부채비율': ('debtToEquity',),
+    '배당수익률': ('dividendYield',),
+    '52주_최고가': ('fiftyTwoWeekHigh',),
+    '52주_최저가': ('fiftyTwoWeekLow',),
+    'EPS': ('trailingEps',),
+}
+
+FIELDS = list(FIELD_SOURCES.keys())
+
+# 여러 프로세스의 추가를 직렬화하는 잠금 파일
+LOCK_FILE = ".append.lock"
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 프로세스 내 잠금만 사용
+    fcntl = None
+
+
+def project_fundamentals(info):
+    """yfinance info 딕셔너리를 스냅샷 필드 값(float, 없으면 NaN)으로 변환"""
+    row = {}
+    for field, keys in FIELD_SOURCES.items():
+        value = np.nan
+        for key in keys:
+            candidate = info.get(key) if info else None
+            if candidate is not None and candidate != 'N/A':
+                value = candidate
+                break
+        try:
+            row[field] = float(value)
+        except (TypeError, ValueError):
+            row[field] = np.nan
+    return row
+
+
+def _to_date(value):
+    """date / datetime / 문자열을 date로 변환"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+class FundamentalsStore:
+    """일별 재무비율 스냅샷을 시간 파티션 단위로 저장하는 추가 전용(append-only) 저장소
+
+    디렉토리 구조는 {root}/{YYYY-MM}/{YYYY-MM-DD}_{순번}.pkl 이며, 각 월 파티션의 첫 세그먼트는
+    전체 스냅샷(keyframe), 이후 세그먼트는 직전 상태 대비 바뀐 셀만 담은 델타입니다.
+    대부분의 값이 매일 바뀌지 않으므로 델타는 매우 작고, 특정 날짜 조회 시에는 해당 월의
+    keyframe부터 델타를 순서대로 적용하면 되므로 한 달치 파일만 읽습니다.
+    """
+
+    def __init__(self, root, state_cache_size=8):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.state_cache_size = state_cache_size
+        self._segments = None
+        self._scan_mark = None
+        self._states = OrderedDict()
+        self._lock = threading.RLock()
+
+    # ---------- 세그먼트 목록 ----------
+
+    def _partition_mark(self):
+        """월 파티션 디렉토리 목록과 수정 시각 (다른 프로세스가 세그먼트를 추가하면 바뀜)"""
+        try:
+            with os.scandir(self.root) as scan:
+                return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in scan if entry.is_dir()))
+        except FileNotFoundError:
+            return ()
+
+    def _scan(self, refresh=False):
+        """디스크의 세그먼트 목록을 (날짜, 순번, 경로) 순으로 정렬해서 반환
+
+        파티션 디렉토리가 바뀌었으면(다른 인스턴스나 프로세스가 추가) 다시 읽습니다.
+        이미 있는 세그먼트는 바뀌지 않으므로 위치별 상태 캐시는 그대로 유효합니다.
+        """
+        mark = self._partition_mark()
+        if refresh or mark != self._scan_mark:
+            self._segments = None
+            self._scan_mark = mark
+        if self._segments is None:
+            segments = []
+            for path in self.root.glob("*/*.pkl"):
+                try:
+                    day, seq = path.stem.split('_')
+                    segments.append((_to_date(day), int(seq), path))
+                except ValueError:
+                    continue
+            segments.sort()
+            self._segments = segments
+        return self._segments
+
+    def dates(self):
+        """스냅샷이 있는 날짜 목록"""
+        return sorted({day for day, _, _ in self._scan()})
+
+    def last_date(self):
+        """마지막 스냅샷 날짜 (없으면 None)"""
+        segments = self._scan()
+        return segments[-1][0] if segments else None
+
+    # ---------- 상태 복원 ----------
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def _apply(state, segment):
+        """세그먼트를 상태(티커 → 필드 배열 딕셔너리)에 적용"""
+        fields = segment['fields']
+        if segment['kind'] == 'full':
+            state = {ticker: dict(zip(fields, row)) for ticker, row in zip(segment['tickers'], segment['values'])}
+        else:
+            state = {ticker: dict(row) for ticker, row in state.items()}
+            tickers = segment['tickers']
+            for t_idx, f_idx, value in zip(segment['ticker_idx'], segment['field_idx'], segment['values']):
+                state.setdefault(tickers[t_idx], {field: np.nan for field in fields})[fields[f_idx]] = value
+        return state
+
+    def _state_at(self, position):
+        """position번째 세그먼트까지 적용된 상태 복원 (같은 월의 keyframe부터)"""
+        if position in self._states:
+            self._states.move_to_end(position)
+            return self._states[position]
+
+        segments = self._scan()
+        month = segments[position][0].strftime('%Y-%m')
+        start = position
+        while start > 0 and segments[start - 1][0].strftime('%Y-%m') == month:
+            start -= 1
+
+        # 가까운 이전 상태가 캐시에 있으면 거기서부터 적용
+        state = None
+        for cached in range(position - 1, start - 1, -1):
+            if cached in self._states:
+                state, start = self._states[cached], cached + 1
+                break
+
+        for i in range(start, position + 1):
+            state = self._apply(state or {}, self._read(segments[i][2]))
+
+        self._states[position] = state
+        while len(self._states) > self.state_cache_size:
+            self._states.popitem(last=False)
+        return state
+
+    @staticmethod
+    def _to_frame(state, fields=None):
+        frame = pd.DataFrame.from_dict(state, orient='index', columns=FIELDS) if state else pd.DataFrame(columns=FIELDS)
+        frame.index.name = 'ticker'
+        frame = frame.sort_index().astype('float64')
+        return frame[fields] if fields else frame
+
+    def asof(self, day, fields=None):
+        """day 시점(해당 날짜 포함 이전 최신) 유니버스 재무비율 (티커 x 필드 DataFrame)"""
+        day = _to_date(day)
+        segments = self._scan()
+        position = np.searchsorted([s[0] for s in segments], day, side='right') - 1
+        if position < 0:
+            return self._to_frame({}, fields)
+        # 같은 날짜에 세그먼트가 여러 개면 마지막 것까지 적용
+        return self._to_frame(self._state_at(int(position)), fields)
+
+    def panel(self, start=None, end=None, fields=None):
+        """기간 내 스냅샷 패널 (필드 → 날짜 x 티커 DataFrame, 백테스트 입력용)"""
+        segments = self._scan()
+        if not segments:
+            return {}
+        fields = fields or FIELDS
+        days = [s[0] for s in segments]
+        lo = 0 if start is None else max(np.searchsorted(days, _to_date(start), side='left') - 1, 0)
+        hi = len(segments) - 1 if end is None else np.searchsorted(days, _to_date(end), side='right') - 1
+        if hi < lo:
+            return {}
+
+        # 시작 상태를 한 번 복원한 뒤 델타만 배열 인덱싱으로 순서대로 누적
+        start_state = self._state_at(lo)
+        loaded = [self._read(segments[i][2]) for i in range(lo + 1, hi + 1)]
+        tickers = sorted(set(start_state).union(*[segment['tickers'] for segment in loaded]))
+        ticker_pos = {ticker: i for i, ticker in enumerate(tickers)}
+        field_pos = {field: i for i, field in enumerate(FIELDS)}
+
+        current = np.full((len(tickers), len(FIELDS)), np.nan)
+        for ticker, row in start_state.items():
+            current[ticker_pos[ticker]] = [row.get(field, np.nan) for field in FIELDS]
+
+        snapshot_days = [segments[lo][0]]
+        snapshots = [current.copy()]
+        for i, segment in zip(range(lo + 1, hi + 1), loaded):
+            rows = np.array([ticker_pos[t] for t in segment['tickers']], dtype='int64')
+            cols = np.array([field_pos.get(f, -1) for f in segment['fields']], dtype='int64')
+            if segment['kind'] == 'full':
+                current[:] = np.nan
+                values = np.asarray(segment['values'], dtype='float64').reshape(len(rows), -1)
+                keep = cols >= 0
+                current[np.ix_(rows, cols[keep])] = values[:, keep]
+            else:
+                t_idx = rows[segment['ticker_idx']]
+                f_idx = cols[segment['field_idx']]
+                keep = f_idx >= 0
+                current[t_idx[keep], f_idx[keep]] = segment['values'][keep]
+
+            # 같은 날짜의 세그먼트는 마지막 상태만 남김
+            if segments[i][0] == snapshot_days[-1]:
+                snapshots[-1] = current.copy()
+            else:
+                snapshot_days.append(segments[i][0])
+                snapshots.append(current.copy())
+
+        cube = np.stack(snapshots)
+        index = pd.DatetimeIndex(snapshot_days)
+        return {field: pd.DataFrame(cube[:, :, field_pos[field]], index=index, columns=tickers)
+                for field in fields}
+
+    # ---------- 추가 ----------
+
+    @contextmanager
+    def _append_lock(self):
+        """스레드 간 + 프로세스 간 배타 잠금 (순번 결정부터 기록까지 한 번에 한 쓰기만)"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.root / LOCK_FILE, 'a+b') as handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def append(self, rows, day=None):
+        """스냅샷 추가 (rows: 티커 → 필드 값 딕셔너리, 기존 상태에 덮어써서 저장)
+
+        저장소는 추가 전용이므로 마지막 스냅샷보다 이전 날짜는 기록할 수 없습니다.
+        바뀐 값이 없으면 아무것도 쓰지 않고 0을 반환하며, 그 외에는 기록된 셀 수를 반환합니다.
+        여러 인스턴스/프로세스가 동시에 추가해도 잠금 안에서 세그먼트 목록을 다시 읽고 순번을 정합니다.
+        """
+        with self._append_lock():
+            return self._append(rows, _to_date(day or date.today()))
+
+    def _append(self, rows, day):
+        segments = self._scan(refresh=True)
+        last = segments[-1][0] if segments else None
+        if last is not None and day < last:
+            raise ValueError(f"추가 전용 저장소입니다: {day} < 마지막 스냅샷 {last}")
+
+        previous = self._state_at(len(segments) - 1) if segments else {}
+        new_month = last is None or last.strftime('%Y-%m') != day.strftime('%Y-%m')
+
+        # 새 상태 = 이전 상태 + 이번 행 (없는 필드는 NaN)
+        state = {ticker: dict(row) for ticker, row in previous.items()}
+        changes = []
+        for ticker, values in rows.items():
+            old = previous.get(ticker, {})
+            new = {field: float(values.get(field, np.nan)) for field in FIELDS}
+            state[ticker] = new
+            for f_idx, field in enumerate(FIELDS):
+                old_value = old.get(field, np.nan)
+                if not (old_value == new[field] or (np.isnan(old_value) and np.isnan(new[field]))):
+                    changes.append((ticker, f_idx, new[field]))
+
+        if not new_month and not changes:
+            return 0
+
+        if new_month:
+            tickers = sorted(state)
+            segment = {
+                'date': day.isoformat(),
+                'kind': 'full',
+                'fields': FIELDS,
+                'tickers': tickers,
+                'values': np.array([[state[t][f] for f in FIELDS] for t in tickers], dtype='float64').reshape(-1, len(FIELDS)),
+            }
+            written = len(tickers) * len(FIELDS)
+        else:
+            tickers = sorted({ticker for ticker, _, _ in changes})
+            ticker_pos = {ticker: i for i, ticker in enumerate(tickers)}
+            segment = {
+                'date': day.isoformat(),
+                'kind': 'delta',
+                'fields': FIELDS,
+                'tickers': tickers,
+                'ticker_idx': np.array([ticker_pos[t] for t, _, _ in changes], dtype='int32'),
+                'field_idx': np.array([f for _, f, _ in changes], dtype='int8'),
+                'values': np.array([v for _, _, v in changes], dtype='float64'),
+            }
+            written = len(changes)
+
+        seq = sum(1 for s in segments if s[0] == day)
+        partition = self.root / day.strftime('%Y-%m')
+        partition.mkdir(exist_ok=True)
+        path = partition / f"{day.isoformat()}_{seq:04d}.pkl"
+
+        # 임시 파일에 쓴 뒤 이름을 바꿔서 중간에 끊겨도 깨진 세그먼트가 남지 않도록 함
+        tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(segment, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        segments.append((day, seq, path))
+        self._scan_mark = self._partition_mark()
+        self._states[len(segments) - 1] = state
+        while len(self._states) > self.state_cache_size:
+            self._states.popitem(last=False)
+        return written
+
+    def append_infos(self, infos, day=None):
+        """티커 → yfinance info 딕셔너리를 스냅샷으로 추가"""
+        return self.append({ticker: project_fundamentals(info) for ticker, info in infos.items()}, day)
+
+    def stats(self):
+        """저장소 통계 (세그먼트 수, keyframe 수, 디스크 사용량)"""
+        segments = self._scan()
+        total_bytes = sum(path.stat().st_size for _, _, path in segments)
+        keyframes = len({day.strftime('%Y-%m') for day, _, _ in segments})
+        return {
+            'root': str(self.root),
+            'segments': len(segments),
+            'keyframes': keyframes,
+            'snapshot_dates': len(self.dates()),
+            'total_bytes': total_bytes,
+        }
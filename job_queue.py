@@ -0,0 +1,174 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 작업 상태
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('done', 'failed', 'cancelled')
+
+
+class Job:
+    """백그라운드 작업 하나의 상태 (진행률, 중간 결과, 최종 결과)
+
+    작업 함수는 첫 번째 인자로 Job을 받아 update()로 진행률과 중간 결과를 알리고,
+    오래 걸리는 반복 중간에 cancelled()를 확인해서 취소 요청이 있으면 멈출 수 있습니다.
+    """
+
+    def __init__(self, job_id, kind, key):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.status = 'queued'
+        self.done = 0
+        self.total = None
+        self.message = None
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._finished_event = threading.Event()
+
+    def update(self, done=None, total=None, partial=None, message=None):
+        """진행률 / 중간 결과 갱신 (None인 항목은 그대로 유지)"""
+        with self._lock:
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+            if partial is not None:
+                self.partial = partial
+            if message is not None:
+                self.message = message
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def snapshot(self):
+        """현재 상태 딕셔너리 (화면 표시용 복사본)"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'done': self.done,
+                'total': self.total,
+                'progress': self.done / self.total if self.total else 0.0,
+                'message': self.message,
+                'partial': self.partial,
+                'result': self.result,
+                'error': self.error,
+                'elapsed': round((self.finished or time.time()) - (self.started or self.submitted), 3),
+            }
+
+
+class JobQueue:
+    """스크립트 실행과 분리된 백그라운드 작업 큐 (제출, 상태 조회, 결과 조회, 중복 제거)
+
+    같은 종류와 키로 진행 중이거나 끝난 작업이 있으면 새로 실행하지 않고 그 작업 id를 돌려줍니다.
+    끝난 작업은 ttl초 동안 결과를 보관하므로, 화면이 끊겼다가 다시 연결돼도 결과를 그대로 가져옵니다.
+    실패하거나 취소된 작업은 다시 제출하면 새로 실행합니다.
+    """
+
+    def __init__(self, max_workers=2, ttl=600, max_jobs=100):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._by_key = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, kind, key, func, *args, **kwargs):
+        """작업 제출 후 작업 id 반환 (func(job, *args, **kwargs) 형태로 실행)"""
+        with self._lock:
+            self._prune()
+            existing = self._by_key.get((kind, key))
+            if existing is not None and existing.status not in ('failed', 'cancelled'):
+                return existing.id
+
+            job = Job(f"{kind}-{next(self._ids)}", kind, key)
+            self._jobs[job.id] = job
+            self._by_key[(kind, key)] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancelled():
+            self._finish(job, 'cancelled')
+            return
+        with job._lock:
+            job.status = 'running'
+            job.started = time.time()
+        try:
+            result = func(job, *args, **kwargs)
+        except Exception as e:
+            print(f"❌ 백그라운드 작업 실패 ({job.id}): {e}")
+            self._finish(job, 'failed', error=str(e))
+            return
+        self._finish(job, 'cancelled' if job.cancelled() else 'done', result=result)
+
+    def _finish(self, job, status, result=None, error=None):
+        with job._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished = time.time()
+        job._finished_event.set()
+
+    def _prune(self):
+        """보관 기간이 지났거나 개수 제한을 넘은 끝난 작업 정리 (잠금 안에서 호출)"""
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status in FINISHED_STATUSES),
+            key=lambda job: job.finished
+        )
+        excess = len(self._jobs) - self.max_jobs
+        for job in finished:
+            if now - job.finished <= self.ttl and excess <= 0:
+                break
+            del self._jobs[job.id]
+            if self._by_key.get((job.kind, job.key)) is job:
+                del self._by_key[(job.kind, job.key)]
+            excess -= 1
+
+    def _get(self, job_id):
+        """작업 id → Job (정리 중인 딕셔너리를 읽지 않도록 잠금 안에서 조회)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def poll(self, job_id):
+        """작업 상태 딕셔너리 (없거나 정리된 작업이면 None)"""
+        job = self._get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def result(self, job_id, timeout=None):
+        """작업이 끝날 때까지 기다렸다가 결과 반환 (시간 초과 / 실패 / 취소면 None)"""
+        job = self._get(job_id)
+        if job is None or not job._finished_event.wait(timeout):
+            return None
+        with job._lock:
+            return job.result if job.status == 'done' else None
+
+    def cancel(self, job_id):
+        """취소 요청 (작업 함수가 cancelled()를 확인하는 지점에서 멈춤)"""
+        job = self._get(job_id)
+        if job is None:
+            return False
+        with job._lock:
+            if job.status in FINISHED_STATUSES:
+                return False
+            job._cancel.set()
+        return True
+
+    def stats(self):
+        """상태별 작업 수"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {'jobs': len(self._jobs), 'by_status': counts}
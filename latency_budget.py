@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager
+
+
+class LatencyBudget:
+    """요청 하나의 시간 예산과 단계별 실행 기록
+
+    seconds가 None이면 제한 없이 기록만 합니다. 선택 단계는 allows()로 남은 시간이 예상 소요
+    시간보다 많은지 확인한 뒤 실행하고, 시간이 부족하면 건너뛴 단계로 기록됩니다.
+    단계 상태는 'done'(완료), 'skipped'(시작하지 않음), 'degraded'(시작했지만 시간 초과나 오류로
+    대체값 사용) 중 하나입니다.
+    """
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.deadline = None if seconds is None else self.started + seconds
+        self.stages = []
+
+    @classmethod
+    def coerce(cls, budget):
+        """LatencyBudget, 초 단위 숫자, None을 모두 LatencyBudget으로 변환"""
+        return budget if isinstance(budget, cls) else cls(budget)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """남은 시간 (초, 제한이 없으면 None)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def allows(self, stage, estimate=0.0):
+        """남은 시간이 예상 소요 시간보다 많으면 True, 아니면 건너뛴 단계로 기록하고 False"""
+        remaining = self.remaining()
+        if remaining is None or remaining > estimate:
+            return True
+        self.record(stage, 'skipped', detail=f"남은 시간 {remaining:.1f}초 < 예상 {estimate:.1f}초")
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """with 블록 실행 시간을 완료 단계로 기록"""
+        started = time.monotonic()
+        yield
+        self.record(name, 'done', time.monotonic() - started)
+
+    def record(self, name, status, elapsed=0.0, detail=None):
+        self.stages.append({'stage': name, 'status': status, 'elapsed': round(elapsed, 3), 'detail': detail})
+
+    def skipped(self):
+        """건너뛰었거나 대체값을 사용한 단계 이름 목록"""
+        return [entry['stage'] for entry in self.stages if entry['status'] != 'done']
+
+    def report(self):
+        """예산 사용 보고서"""
+        return {
+            'budget': self.seconds,
+            'elapsed': round(self.elapsed(), 3),
+            'remaining': None if self.remaining() is None else round(self.remaining(), 3),
+            'stages': list(self.stages),
+            'skipped': self.skipped(),
+        }
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from strategy_parser import parse_strategy_text, build_strategy_config
+
+# LLM 백엔드 선택 환경변수 ('gemini' 기본, 'offline'이면 로컬 대체 모델 사용)
+BACKEND_ENV = 'STOCK_ANALYZER_LLM_BACKEND'
+
+# 로컬 대체 모델 설정 환경변수
+LATENCY_ENV = 'OFFLINE_LLM_LATENCY'        # 예: '300'(=fixed:300), 'fixed:300', 'uniform:200-1200', 'lognormal:800,0.5' (ms)
+ERROR_RATE_ENV = 'OFFLINE_LLM_ERROR_RATE'  # 0.0-1.0
+SEED_ENV = 'OFFLINE_LLM_SEED'
+
+# 오류 종류별 비중 (실제 API에서 자주 보는 순서)
+ERROR_MIX = {'ResourceExhausted': 0.6, 'DeadlineExceeded': 0.25, 'InternalServerError': 0.15}
+
+_TICKER_LINE_RE = re.compile(r"^\s*-\s*([A-Z][A-Z0-9.\-]{0,9}):", re.MULTILINE)
+
+
+class ResourceExhausted(Exception):
+    """요청 한도 초과 모의 오류 (google.api_core.exceptions와 같은 이름이라 오류 분류가 동일)"""
+
+
+class DeadlineExceeded(Exception):
+    """시간 초과 모의 오류"""
+
+
+class InternalServerError(Exception):
+    """서버 오류 모의 오류"""
+
+
+_MOCK_ERRORS = {cls.__name__: cls for cls in (ResourceExhausted, DeadlineExceeded, InternalServerError)}
+
+
+def parse_latency(spec):
+    """지연 시간 분포 문자열 → (분포 이름, 파라미터 튜플), 단위는 ms (숫자만 쓰면 'fixed:<ms>')"""
+    if not spec:
+        return ('fixed', (0.0,))
+    kind, _, params = spec.partition(':')
+    kind = kind.strip().lower()
+    try:
+        return ('fixed', (float(kind),))
+    except ValueError:
+        pass
+    if kind == 'fixed':
+        return ('fixed', (float(params or 0),))
+    if kind == 'uniform':
+        low, _, high = params.partition('-')
+        return ('uniform', (float(low), float(high or low)))
+    if kind == 'lognormal':
+        median, _, sigma = params.partition(',')
+        return ('lognormal', (float(median), float(sigma or 0.5)))
+    raise ValueError(f"알 수 없는 지연 시간 분포: {spec} "
+                     f"(사용 가능한 형식: '300', 'fixed:300', 'uniform:200-1200', 'lognormal:800,0.5')")
+
+
+class OfflineResponse:
+    """generate_content 응답 / 스트리밍 조각 (genai 응답처럼 .text 속성 제공)"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class OfflineGeminiModel:
+    """genai.GenerativeModel 대신 쓰는 로컬 대체 모델 (부하 테스트 / 지연 측정용)
+
+    프롬프트 종류(점수, 묶음 점수, 투자 의견, 묶음 회사 설명, 전략 JSON, 종목 선별)를 판별해
+    같은 프롬프트에는 항상 같은, 파서가 그대로 받아들이는 형식의 응답을 돌려줍니다.
+    호출마다 설정한 분포에서 뽑은 지연 시간만큼 기다리고, error_rate 확률로 실제 API와 같은
+    종류의 예외(요청 한도 초과, 시간 초과, 서버 오류)를 발생시킵니다.
+    """
+
+    def __init__(self, latency='fixed:0', error_rate=0.0, seed=None, stream_chunks=6):
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.stream_chunks = stream_chunks
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls):
+        """환경변수 설정으로 생성"""
+        seed = os.getenv(SEED_ENV)
+        return cls(
+            latency=os.getenv(LATENCY_ENV, 'fixed:0'),
+            error_rate=float(os.getenv(ERROR_RATE_ENV, '0')),
+            seed=int(seed) if seed else None,
+        )
+
+    def _sample_delay(self):
+        """설정한 분포에서 지연 시간(초) 추출"""
+        kind, params = self.latency
+        with self._lock:
+            if kind == 'uniform':
+                delay = self._random.uniform(*params)
+            elif kind == 'lognormal':
+                median, sigma = params
+                delay = self._random.lognormvariate(math.log(max(median, 1e-3)), sigma)
+            else:
+                delay = params[0]
+        return max(0.0, delay) / 1000
+
+    def _maybe_fail(self):
+        """error_rate 확률로 API 예외 발생"""
+        with self._lock:
+            self.calls += 1
+            if self.error_rate <= 0 or self._random.random() >= self.error_rate:
+                return
+            roll = self._random.random()
+
+        for name, weight in ERROR_MIX.items():
+            roll -= weight
+            if roll <= 0:
+                break
+        raise _MOCK_ERRORS[name](f"오프라인 모델 모의 오류 ({name})")
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        """genai.GenerativeModel.generate_content와 같은 호출 형태 (request_options는 무시)"""
+        self._maybe_fail()
+        text = self.respond(prompt)
+        delay = self._sample_delay()
+        if not stream:
+            time.sleep(delay)
+            return OfflineResponse(text)
+        return self._stream(text, delay)
+
+    def _stream(self, text, delay):
+        """첫 조각까지 지연의 절반, 나머지는 조각마다 나눠서 대기"""
+        size = max(1, math.ceil(len(text) / self.stream_chunks))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        time.sleep(delay / 2)
+        for piece in pieces:
+            yield OfflineResponse(piece)
+            time.sleep(delay / 2 / len(pieces))
+
+    # ------------------------------------------------------------------
+    # 프롬프트 종류별 결정적 응답
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _digest(*parts):
+        """입력 문자열들의 해시 → 0 이상 정수"""
+        return int(hashlib.sha1("\x1f".join(parts).encode('utf-8')).hexdigest()[:12], 16)
+
+    @staticmethod
+    def _quoted(prompt, label):
+        """'label: "..."' 형태로 들어간 사용자 입력 추출"""
+        match = re.search(rf'{label}\**\s*:\s*"(.*?)"', prompt, re.DOTALL)
+        return match.group(1) if match else ""
+
+    def respond(self, prompt):
+        """프롬프트 종류를 판별해 응답 텍스트 생성"""
+        if '"strategy_name"' in prompt:
+            return self._strategy(prompt)
+        if '"recommended_tickers"' in prompt:
+            return self._tickers(prompt)
+        if '"descriptions"' in prompt:
+            return self._descriptions(prompt)
+        if '"scores"' in prompt:
+            return self._batch_scores(prompt)
+        if prompt.rstrip().endswith('점수:'):
+            return self._score(prompt)
+        if prompt.rstrip().endswith('투자 의견:'):
+            return self._opinion(prompt)
+        return "오프라인 모델 응답입니다."
+
+    def _score_for(self, ticker, perspective):
+        return 30 + self._digest(ticker, perspective) % 61
+
+    def _score(self, prompt):
+        match = re.search(r"관점에서 (\S+) 종목을", prompt)
+        return str(self._score_for(match.group(1) if match else "", self._quoted(prompt, '평가 관점')))
+
+    def _batch_scores(self, prompt):
+        perspective = self._quoted(prompt, '평가 관점')
+        tickers = _TICKER_LINE_RE.findall(prompt)
+        return json.dumps({'scores': {ticker: self._score_for(ticker, perspective) for ticker in tickers}})
+
+    def _strategy(self, prompt):
+        user_input = self._quoted(prompt, '사용자 입력')
+        config = build_strategy_config(parse_strategy_text(user_input)['criteria'])
+        config['strategy_name'] = config['strategy_name'] if config['criteria'] else "균형 전략"
+        config['description'] = config['description'] or f"'{user_input}' 전략 (오프라인 분석)"
+        return json.dumps(config, ensure_ascii=False)
+
+    def _tickers(self, prompt):
+        user_input = self._quoted(prompt, '사용자 투자 전략')
+        candidates = _TICKER_LINE_RE.findall(prompt)
+        if not candidates:
+            pool = re.search(r"종목 풀에서.*?\n(.*?)\n\n", prompt, re.DOTALL)
+            candidates = [t.strip() for t in pool.group(1).split(',')] if pool else []
+        ranked = sorted(candidates, key=lambda ticker: self._digest(ticker, user_input))
+        return json.dumps({
+            'recommended_tickers': ranked[:20],
+            'reasoning': f"'{user_input}' 전략 기준 오프라인 정렬",
+            'strategy_focus': '종합',
+        }, ensure_ascii=False)
+
+    def _descriptions(self, prompt):
+        descriptions = {}
+        for ticker, name, sector in re.findall(r"^\s*-\s*(\S+) \((.*?)\) \| (.*?) \|", prompt, re.MULTILINE):
+            descriptions[ticker] = (f"{name}({ticker})은 {sector} 분야에서 사업을 영위하는 기업입니다. "
+                                    f"(오프라인 모델이 생성한 설명입니다.)")
+        return json.dumps({'descriptions': descriptions}, ensure_ascii=False)
+
+    def _opinion(self, prompt):
+        match = re.search(r"(\S+) 투자 의견:\s*$", prompt)
+        ticker = match.group(1) if match else ""
+        total = re.search(r"종합 점수: ([\d.]+)", prompt)
+        total = float(total.group(1)) if total else 50.0
+        tone = "전반적으로 양호한" if total >= 60 else "보통 수준의" if total >= 40 else "다소 부진한"
+        return (f"{ticker}는 종합 점수 {total:.0f}점으로 {tone} 재무 지표를 보이고 있습니다.\n"
+                f"업종 평균과 비교한 밸류에이션과 수익성을 함께 확인할 필요가 있습니다.\n"
+                f"부채비율과 배당 정책의 변화는 지속적으로 점검하는 것이 좋습니다.")
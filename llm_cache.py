@@ -0,0 +1,188 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# 호출 종류별 캐시 유효기간 (초). 0이면 캐시하지 않음
+DEFAULT_TTLS = {
+    'description': 30 * 24 * 3600,  # 회사 설명은 거의 바뀌지 않음
+    'opinion': 24 * 3600,
+    'score': 24 * 3600,
+    'strategy': 7 * 24 * 3600,
+    'tickers': 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+
+class LLMResponseCache:
+    """Gemini 응답을 (프롬프트, 모델, 호출 종류, 데이터 버전) 해시로 저장하는 디스크 캐시
+
+    항목마다 {cache_dir}/{key}.pkl 파일 하나를 쓰고, 메모리에는 최근 사용 순서와 크기만
+    유지합니다. 최근에 읽은 응답은 메모리에도 보관하므로 반복 조회는 파일을 열지 않습니다.
+    항목 수나 전체 크기가 한도를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다.
+    """
+
+    def __init__(self, cache_dir, ttls=None, max_entries=5000, max_bytes=50 * 1024 * 1024, memory_entries=256):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+
+        self._memory = OrderedDict()  # key → 항목 (최근 사용 순)
+        self._index = OrderedDict()   # key → 파일 크기 (최근 사용 순)
+        self._total_bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'writes': 0}
+        self._by_type = {}
+        # 여러 스레드에서 동시에 조회/저장할 수 있으므로 인덱스 변경은 잠금 안에서 수행
+        self._lock = threading.RLock()
+        self._scan()
+
+    def _scan(self):
+        """디스크 항목을 마지막 사용 시각(mtime) 순으로 인덱싱"""
+        entries = []
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            except OSError:
+                continue
+        entries.sort()
+        for _, key, size in entries:
+            self._index[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(prompt, model, call_type, data_version=""):
+        """캐시 키 (내용 해시)"""
+        raw = "\x1f".join([model or "", call_type or "", data_version or "", prompt])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, call_type):
+        return self.ttls.get(call_type, DEFAULT_TTL)
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def _count(self, call_type, name):
+        counts = self._by_type.setdefault(call_type, {'hits': 0, 'misses': 0})
+        counts[name] += 1
+        self._stats[name] += 1
+
+    def get(self, key, call_type):
+        """캐시된 응답 텍스트 (없거나 만료되면 None)"""
+        with self._lock:
+            return self._get(key, call_type)
+
+    def _get(self, key, call_type):
+        entry = self._memory.get(key)
+        if entry is None and key in self._index:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    entry = pickle.load(f)
+            except Exception:
+                self._drop(key)
+                entry = None
+
+        if entry is None:
+            self._count(call_type, 'misses')
+            return None
+
+        if time.time() - entry['created'] > self.ttl_for(call_type):
+            self._drop(key)
+            self._stats['expired'] += 1
+            self._count(call_type, 'misses')
+            return None
+
+        self._touch(key, entry)
+        self._count(call_type, 'hits')
+        return entry['text']
+
+    def put(self, key, call_type, text):
+        """응답 저장 (TTL이 0인 호출 종류나 빈 응답은 저장하지 않음)"""
+        if not text or self.ttl_for(call_type) <= 0:
+            return
+
+        entry = {'text': text, 'call_type': call_type, 'created': time.time()}
+        path = self._path(key)
+        # 같은 키를 여러 스레드가 동시에 저장해도 임시 파일이 겹치지 않도록 스레드 ID 사용
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"LLM 응답 캐시 저장 실패: {e}")
+            return
+
+        size = path.stat().st_size
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._total_bytes += size
+            self._stats['writes'] += 1
+            self._remember(key, entry)
+            self._evict()
+
+    def _touch(self, key, entry):
+        """최근 사용 순서 갱신 (재시작 후에도 유지되도록 mtime도 갱신)"""
+        if key in self._index:
+            self._index.move_to_end(key)
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+        self._remember(key, entry)
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _drop(self, key):
+        self._memory.pop(key, None)
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """한도를 넘으면 가장 오래 사용하지 않은 항목부터 삭제"""
+        while self._index and (len(self._index) > self.max_entries or self._total_bytes > self.max_bytes):
+            key = next(iter(self._index))
+            self._drop(key)
+            self._stats['evictions'] += 1
+
+    def clear(self):
+        """모든 항목 삭제"""
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+            self._memory.clear()
+
+    def stats(self):
+        """적중률 및 사용량 통계"""
+        with self._lock:
+            return self._collect_stats()
+
+    def _collect_stats(self):
+        lookups = self._stats['hits'] + self._stats['misses']
+        by_type = {}
+        for call_type, counts in self._by_type.items():
+            total = counts['hits'] + counts['misses']
+            by_type[call_type] = dict(counts, hit_rate=round(counts['hits'] / total, 3) if total else 0.0)
+        return dict(
+            self._stats,
+            hit_rate=round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+            entries=len(self._index),
+            total_bytes=self._total_bytes,
+            by_type=by_type,
+        )
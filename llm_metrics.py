@@ -0,0 +1,190 @@
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+import pandas as pd
+
+# 지연 시간 히스토그램 구간 상한 (ms, 마지막 구간은 그 이상 전부)
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000]
+
+# 최근 호출 지연 시간을 보관하는 개수 (백분위 계산용)
+RECENT_SAMPLES = 1000
+
+# 예외 이름 / 메시지 → 오류 분류
+ERROR_CATEGORIES = [
+    ('rate_limit', ('ResourceExhausted', 'TooManyRequests', '429', 'quota', 'rate limit')),
+    ('timeout', ('DeadlineExceeded', 'Timeout', 'timed out', '504')),
+    ('server', ('InternalServerError', 'ServiceUnavailable', 'BadGateway', '500', '503')),
+    ('auth', ('PermissionDenied', 'Unauthenticated', 'API key', '401', '403')),
+    ('invalid_request', ('InvalidArgument', 'BadRequest', 'FailedPrecondition', '400')),
+    ('blocked', ('StopCandidateException', 'BlockedPrompt', 'safety', 'finish_reason')),
+]
+
+
+def classify_error(error):
+    """예외를 오류 분류 이름으로 변환 (rate_limit / timeout / server / auth / invalid_request / blocked / other)"""
+    names = [cls.__name__ for cls in type(error).__mro__]
+    message = str(error)
+    for category, markers in ERROR_CATEGORIES:
+        for marker in markers:
+            if marker in names or marker.lower() in message.lower():
+                return category
+    return 'other'
+
+
+def estimate_tokens(text):
+    """토큰 수 추정 (영문은 약 4자당 1토큰, 한글 등 비ASCII 문자는 약 1.5자당 1토큰)"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return int(round(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5))
+
+
+def _new_entry():
+    return {
+        'calls': 0,
+        'cache_hits': 0,
+        'errors': 0,
+        'error_types': {},
+        'parse_failures': 0,
+        'fallbacks': 0,
+        'fallback_reasons': {},
+        'prompt_tokens': 0,
+        'response_tokens': 0,
+        'latency_total_ms': 0.0,
+        'queue_total_ms': 0.0,
+        'first_chunk_total_ms': 0.0,
+        'streams': 0,
+        'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        'recent': deque(maxlen=RECENT_SAMPLES),
+    }
+
+
+class LLMMetrics:
+    """LLM 호출 계측 (호출 종류별 지연 시간 히스토그램, 토큰 수, 오류 분류, 파싱 실패 / 대체값 사용 횟수)
+
+    지연 시간은 동시 호출 제한 대기(queue)와 실제 생성 시간을 나눠서 기록하므로, 화면 지연이
+    API 응답 때문인지 대기 때문인지 구분할 수 있습니다. 토큰 수는 API가 사용량을 알려주면 그 값을,
+    아니면 문자 수로 추정한 값을 사용합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.started = time.time()
+
+    def _entry(self, call_type):
+        entry = self._entries.get(call_type)
+        if entry is None:
+            entry = self._entries[call_type] = _new_entry()
+        return entry
+
+    def record_cache_hit(self, call_type):
+        with self._lock:
+            self._entry(call_type)['cache_hits'] += 1
+
+    def record_call(self, call_type, latency, prompt, response_text=None, usage=None, error=None,
+                    queue_wait=0.0, first_chunk=None):
+        """생성 호출 한 번 기록 (시간 단위는 초)"""
+        prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimate_tokens(prompt)
+        response_tokens = getattr(usage, 'candidates_token_count', None) or estimate_tokens(response_text)
+        latency_ms = latency * 1000
+
+        with self._lock:
+            entry = self._entry(call_type)
+            entry['calls'] += 1
+            entry['prompt_tokens'] += prompt_tokens
+            entry['response_tokens'] += response_tokens
+            entry['latency_total_ms'] += latency_ms
+            entry['queue_total_ms'] += queue_wait * 1000
+            entry['histogram'][bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            entry['recent'].append(latency_ms)
+            if first_chunk is not None:
+                entry['streams'] += 1
+                entry['first_chunk_total_ms'] += first_chunk * 1000
+            if error is not None:
+                category = classify_error(error)
+                entry['errors'] += 1
+                entry['error_types'][category] = entry['error_types'].get(category, 0) + 1
+
+    def record_parse_failure(self, call_type):
+        with self._lock:
+            self._entry(call_type)['parse_failures'] += 1
+
+    def record_fallback(self, call_type, reason, count=1):
+        """LLM 결과 대신 대체값(기본 점수, 기본 종목, 로컬 결과 등)을 사용한 횟수 기록"""
+        with self._lock:
+            entry = self._entry(call_type)
+            entry['fallbacks'] += count
+            entry['fallback_reasons'][reason] = entry['fallback_reasons'].get(reason, 0) + count
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self.started = time.time()
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    def summary(self):
+        """호출 종류별 통계 딕셔너리"""
+        with self._lock:
+            result = {}
+            for call_type, entry in self._entries.items():
+                calls = entry['calls']
+                recent = list(entry['recent'])
+                labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+                result[call_type] = {
+                    'calls': calls,
+                    'cache_hits': entry['cache_hits'],
+                    'errors': entry['errors'],
+                    'error_rate': round(entry['errors'] / calls, 3) if calls else 0.0,
+                    'error_types': dict(entry['error_types']),
+                    'parse_failures': entry['parse_failures'],
+                    'parse_failure_rate': round(entry['parse_failures'] / calls, 3) if calls else 0.0,
+                    'fallbacks': entry['fallbacks'],
+                    'fallback_reasons': dict(entry['fallback_reasons']),
+                    'prompt_tokens': entry['prompt_tokens'],
+                    'response_tokens': entry['response_tokens'],
+                    'latency_total_ms': round(entry['latency_total_ms'], 1),
+                    'latency_mean_ms': round(entry['latency_total_ms'] / calls, 1) if calls else None,
+                    'latency_p50_ms': self._percentile(recent, 0.5),
+                    'latency_p95_ms': self._percentile(recent, 0.95),
+                    'queue_mean_ms': round(entry['queue_total_ms'] / calls, 1) if calls else None,
+                    'first_chunk_mean_ms': round(entry['first_chunk_total_ms'] / entry['streams'], 1) if entry['streams'] else None,
+                    'histogram': dict(zip(labels, entry['histogram'])),
+                }
+            return result
+
+    def to_frame(self):
+        """호출 종류별 주요 통계 DataFrame (전체 지연 시간이 큰 순서)"""
+        columns = ['calls', 'cache_hits', 'errors', 'error_rate', 'parse_failures', 'fallbacks',
+                   'prompt_tokens', 'response_tokens', 'latency_total_ms', 'latency_mean_ms',
+                   'latency_p50_ms', 'latency_p95_ms', 'queue_mean_ms', 'first_chunk_mean_ms']
+        summary = self.summary()
+        frame = pd.DataFrame({call_type: {col: stats[col] for col in columns} for call_type, stats in summary.items()}).T
+        if frame.empty:
+            return pd.DataFrame(columns=columns)
+        frame = frame.apply(pd.to_numeric)
+        frame.index.name = 'call_type'
+        return frame.sort_values('latency_total_ms', ascending=False)
+
+    def export(self, path):
+        """통계를 JSON 파일로 저장하고 경로 반환"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'started': self.started,
+            'exported': time.time(),
+            'latency_buckets_ms': LATENCY_BUCKETS_MS,
+            'call_types': self.summary(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        return path
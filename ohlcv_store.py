@@ -0,0 +1,218 @@
+import json
+import numpy as np
+import pandas as pd
+from shared_universe import VersionedStore
+from universe_analytics import align_closes
+
+# 저장하는 열 → 파일 이름
+COLUMN_FILES = {
+    'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close',
+    'Volume': 'volume', 'Dividends': 'dividends', 'Stock Splits': 'splits',
+}
+COLUMNS = list(COLUMN_FILES.keys())
+
+# 압축 저장(compact=True) 형식
+# - 시가/고가/저가/종가: float32 (상대 오차 최대 2^-24 ≈ 6e-8, $1,000 주가에서 $0.00006)
+# - 거래량: 정수 (최댓값이 uint32 범위면 uint32, 아니면 int64, 오차 없음)
+# - 배당/분할: 값이 바뀌는 지점만 저장하는 런 길이 인코딩 (float64 그대로, 오차 없음)
+# - 날짜: 1970-01-01부터의 일수 int32 (날짜 단위로 정규화돼 있으므로 오차 없음)
+# 일간 수익률은 두 가격의 비율이므로 오차가 최대 약 1.2e-7이고, 변동성/베타/상관계수 같은 지표는
+# 이보다 작은 범위에서 움직입니다. 차트 가격은 소수 둘째 자리로 반올림하므로 $100,000 미만에서는 차이가 보이지 않습니다.
+# 행 하나가 64바이트(float64 7열 + 날짜)에서 약 24바이트로 줄어듭니다.
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+RLE_COLUMNS = ('Dividends', 'Stock Splits')
+PRICE_ERROR_BUDGET = 2.0 ** -24
+
+
+def _normalize_history(frame):
+    """날짜 인덱스를 타임존 없는 날짜 단위로 정규화하고 정렬 (중복 날짜는 마지막 값)"""
+    index = pd.to_datetime(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame = frame.set_axis(index.normalize())
+    frame = frame[~frame.index.duplicated(keep='last')]
+    return frame.sort_index()
+
+
+def _encode_runs(values):
+    """배열을 런 길이 인코딩 (각 런의 시작 위치, 값)"""
+    values = np.nan_to_num(np.asarray(values, dtype='float64'))
+    if not len(values):
+        return np.zeros(0, dtype='int64'), np.zeros(0, dtype='float64')
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(values) != 0) + 1)).astype('int64')
+    return starts, values[starts]
+
+
+def _decode_runs(starts, values, lo, hi):
+    """런 길이 인코딩에서 [lo, hi) 구간만 복원"""
+    if hi <= lo:
+        return np.zeros(0, dtype='float64')
+    first = int(np.searchsorted(starts, lo, side='right')) - 1
+    last = int(np.searchsorted(starts, hi, side='left'))
+    bounds = np.clip(np.append(starts[first:last], hi), lo, hi)
+    return np.repeat(values[first:last], np.diff(bounds))
+
+
+class OHLCVStore(VersionedStore):
+    """유니버스 전체 일봉 OHLCV를 열 단위 memmap 파일로 저장하는 저장소
+
+    열마다 모든 종목의 값을 티커 순서대로 이어 붙인 float64 배열 하나({열}.npy)와 날짜 배열(dates.npy)을
+    두고, offsets.npy의 [offsets[i], offsets[i+1]) 구간이 i번째 종목의 데이터입니다.
+    종목 하나의 한 열을 읽을 때 pickle 전체를 풀 필요 없이 매핑된 배열의 연속 구간만 잘라서(복사 없이) 씁니다.
+    compact=True면 위의 압축 형식으로 저장하며, 이때 배당/분할 열과 날짜는 읽을 때 구간만 복원합니다.
+    """
+
+    def build(self, histories, data_version="", compact=False):
+        """티커 → 일봉 DataFrame을 새 버전으로 기록 후 현재 버전으로 교체"""
+        frames = {}
+        for ticker in sorted(histories):
+            hist = histories[ticker]
+            if hist is None or hist.empty or 'Close' not in hist:
+                continue
+            frames[ticker] = _normalize_history(hist)
+
+        tickers = list(frames)
+        offsets = np.zeros(len(tickers) + 1, dtype='int64')
+        offsets[1:] = np.cumsum([len(frames[ticker]) for ticker in tickers])
+        rows = int(offsets[-1])
+
+        def column_values(column):
+            for i, ticker in enumerate(tickers):
+                frame = frames[ticker]
+                values = frame[column].to_numpy(dtype='float64') if column in frame else np.zeros(len(frame))
+                yield slice(offsets[i], offsets[i + 1]), values
+
+        dtypes = {column: 'float64' for column in COLUMNS}
+        date_dtype = 'int64'
+        if compact:
+            dtypes.update({column: 'float32' for column in PRICE_COLUMNS})
+            max_volume = max((np.nanmax(values, initial=0) for _, values in column_values('Volume')), default=0)
+            dtypes['Volume'] = 'uint32' if max_volume < 2 ** 32 else 'int64'
+            date_dtype = 'int32'
+        max_error = 0.0
+
+        def write(path):
+            nonlocal max_error
+            np.save(path / "offsets.npy", offsets)
+            dates = np.lib.format.open_memmap(path / "dates.npy", mode='w+', dtype=date_dtype, shape=(rows,))
+            for i, ticker in enumerate(tickers):
+                day_ns = frames[ticker].index.asi8
+                dates[offsets[i]:offsets[i + 1]] = day_ns // 86_400_000_000_000 if compact else day_ns
+            dates.flush()
+            del dates
+
+            for column, name in COLUMN_FILES.items():
+                if compact and column in RLE_COLUMNS:
+                    values = np.zeros(rows)
+                    for rows_slice, chunk in column_values(column):
+                        values[rows_slice] = chunk
+                    starts, run_values = _encode_runs(values)
+                    np.save(path / f"{name}_starts.npy", starts)
+                    np.save(path / f"{name}_values.npy", run_values)
+                    continue
+
+                # 종목별 구간을 열 파일에 바로 기록 (유니버스 전체를 한 번에 이어 붙인 사본을 만들지 않음)
+                out = np.lib.format.open_memmap(path / f"{name}.npy", mode='w+', dtype=dtypes[column], shape=(rows,))
+                for rows_slice, values in column_values(column):
+                    if dtypes[column] in ('uint32', 'int64'):
+                        values = np.rint(np.nan_to_num(values))
+                    out[rows_slice] = values
+                    if compact and column in PRICE_COLUMNS:
+                        # 실제 반올림 오차를 기록해서 오차 예산을 넘지 않는지 확인할 수 있게 함
+                        with np.errstate(divide='ignore', invalid='ignore'):
+                            error = np.abs(out[rows_slice].astype('float64') - values) / np.abs(values)
+                        max_error = max(max_error, float(np.nanmax(error, initial=0.0)))
+                out.flush()
+                del out
+
+            with open(path / "index.json", 'w', encoding='utf-8') as f:
+                json.dump({'tickers': tickers, 'columns': COLUMNS, 'compact': compact}, f, ensure_ascii=False)
+
+        pointer = self._publish(write, data_version, tickers=len(tickers), rows=rows, compact=compact)
+        if compact:
+            pointer['max_price_error'] = max_error
+            if max_error > PRICE_ERROR_BUDGET:
+                print(f"⚠️ OHLCV 압축 오차가 예산을 넘었습니다: {max_error:.2e} > {PRICE_ERROR_BUDGET:.2e}")
+        return pointer
+
+    def _map(self, path):
+        with open(path / "index.json", 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        compact = index.get('compact', False)
+        columns = {}
+        runs = {}
+        for column in index['columns']:
+            name = COLUMN_FILES[column]
+            if compact and column in RLE_COLUMNS:
+                runs[column] = (np.load(path / f"{name}_starts.npy"), np.load(path / f"{name}_values.npy"))
+            else:
+                columns[column] = np.load(path / f"{name}.npy", mmap_mode='r')
+        return {
+            'tickers': index['tickers'],
+            'positions': {ticker: i for i, ticker in enumerate(index['tickers'])},
+            'offsets': np.load(path / "offsets.npy"),
+            'dates': np.load(path / "dates.npy", mmap_mode='r'),
+            'compact': compact,
+            'columns': columns,
+            'runs': runs,
+        }
+
+    @staticmethod
+    def arrays(view, ticker, start=None, end=None, columns=None):
+        """종목 하나의 (날짜 배열, 열 → 배열) 읽기 전용 구간, 없는 종목이면 None
+
+        가격/거래량은 매핑된 배열을 복사 없이 잘라서 주고, 압축 저장의 날짜와 배당/분할 열만 구간을 복원합니다.
+        """
+        position = view['positions'].get(ticker)
+        if position is None:
+            return None
+        lo, hi = int(view['offsets'][position]), int(view['offsets'][position + 1])
+        if view.get('compact'):
+            dates = view['dates'][lo:hi].astype('int64').view('datetime64[D]').astype('datetime64[ns]')
+        else:
+            dates = view['dates'][lo:hi].view('datetime64[ns]')
+        # 날짜가 정렬돼 있으므로 기간은 이진 탐색으로 잘라냄
+        first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns')))
+        last = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right'))
+        columns = columns or COLUMNS
+        values = {}
+        for column in columns:
+            if column in view['columns']:
+                values[column] = view['columns'][column][lo + first:lo + last]
+            elif column in view['runs']:
+                values[column] = _decode_runs(*view['runs'][column], lo + first, lo + last)
+        return dates[first:last], values
+
+    @classmethod
+    def frame(cls, view, ticker, start=None, end=None, columns=None):
+        """종목 하나의 일봉 DataFrame (차트 / 지표 계산용), 없는 종목이면 None"""
+        sliced = cls.arrays(view, ticker, start, end, columns)
+        if sliced is None:
+            return None
+        dates, values = sliced
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='Date'), copy=False)
+
+    @classmethod
+    def price_matrix(cls, view, tickers=None, min_coverage=0.8, max_fill_days=5):
+        """종가를 (날짜 x 종목) 행렬로 정렬 (build_price_matrix와 같은 결과)"""
+        if tickers is None:
+            tickers = view['tickers']
+        closes = {}
+        for ticker in tickers:
+            sliced = cls.arrays(view, ticker, columns=['Close'])
+            if sliced is not None and len(sliced[0]):
+                closes[ticker] = pd.Series(sliced[1]['Close'], index=pd.DatetimeIndex(sliced[0]), copy=False)
+        return align_closes(closes, min_coverage, max_fill_days)
+
+    @staticmethod
+    def stats(view):
+        """저장소 크기 요약 (종목 수, 행 수, 열 파일 바이트)"""
+        return {
+            'version': view['version'],
+            'tickers': len(view['tickers']),
+            'rows': len(view['dates']),
+            'compact': view.get('compact', False),
+            'bytes': int(view['dates'].nbytes
+                         + sum(array.nbytes for array in view['columns'].values())
+                         + sum(starts.nbytes + values.nbytes for starts, values in view['runs'].values())),
+        }
@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# 현재 버전을 가리키는 포인터 파일 (os.replace로 통째로 바꿔서 버전 교체를 원자적으로 처리)
+CURRENT_FILE = "current.json"
+LOCK_FILE = "publish.lock"
+
+# 발행 잠금이 이 시간(초)보다 오래되면 발행 도중 죽은 프로세스의 잠금으로 보고 무시
+STALE_LOCK_SECONDS = 600
+
+
+class VersionedStore:
+    """버전 디렉토리 단위로 발행하고 current.json 포인터로 원자적으로 교체하는 파일 저장소
+
+    {root}/{버전}/ 에 파일을 모두 기록한 뒤 포인터를 os.replace로 바꾸므로, 읽는 쪽은 항상 완성된
+    버전만 보게 됩니다. 발행은 잠금 파일로 한 프로세스만 하도록 막고, 최근 keep_versions개만 보관합니다.
+    """
+
+    def __init__(self, root, keep_versions=2):
+        self.root = Path(root)
+        self.keep_versions = keep_versions
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._view = None
+
+    # ---------- 발행 (갱신 담당 프로세스) ----------
+
+    def acquire(self):
+        """발행 잠금 획득 (다른 프로세스가 발행 중이면 False)"""
+        path = self.root / LOCK_FILE
+        try:
+            if time.time() - path.stat().st_mtime > STALE_LOCK_SECONDS:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        os.close(fd)
+        return True
+
+    def release(self):
+        try:
+            (self.root / LOCK_FILE).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _publish(self, write, data_version="", **info):
+        """write(디렉토리)로 새 버전을 기록한 뒤 현재 버전으로 교체, 포인터 딕셔너리 반환"""
+        # 나노초 시각을 앞에 붙여서 이름 순서 = 발행 순서가 되도록 함
+        version = f"{time.time_ns()}_{data_version or 'na'}"
+        target = self.root / version
+        tmp = self.root / f".{version}.tmp"
+        tmp.mkdir(parents=True)
+        try:
+            write(tmp)
+            tmp.rename(target)
+
+            pointer = dict(info, version=version, data_version=data_version, published=time.time())
+            pointer_tmp = self.root / f".{CURRENT_FILE}.{os.getpid()}"
+            with open(pointer_tmp, 'w', encoding='utf-8') as f:
+                json.dump(pointer, f)
+            os.replace(pointer_tmp, self.root / CURRENT_FILE)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        self._prune(version)
+        return pointer
+
+    def _prune(self, current):
+        """오래된 버전 디렉토리 정리 (현재 버전 포함 keep_versions개 보관)"""
+        versions = sorted(
+            (path for path in self.root.iterdir() if path.is_dir() and not path.name.startswith('.')),
+            key=lambda path: path.name
+        )
+        for path in versions[:-self.keep_versions]:
+            if path.name != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    # ---------- 조회 (모든 워커) ----------
+
+    def current(self):
+        """현재 버전 정보 (발행된 적이 없으면 None)"""
+        try:
+            with open(self.root / CURRENT_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def open(self):
+        """현재 버전을 읽기 전용으로 매핑한 뷰 (버전이 바뀌었을 때만 다시 매핑, 없으면 None)"""
+        pointer = self.current()
+        if pointer is None:
+            return None
+        with self._lock:
+            if self._view is not None and self._view['version'] == pointer['version']:
+                return self._view
+            try:
+                view = self._map(self.root / pointer['version'])
+            except Exception as e:
+                # 교체 직후 이전 버전이 정리된 경우 등은 다음 호출에서 다시 시도
+                print(f"{type(self).__name__} 매핑 실패: {e}")
+                return self._view
+            view.update(version=pointer['version'], data_version=pointer.get('data_version', ""),
+                        published=pointer.get('published'))
+            self._view = view
+            return view
+
+    def _map(self, path):
+        """버전 디렉토리의 파일을 매핑해서 뷰 딕셔너리로 반환 (하위 클래스에서 구현)"""
+        raise NotImplementedError
+
+
+class SharedUniverse(VersionedStore):
+    """여러 Streamlit 워커 프로세스가 함께 쓰는 유니버스 주가 행렬
+
+    갱신 담당 프로세스 하나가 {root}/{버전}/ 디렉토리에 .npy 파일로 한 번만 기록하고 current.json을
+    교체하면, 각 워커는 np.load(mmap_mode='r')로 읽기 전용 매핑만 하므로 워커 수가 늘어도
+    데이터는 운영체제 페이지 캐시에 한 벌만 올라갑니다.
+    이미 매핑한 이전 버전은 파일이 지워져도 매핑이 유지되므로 교체 중에도 읽기가 끊기지 않습니다.
+    """
+
+    def publish(self, dates, tickers, closes, data_version=""):
+        """주가 행렬을 새 버전으로 기록 후 현재 버전으로 교체"""
+        def write(path):
+            np.save(path / "dates.npy", pd.DatetimeIndex(dates).asi8)
+            np.save(path / "closes.npy", np.ascontiguousarray(closes, dtype='float64'))
+            with open(path / "meta.json", 'w', encoding='utf-8') as f:
+                json.dump({'tickers': list(tickers)}, f, ensure_ascii=False)
+
+        return self._publish(write, data_version, tickers=len(tickers), days=len(dates))
+
+    def _map(self, path):
+        with open(path / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return {
+            'tickers': meta['tickers'],
+            'dates': pd.DatetimeIndex(np.load(path / "dates.npy")),
+            'closes': np.load(path / "closes.npy", mmap_mode='r'),
+        }
+
+    @staticmethod
+    def price_matrix(view, tickers=None):
+        """뷰의 (날짜, 종목, 종가 행렬), tickers를 주면 해당 열만 선택 (없는 종목은 제외)"""
+        if tickers is None:
+            return view['dates'], list(view['tickers']), view['closes']
+        positions = {ticker: i for i, ticker in enumerate(view['tickers'])}
+        columns = [ticker for ticker in tickers if ticker in positions]
+        return view['dates'], columns, view['closes'][:, [positions[ticker] for ticker in columns]]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+시작 시간(import 시간) 벤치마크
+
+각 시나리오를 새 파이썬 프로세스에서 여러 번 실행해서 소요 시간 중앙값, 가장 무거운 import,
+느리게 불러오기로 한 모듈(yfinance, Gemini SDK, plotly)이 실제로 로드됐는지를 보여줍니다.
+--max-seconds를 주면 기준을 넘는 시나리오가 있을 때 종료 코드 1로 끝납니다.
+
+    python startup_benchmark.py
+    python startup_benchmark.py --repeat 5 --max-seconds 1.5 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 캐시만 쓰는 경로에서는 로드되면 안 되는 무거운 모듈
+LAZY_MODULES = ('yfinance', 'google.generativeai', 'plotly')
+
+# 시나리오 이름 → 실행할 코드 (캐시된 종목이 있으면 첫 번째 종목으로 재무비율까지 계산)
+SCENARIOS = {
+    'import stock_analyzer': "import stock_analyzer",
+    'StockAnalyzer()': "from stock_analyzer import StockAnalyzer\nanalyzer = StockAnalyzer()",
+    'cache-only analysis': (
+        "from stock_analyzer import StockAnalyzer\n"
+        "analyzer = StockAnalyzer(llm_backend='offline')\n"
+        "cached = analyzer.get_cached_tickers()\n"
+        "if cached and analyzer.get_stock_info(cached[0]):\n"
+        "    analyzer.calculate_financial_ratios(cached[0])"
+    ),
+}
+
+_PROBE = """
+import sys, time, json
+_start = time.perf_counter()
+{code}
+_elapsed = time.perf_counter() - _start
+print(json.dumps({{'elapsed': _elapsed, 'loaded': [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def _top_imports(stderr, limit):
+    """-X importtime 출력에서 누적 시간이 큰 import 목록 [(모듈, ms)] (최상위와 바로 아래 단계만)"""
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            top.append((name.strip(), int(cumulative_us) / 1000))
+    return sorted(top, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def measure(code, repeat=3, top=5):
+    """코드를 새 프로세스에서 repeat번 실행한 결과 (중앙값 / 최소 / 최대 초, 무거운 import, 로드된 지연 모듈)"""
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    runs = []
+    stderr = ""
+    loaded = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _PROBE.format(code=code, lazy=LAZY_MODULES)],
+            capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "실행 실패")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        runs.append(result['elapsed'])
+        loaded = result['loaded']
+        stderr = proc.stderr
+    return {
+        'median': round(statistics.median(runs), 3),
+        'min': round(min(runs), 3),
+        'max': round(max(runs), 3),
+        'top_imports': _top_imports(stderr, top),
+        'lazy_loaded': loaded,
+    }
+
+
+def run_benchmark(repeat=3, max_seconds=None, json_path=None):
+    """모든 시나리오 측정 후 결과 출력, 기준 초과 / 지연 모듈 로드가 없으면 True"""
+    print("⏱️ 시작 시간 벤치마크")
+    print("=" * 60)
+
+    results = {}
+    ok = True
+    for name, code in SCENARIOS.items():
+        try:
+            result = measure(code, repeat)
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            ok = False
+            continue
+        results[name] = result
+
+        over = max_seconds is not None and result['median'] > max_seconds
+        status = "❌" if over or result['lazy_loaded'] else "✅"
+        print(f"{status} {name}: {result['median']:.3f}초 (최소 {result['min']:.3f}, 최대 {result['max']:.3f})")
+        print("   무거운 import: " + ", ".join(f"{module} {ms:.0f}ms" for module, ms in result['top_imports']))
+        if result['lazy_loaded']:
+            print(f"   ⚠️ 지연 로드 대상이 로드됨: {', '.join(result['lazy_loaded'])}")
+        ok = ok and status == "✅"
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': repeat, 'max_seconds': max_seconds,
+                       'scenarios': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 결과 저장: {json_path}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="시작 시간(import 시간) 벤치마크")
+    parser.add_argument('--repeat', type=int, default=3, help="시나리오별 반복 횟수")
+    parser.add_argument('--max-seconds', type=float, default=None, help="시나리오별 중앙값 허용 기준 (초)")
+    parser.add_argument('--json', dest='json_path', default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.repeat, args.max_seconds, args.json_path) else 1)
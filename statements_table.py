@@ -0,0 +1,227 @@
+import pandas as pd
+import numpy as np
+import pickle
+from pathlib import Path
+
+# 캐시 번들의 재무제표 키
+STATEMENTS = ('financials', 'balance_sheet', 'cash_flow')
+
+COLUMNS = ['ticker', 'statement', 'line_item', 'period', 'value']
+
+# 데이터 버전(종목 집합)별 테이블 캐시 보관 개수 (최근 사용 순)
+MAX_CACHED_TABLES = 4
+
+# 재무제표에서 계산하는 성장성/이익의 질 지표 (비율은 모두 소수, 이자보상배율만 배수)
+METRIC_FIELDS = ['매출성장률', '매출_CAGR', 'EPS성장률', 'EPS_CAGR', 'FCF수익률',
+                 '매출총이익률', '영업이익률', '순이익률', '발생액비율', '이자보상배율']
+
+
+def normalize_statements(stock_data, tickers=None):
+    """종목별 wide 재무제표를 하나의 long-format 테이블로 변환
+
+    결과는 (line_item, period) MultiIndex로 정렬되어 있고 ticker, statement, value 열을 가지며,
+    ticker / statement는 category 타입이라 수백 개 종목을 담아도 메모리 사용량이 작습니다.
+    """
+    if tickers is None:
+        tickers = sorted(stock_data.keys())
+
+    parts = {name: [] for name in COLUMNS}
+    for ticker in tickers:
+        data = stock_data.get(ticker)
+        if not data:
+            continue
+        for statement in STATEMENTS:
+            frame = data.get(statement)
+            if frame is None or not isinstance(frame, pd.DataFrame) or frame.empty:
+                continue
+
+            values = frame.to_numpy(dtype='float64', na_value=np.nan)
+            rows, cols = np.nonzero(np.isfinite(values))
+            if len(rows) == 0:
+                continue
+
+            parts['ticker'].append(np.full(len(rows), ticker, dtype=object))
+            parts['statement'].append(np.full(len(rows), statement, dtype=object))
+            parts['line_item'].append(frame.index.to_numpy(dtype=object)[rows])
+            parts['period'].append(pd.to_datetime(frame.columns).to_numpy()[cols])
+            parts['value'].append(values[rows, cols])
+
+    if not parts['value']:
+        table = pd.DataFrame({name: pd.Series(dtype='float64') for name in COLUMNS})
+    else:
+        table = pd.DataFrame({name: np.concatenate(chunks) for name, chunks in parts.items()})
+
+    table['ticker'] = table['ticker'].astype('category')
+    table['statement'] = table['statement'].astype('category')
+    table['period'] = pd.to_datetime(table['period'])
+    return table.set_index(['line_item', 'period']).sort_index()
+
+
+class StatementsTable:
+    """유니버스 전체 재무제표 long-format 테이블과 종목 횡단 조회"""
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def from_stock_data(cls, stock_data, tickers=None):
+        return cls(normalize_statements(stock_data, tickers))
+
+    @classmethod
+    def load_or_build(cls, stock_data, cache_dir, data_version, tickers=None, max_cached=MAX_CACHED_TABLES):
+        """데이터 버전별 디스크 캐시가 있으면 로드, 없으면 생성 후 저장
+
+        종목 집합이 다른 화면(전략 추천 / 커스텀 전략)이 서로의 캐시를 지우지 않도록
+        최근 사용한 max_cached개 버전을 남깁니다 (사용 시각은 파일 수정 시각으로 기록).
+        """
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        path = cache_dir / f"statements_{data_version}.pkl"
+
+        if path.exists():
+            try:
+                with open(path, 'rb') as f:
+                    instance = cls(pickle.load(f))
+                path.touch()
+                return instance
+            except Exception as e:
+                print(f"재무제표 테이블 캐시 로드 실패: {e}")
+
+        instance = cls.from_stock_data(stock_data, tickers)
+        try:
+            with open(path, 'wb') as f:
+                pickle.dump(instance.table, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # 오래 사용하지 않은 버전 캐시는 정리
+            cached = sorted(cache_dir.glob("statements_*.pkl"), key=lambda old: old.stat().st_mtime, reverse=True)
+            for old in cached[max_cached:]:
+                old.unlink(missing_ok=True)
+        except Exception as e:
+            print(f"재무제표 테이블 캐시 저장 실패: {e}")
+        return instance
+
+    def __len__(self):
+        return len(self.table)
+
+    def line_items(self, statement=None):
+        """사용 가능한 계정 과목 목록"""
+        table = self.table
+        if statement is not None:
+            table = table[table['statement'] == statement]
+        return sorted(table.index.get_level_values('line_item').unique())
+
+    def _rows(self, line_item, statement=None):
+        """(line_item) 인덱스 구간만 잘라서 반환"""
+        try:
+            rows = self.table.loc[line_item]
+        except KeyError:
+            return pd.DataFrame(columns=['ticker', 'statement', 'value'])
+        if statement is not None:
+            rows = rows[rows['statement'] == statement]
+        return rows
+
+    def item(self, line_item, statement=None):
+        """계정 과목 하나의 종목 x 회계기간 wide 테이블"""
+        rows = self._rows(line_item, statement).reset_index()
+        if rows.empty:
+            return pd.DataFrame()
+        return rows.pivot_table(index='ticker', columns='period', values='value',
+                                aggfunc='last', observed=True).sort_index(axis=1)
+
+    def recent(self, line_item, statement=None, depth=5):
+        """종목별 최근 회계기간부터 과거 순으로 정렬한 값 (종목 x 시차 행렬, 0이 최신)
+
+        종목마다 회계연도 말이 다르므로 달력 기간 대신 '몇 번째 이전 기간'으로 정렬합니다.
+        """
+        rows = self._rows(line_item, statement).reset_index()
+        if rows.empty:
+            return pd.DataFrame(columns=range(depth))
+
+        rows = rows.drop_duplicates(['ticker', 'period'], keep='last')
+        rows = rows.sort_values(['ticker', 'period'], ascending=[True, False])
+        rows['lag'] = rows.groupby('ticker', observed=True).cumcount()
+        rows = rows[rows['lag'] < depth]
+        matrix = rows.pivot(index='ticker', columns='lag', values='value')
+        matrix.index = matrix.index.astype(str)
+        return matrix.reindex(columns=range(depth))
+
+    def growth(self, line_item, statement=None, lag=1):
+        """최신 기간 대비 lag 기간 전 성장률 (음수 기준값은 절댓값으로 나눔)"""
+        matrix = self.recent(line_item, statement, depth=lag + 1)
+        current, base = matrix[0], matrix[lag]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = (current - base) / base.abs()
+        return result.replace([np.inf, -np.inf], np.nan).rename(f"{line_item}_growth")
+
+    def cagr(self, line_item, statement=None, years=3):
+        """연평균 성장률 (시작/끝 값이 모두 양수인 종목만)"""
+        matrix = self.recent(line_item, statement, depth=years + 1)
+        current, base = matrix[0], matrix[years]
+        valid = (current > 0) & (base > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(valid, (current / base) ** (1.0 / years) - 1.0, np.nan)
+        return pd.Series(result, index=matrix.index, name=f"{line_item}_cagr")
+
+    def latest(self, line_item, statement=None):
+        """종목별 최신 회계기간 값"""
+        return self.recent(line_item, statement, depth=1)[0].rename(line_item)
+
+    def _latest_ratio(self, numerator, denominator, num_statement=None, den_statement=None):
+        """같은 회계기간의 분자/분모 비율 중 종목별 가장 최근 값"""
+        num = self.item(numerator, num_statement)
+        den = self.item(denominator, den_statement)
+        if num.empty or den.empty:
+            return pd.Series(dtype='float64')
+
+        num, den = num.align(den, join='inner')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = num / den.where(den != 0)
+        ratio = ratio.replace([np.inf, -np.inf], np.nan)
+        latest = ratio.ffill(axis=1).iloc[:, -1]
+        latest.index = latest.index.astype(str)
+        return latest
+
+    def metrics(self, market_caps=None, years=3):
+        """유니버스 전체 재무제표 기반 지표를 한 번에 계산 (종목 x METRIC_FIELDS DataFrame)
+
+        성장률은 종목별 최근 회계기간 대비 직전 기간, CAGR은 years 기간 전 대비이며,
+        FCF수익률은 market_caps(티커 → 시가총액)가 주어졌을 때만 계산합니다.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns = {
+                '매출성장률': self.growth('Total Revenue', 'financials'),
+                '매출_CAGR': self.cagr('Total Revenue', 'financials', years),
+                'EPS성장률': self.growth('Diluted EPS', 'financials'),
+                'EPS_CAGR': self.cagr('Diluted EPS', 'financials', years),
+                '매출총이익률': self._latest_ratio('Gross Profit', 'Total Revenue', 'financials', 'financials'),
+                '영업이익률': self._latest_ratio('Operating Income', 'Total Revenue', 'financials', 'financials'),
+                '순이익률': self._latest_ratio('Net Income', 'Total Revenue', 'financials', 'financials'),
+            }
+
+            # 발생액비율 = (순이익 - 영업현금흐름) / 총자산, 높을수록 현금 뒷받침이 약한 이익
+            accruals = self.item('Net Income', 'financials').sub(self.item('Operating Cash Flow', 'cash_flow'))
+            assets = self.item('Total Assets', 'balance_sheet')
+            if not accruals.empty and not assets.empty:
+                accruals, assets = accruals.align(assets, join='inner')
+                ratio = (accruals / assets.where(assets != 0)).ffill(axis=1)
+                columns['발생액비율'] = ratio.iloc[:, -1] if ratio.shape[1] else pd.Series(dtype='float64')
+
+            # 이자보상배율 = EBIT / 이자비용 (이자비용은 부호와 관계없이 크기로 사용)
+            ebit = self.item('EBIT', 'financials')
+            interest = self.item('Interest Expense', 'financials').abs()
+            if not ebit.empty and not interest.empty:
+                ebit, interest = ebit.align(interest, join='inner')
+                coverage = (ebit / interest.where(interest > 0)).replace([np.inf, -np.inf], np.nan)
+                coverage = coverage.ffill(axis=1)
+                columns['이자보상배율'] = coverage.iloc[:, -1] if coverage.shape[1] else pd.Series(dtype='float64')
+
+            if market_caps is not None:
+                caps = pd.Series(market_caps, dtype='float64')
+                fcf = self.latest('Free Cash Flow', 'cash_flow')
+                caps = caps.reindex(fcf.index)
+                columns['FCF수익률'] = fcf / caps.where(caps > 0)
+
+        for name, column in columns.items():
+            column.index = column.index.astype(str)
+        frame = pd.DataFrame(columns).reindex(columns=METRIC_FIELDS)
+        frame.index.name = 'ticker'
+        return frame.astype('float64')
@@ -1,4 +1,3 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -7,16 +6,81 @@ import os
 import json
 import re
 import pickle
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
 from pathlib import Path
-import google.generativeai as genai
 from dotenv import load_dotenv
+from universe_analytics import UniverseAnalytics, build_price_matrix
+from backtester import RATIO_FIELDS, STATEMENT_FIELDS, STATEMENT_CRITERIA, STATEMENT_POINTS, run_backtest
+from fundamentals_store import FundamentalsStore, project_fundamentals
+from statements_table import StatementsTable, METRIC_FIELDS
+from llm_cache import LLMResponseCache
+from strategy_parser import parse_strategy_text, build_strategy_config
+from ticker_index import TickerIndex
+from llm_backends import BACKEND_ENV, OfflineGeminiModel
+from llm_metrics import LLMMetrics
+from latency_budget import LatencyBudget
+from chart_resampling import ResamplePyramid, choose_bar_size
+from shared_universe import SharedUniverse
+from ohlcv_store import OHLCVStore
+from company_descriptions import DescriptionStore, template_description, build_description_prompt, parse_descriptions
 warnings.filterwarnings('ignore')
 
 # 환경변수 로드
 load_dotenv()
 
+# 프로세스 전체에서 동시에 진행할 수 있는 Gemini 호출 수 (API 동시 요청 제한 보호)
+LLM_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '4'))
+_LLM_SEMAPHORE = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+# 병렬 LLM 작업 기본 제한 시간 (초)
+LLM_TIMEOUT = 20
+
+# 단일 종목 분석 전체 시간 예산 (초)
+ANALYSIS_BUDGET = float(os.getenv('ANALYSIS_BUDGET_SECONDS', '10'))
+
+# 백그라운드 워밍업에서 디스크 캐시를 병렬로 읽는 스레드 수
+WARMUP_WORKERS = 8
+
+# 워밍업에서 API로 새로 받는 최대 종목 수 (나머지는 분석할 때 받음, 시작 직후 API 호출이 몰리지 않도록)
+WARMUP_PREFETCH_LIMIT = int(os.getenv('WARMUP_PREFETCH_LIMIT', '50'))
+
+# 디스크 캐시 일괄 로드에서 파일을 병렬로 읽는 스레드 수
+BULK_LOAD_WORKERS = 8
+
+# 공유 유니버스 테이블 / OHLCV 저장소 갱신 확인 주기 (초, 디스크 캐시 서명이 바뀌었을 때만 다시 발행)
+SHARED_UNIVERSE_INTERVAL = float(os.getenv('SHARED_UNIVERSE_INTERVAL', '60'))
+
+# OHLCV 저장소 압축 형식 사용 여부 (float32 가격 / 정수 거래량 / 배당·분할 런 길이 인코딩, ohlcv_store 참고)
+OHLCV_COMPACT = os.getenv('OHLCV_COMPACT', 'off').lower() in ('1', 'on', 'true')
+
+# 점진적 스크리닝에서 첫 결과를 빨리 내기 위해 먼저 읽는 디스크 캐시 종목 수
+SCREEN_FIRST_CHUNK = 16
+
+# 캐시된 종목이 없을 때 사용하는 기본 대형주
+DEFAULT_LARGE_CAPS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX",
+                      "CRM", "ADBE", "JPM", "JNJ", "PG", "KO", "V", "MA", "HD", "UNH", "PFE", "WMT"]
+
+def _read_cache_bytes(path):
+    """캐시 파일 원본 바이트 (일괄 로드의 I/O 단계)"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _snapshot_row(data):
+    """캐시 데이터 → (재무비율 스냅샷 행, 데이터 수집 시각)"""
+    return project_fundamentals(data.get('info')), data.get('last_updated')
+
+
+def _unpickle_snapshot(payload):
+    """캐시 파일 바이트 → (재무비율 스냅샷 행, 수집 시각) (프로세스 풀에서 실행, 작은 딕셔너리만 돌려보냄)"""
+    return _snapshot_row(pickle.loads(payload))
+
+
 class StockAnalyzer:
-    def __init__(self, cache_dir="stock_cache", cache_days=1, api_key=None):
+    def __init__(self, cache_dir="stock_cache", cache_days=1, api_key=None, llm_backend=None):
         self.stock_data = {}
         self.cache_dir = Path(cache_dir)
         self.cache_days = cache_days
@@ -24,20 +88,98 @@ class StockAnalyzer:
         # 캐시 디렉토리 생성
         self.cache_dir.mkdir(exist_ok=True)
         
-        # Gemini API 초기화
-        try:
+        # 유니버스 분석 (수익률/변동성/베타/상관계수) 결과 캐시
+        self.universe_analytics = UniverseAnalytics(self.cache_dir / "universe")
+        
+        # 워커 프로세스 간 공유 유니버스 테이블 (한 프로세스가 발행, 나머지는 읽기 전용 매핑)
+        self.shared_universe = SharedUniverse(self.cache_dir / "shared")
+        self._shared_refresher = None
+        
+        # 유니버스 일봉 OHLCV 열 단위 memmap 저장소 (pickle을 풀지 않고 종목별 구간만 읽음)
+        self.ohlcv_store = OHLCVStore(self.cache_dir / "ohlcv")
+        
+        # 일별 재무비율 스냅샷 저장소 (캐시 갱신 시 덮어써지는 과거 값 보존)
+        self.fundamentals_store = FundamentalsStore(self.cache_dir / "fundamentals")
+        
+        # 유니버스 재무제표 long-format 테이블 (데이터 버전별로 한 번만 생성)
+        self._statements_table = None
+        self._statements_version = None
+        # 종목별 재무제표 지표 (매출/EPS 성장률, 마진, 발생액, 이자보상배율) 메모
+        self._statement_metrics = None
+        self._statement_lock = threading.Lock()
+        
+        # API 수집은 한 번에 한 종목씩 (워밍업 / 백그라운드 작업 / 화면 스레드가 동시에 부를 수 있음)
+        self._fetch_lock = threading.Lock()
+        
+        # 캔들스틱 차트용 일/주/월봉 피라미드 캐시
+        self.chart_pyramids = ResamplePyramid()
+        
+        # 백그라운드 워밍업 (알려진 종목을 미리 메모리로 로드) 상태
+        self._warmup_thread = None
+        self._warmup_lock = threading.Lock()
+        self._warmup = {'status': 'idle', 'total': 0, 'done': 0, 'from_memory': 0, 'from_disk': 0,
+                        'fetched': 0, 'deferred': 0, 'failed': 0, 'started': None, 'finished': None}
+        
+        # 자연어 전략 후보 선별용 로컬 검색 색인 (데이터 버전별로 한 번만 생성)
+        self._ticker_index = None
+        self._ticker_index_version = None
+        
+        # Gemini 응답 캐시 (같은 프롬프트 반복 호출 방지)
+        self.model_name = 'gemini-2.5-flash'
+        self.llm_cache = LLMResponseCache(self.cache_dir / "llm")
+        
+        # 회사 설명 저장소 (사업 설명 기반으로 미리 생성, 데이터 갱신 시에만 다시 생성)
+        self.description_store = DescriptionStore(self.cache_dir / "descriptions" / "descriptions.json")
+        self._description_jobs = set()
+        self._description_lock = threading.Lock()
+        
+        # LLM 호출 계측 (호출 종류별 지연 시간, 토큰 수, 오류, 대체값 사용 횟수)
+        self.llm_metrics = LLMMetrics()
+        
+        # 독립적인 LLM 생성 작업을 병렬로 실행하는 스레드 풀
+        self.llm_timeout = LLM_TIMEOUT
+        self._llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY * 2, thread_name_prefix="gemini")
+        
+        # LLM 백엔드 선택: 매개변수 → 환경변수 → Gemini 순
+        # ('offline'이면 API 호출 없이 로컬 대체 모델 사용, 모델 객체를 직접 전달할 수도 있음)
+        if llm_backend is None:
+            llm_backend = os.getenv(BACKEND_ENV, 'gemini')
+        
+        # Gemini 클라이언트는 첫 호출 때 생성 (SDK import와 설정이 느려서 캐시만 쓰는 경로는 건너뜀)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._api_key = None
+        if not isinstance(llm_backend, str) or llm_backend.lower() == 'offline':
+            self._model = OfflineGeminiModel.from_env() if isinstance(llm_backend, str) else llm_backend
+            # 대체 모델 응답이 실제 Gemini 응답 캐시와 섞이지 않도록 모델 이름을 구분
+            self.model_name = f"offline:{type(self._model).__name__}"
+            self.gemini_available = True
+            print(f"🧪 대체 LLM 백엔드 사용: {type(self._model).__name__}")
+        else:
             # API 키 우선순위: 1) 매개변수로 전달된 키, 2) 환경변수
             if not api_key:
                 api_key = os.getenv('GEMINI_API_KEY')
             
             if api_key and api_key != 'your_gemini_api_key_here':
-                genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-2.5-flash')
+                self._api_key = api_key
                 self.gemini_available = True
             else:
                 self.gemini_available = False
-        except Exception as e:
-            self.gemini_available = False
+    
+    @property
+    def model(self):
+        """생성 모델 (Gemini SDK는 처음 사용할 때 import하고 설정)"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    try:
+                        import google.generativeai as genai
+                        genai.configure(api_key=self._api_key)
+                        self._model = genai.GenerativeModel(self.model_name)
+                    except Exception as e:
+                        self.gemini_available = False
+                        raise RuntimeError(f"Gemini 초기화 실패: {e}") from e
+        return self._model
     
     def _get_cache_path(self, ticker, data_type="info"):
         """캐시 파일 경로 생성"""
@@ -103,8 +245,21 @@ class StockAnalyzer:
         print(f"   🚀 총 사용 가능: {len(self.stock_data)}개")
     
     def _fetch_and_cache_stock_data(self, ticker):
-        """단일 종목 데이터를 API에서 가져와서 캐시에 저장"""
+        """단일 종목 데이터를 API에서 가져와서 캐시에 저장
+        
+        여러 스레드에서 동시에 불려도 잠금으로 한 번에 하나씩 받고, 기다리는 동안 다른 스레드가
+        같은 종목을 받았으면 다시 받지 않습니다.
+        """
+        with self._fetch_lock:
+            if ticker in self.stock_data:
+                return True
+            return self._fetch_stock_data(ticker)
+    
+    def _fetch_stock_data(self, ticker):
+        """_fetch_and_cache_stock_data 본체 (수집 잠금 안에서 호출)"""
         try:
+            # yfinance는 import가 느려서 실제로 데이터를 받을 때만 불러옴
+            import yfinance as yf
             stock = yf.Ticker(ticker)
             
             # 기본 정보
@@ -131,6 +286,14 @@ class StockAnalyzer:
             self.stock_data[ticker] = stock_data
             self._save_to_cache(ticker, stock_data)
             
+            # 재무제표가 바뀌었으므로 해당 종목의 재무제표 지표는 다시 계산
+            with self._statement_lock:
+                if self._statement_metrics is not None:
+                    self._statement_metrics = self._statement_metrics.drop(index=ticker, errors='ignore')
+            
+            # 재무비율 히스토리에 오늘 스냅샷 기록
+            self._record_fundamentals({ticker: info})
+            
             return True
             
         except Exception as e:
@@ -152,6 +315,91 @@ class StockAnalyzer:
         # 캐시에 없으면 API에서 가져와서 캐시에 저장
         return self._fetch_and_cache_stock_data(ticker)
     
+    def start_warmup(self, tickers, prefetch=True, max_workers=WARMUP_WORKERS, prefetch_limit=WARMUP_PREFETCH_LIMIT):
+        """알려진 종목들을 백그라운드 스레드에서 메모리로 미리 로드 (이미 실행 중이면 False)
+        
+        디스크 캐시는 스레드 풀로 병렬로 읽고, prefetch=True면 캐시가 없거나 만료된 종목 중 앞의
+        prefetch_limit개만 API에서 하나씩 받아서 저장합니다 (나머지는 'deferred'로 세고 분석할 때 받음).
+        호출은 바로 반환되며 진행 상황은 warmup_status()로 확인합니다.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        with self._warmup_lock:
+            if self._warmup_thread is not None and self._warmup_thread.is_alive():
+                return False
+            self._warmup = {'status': 'running', 'total': len(tickers), 'done': 0, 'from_memory': 0, 'from_disk': 0,
+                            'fetched': 0, 'deferred': 0, 'failed': 0, 'started': time.time(), 'finished': None}
+            self._warmup_thread = threading.Thread(
+                target=self._run_warmup, args=(tickers, prefetch, max_workers, prefetch_limit), name="warmup", daemon=True
+            )
+            self._warmup_thread.start()
+        return True
+    
+    def _warmup_count(self, field):
+        with self._warmup_lock:
+            self._warmup[field] += 1
+            self._warmup['done'] += 1
+    
+    def _run_warmup(self, tickers, prefetch, max_workers, prefetch_limit=WARMUP_PREFETCH_LIMIT):
+        """워밍업 스레드 본체 (디스크 캐시 병렬 로드 → 없는 종목 API 수집)"""
+        def load(ticker):
+            if ticker in self.stock_data:
+                return 'from_memory'
+            cached_data = self._load_from_cache(ticker)
+            if cached_data:
+                self.stock_data.setdefault(ticker, cached_data)
+                return 'from_disk'
+            return None
+        
+        missing = []
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup") as pool:
+                for ticker, source in zip(tickers, pool.map(load, tickers)):
+                    if source:
+                        self._warmup_count(source)
+                    else:
+                        missing.append(ticker)
+            
+            for i, ticker in enumerate(missing):
+                if not prefetch:
+                    self._warmup_count('failed')
+                elif i >= prefetch_limit and ticker not in self.stock_data:
+                    self._warmup_count('deferred')
+                elif ticker in self.stock_data or self._fetch_and_cache_stock_data(ticker):
+                    self._warmup_count('fetched')
+                else:
+                    self._warmup_count('failed')
+            status = 'done'
+        except Exception as e:
+            print(f"❌ 워밍업 실패: {e}")
+            status = 'failed'
+        
+        # 시점별 재무비율 히스토리가 수집 여부와 관계없이 매일 쌓이도록 기록
+        self.record_daily_snapshot()
+        
+        with self._warmup_lock:
+            self._warmup['status'] = status
+            self._warmup['finished'] = time.time()
+            summary = dict(self._warmup)
+        print(f"✅ 워밍업 완료: 메모리 {summary['from_memory']}개, 디스크 {summary['from_disk']}개, "
+              f"API {summary['fetched']}개, 나중에 수집 {summary['deferred']}개, 실패 {summary['failed']}개 ({summary['finished'] - summary['started']:.1f}초)")
+        
+        # 메모리에 올라온 종목의 회사 설명을 묶음으로 미리 생성 (조회 시 종목마다 따로 호출하지 않도록)
+        # 워밍업 완료 표시 뒤에 실행하므로 화면은 설명 생성을 기다리지 않음
+        if self.gemini_available:
+            try:
+                self.precompute_company_descriptions([ticker for ticker in tickers if ticker in self.stock_data])
+            except Exception as e:
+                print(f"❌ 회사 설명 미리 생성 실패: {e}")
+    
+    def warmup_status(self):
+        """워밍업 진행 상황 (status: idle / running / done / failed, progress: 0-1)"""
+        with self._warmup_lock:
+            status = dict(self._warmup)
+        status['progress'] = status['done'] / status['total'] if status['total'] else 1.0
+        if status['started'] is not None:
+            status['elapsed'] = round((status['finished'] or time.time()) - status['started'], 3)
+        return status
+    
     def get_cache_info(self):
         """캐시 상태 정보 반환"""
         cache_files = list(self.cache_dir.glob("*.pkl"))
@@ -173,6 +421,398 @@ class StockAnalyzer:
             'memory_loaded': len(self.stock_data)
         }
     
+    def _record_fundamentals(self, infos, day=None):
+        """재무비율 스냅샷을 히스토리 저장소에 추가"""
+        try:
+            return self.fundamentals_store.append_infos(infos, day)
+        except Exception as e:
+            print(f"재무비율 스냅샷 저장 실패: {e}")
+            return 0
+    
+    def snapshot_fundamentals(self, tickers=None):
+        """마지막 스냅샷 이후 수집된 종목의 재무비율을 수집 날짜로 기록 (tickers가 None이면 디스크 캐시 전체)
+        
+        각 행은 오늘 날짜가 아니라 데이터를 실제로 받은 날짜(last_updated)로 기록하므로, 오래된 캐시가
+        매일 새 시점의 값처럼 쌓이지 않습니다. 수집 날짜가 마지막 스냅샷 날짜 이전인 종목은 그 뒤로 바뀌지 않은
+        값이므로 건너뜁니다 (API에서 받을 때 이미 기록됨). 전체 기록은 stock_data에 올리지 않고 캐시 파일에서
+        재무비율 행만 만들어 씁니다.
+        """
+        try:
+            if tickers is not None:
+                loaded = [ticker for ticker in tickers if ticker in self.stock_data]
+                rows = {ticker: project_fundamentals(self.stock_data[ticker]['info']) for ticker in loaded}
+                updated = {ticker: self.stock_data[ticker].get('last_updated') for ticker in loaded}
+            else:
+                report = self.load_all_cached(target='snapshot')
+                rows, updated = report['snapshot'].to_dict('index'), report['last_updated']
+            
+            last = self.fundamentals_store.last_date()
+            by_day = {}
+            for ticker, when in updated.items():
+                if when is None:
+                    continue
+                day = pd.Timestamp(when).date()
+                if last is None or day > last:
+                    by_day.setdefault(day, {})[ticker] = rows[ticker]
+            # 추가 전용 저장소이므로 날짜 순서대로 기록
+            return sum(self.fundamentals_store.append(by_day[day], day) for day in sorted(by_day))
+        except Exception as e:
+            print(f"재무비율 스냅샷 저장 실패: {e}")
+            return 0
+    
+    def record_daily_snapshot(self):
+        """오늘 날짜 스냅샷이 아직 없으면 디스크 캐시에서 마지막 스냅샷 이후 수집된 종목 기록 (워밍업 / 갱신 스레드에서 하루 한 번)"""
+        if self.fundamentals_store.last_date() == datetime.now().date():
+            return 0
+        return self.snapshot_fundamentals()
+    
+    def get_fundamentals_asof(self, day, fields=None):
+        """특정 날짜 시점의 유니버스 재무비율 (티커 x 필드 DataFrame)"""
+        return self.fundamentals_store.asof(day, fields)
+    
+    def get_cached_tickers(self):
+        """캐시 디렉토리에 저장된 종목 티커 목록"""
+        suffix = "_info.pkl"
+        return sorted(p.name[:-len(suffix)] for p in self.cache_dir.glob(f"*{suffix}"))
+    
+    def load_cached_universe(self, include_expired=True):
+        """캐시된 모든 종목 데이터를 메모리로 로드 (만료된 캐시도 분석용으로 사용 가능)"""
+        return self.load_all_cached(include_expired)['loaded']
+    
+    def load_all_cached(self, include_expired=True, target='stock_data', workers=BULK_LOAD_WORKERS, processes=0):
+        """디스크 캐시 전체 일괄 로드 (디렉토리 한 번 스캔 + 병렬 읽기)
+        
+        만료 여부는 스캔할 때 얻은 수정 시각으로 한 번에 판단하고, 파일은 스레드 풀에서 병렬로 읽습니다.
+        target='stock_data'면 메모리에 없는 종목을 stock_data에 채우고, target='snapshot'이면
+        stock_data는 건드리지 않고 재무비율 스냅샷 표(티커 x 필드 DataFrame)만 만들어 'snapshot'으로,
+        종목별 데이터 수집 시각을 'last_updated'로 반환합니다.
+        target='price_history'면 마찬가지로 stock_data 대신 티커 → 주가 DataFrame을 'price_history'로 반환합니다.
+        processes > 0이면 스냅샷 생성 시 역직렬화를 프로세스 풀에서 실행합니다 (stock_data로 채울 때는
+        결과를 다시 직렬화해서 받아야 하므로 스레드만 사용).
+        """
+        started = time.perf_counter()
+        suffix = "_info.pkl"
+        cutoff = time.time() - timedelta(days=self.cache_days).total_seconds()
+        
+        entries = []
+        expired = 0
+        skipped = 0
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if not entry.name.endswith(suffix) or not entry.is_file():
+                    continue
+                ticker = entry.name[:-len(suffix)]
+                if target == 'stock_data' and ticker in self.stock_data:
+                    skipped += 1
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime < cutoff:
+                    expired += 1
+                    if not include_expired:
+                        continue
+                entries.append((ticker, entry.path, stat.st_size))
+        entries.sort()
+        
+        results = {}
+        failed = 0
+        if entries:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cache-load") as pool:
+                payloads = pool.map(_read_cache_bytes, [path for _, path, _ in entries])
+                if target == 'snapshot' and processes:
+                    with ProcessPoolExecutor(max_workers=processes) as procs:
+                        futures = {ticker: procs.submit(_unpickle_snapshot, payload)
+                                   for (ticker, _, _), payload in zip(entries, payloads)}
+                        for ticker, future in futures.items():
+                            try:
+                                results[ticker] = future.result()
+                            except Exception as e:
+                                print(f"캐시 로드 실패 ({ticker}): {e}")
+                                failed += 1
+                else:
+                    for (ticker, _, _), payload in zip(entries, payloads):
+                        try:
+                            data = pickle.loads(payload)
+                            if target == 'snapshot':
+                                results[ticker] = _snapshot_row(data)
+                            elif target == 'price_history':
+                                results[ticker] = data.get('price_history')
+                            else:
+                                results[ticker] = data
+                        except Exception as e:
+                            print(f"캐시 로드 실패 ({ticker}): {e}")
+                            failed += 1
+        
+        report = {'loaded': len(results), 'expired': expired, 'skipped': skipped, 'failed': failed}
+        if target == 'snapshot':
+            report['snapshot'] = pd.DataFrame.from_dict({ticker: row for ticker, (row, _) in results.items()}, orient='index')
+            report['last_updated'] = {ticker: updated for ticker, (_, updated) in results.items()}
+        elif target == 'price_history':
+            report['price_history'] = results
+        else:
+            for ticker, data in results.items():
+                self.stock_data.setdefault(ticker, data)
+        
+        seconds = time.perf_counter() - started
+        total_bytes = sum(size for _, _, size in entries)
+        report.update({
+            'files': len(entries),
+            'bytes': total_bytes,
+            'seconds': round(seconds, 3),
+            'files_per_sec': round(len(entries) / seconds, 1) if seconds > 0 else None,
+            'mb_per_sec': round(total_bytes / 1e6 / seconds, 1) if seconds > 0 else None,
+        })
+        if entries:
+            print(f"📦 캐시 일괄 로드: {report['loaded']}개 ({total_bytes / 1e6:.1f}MB, {report['seconds']}초, "
+                  f"{report['files_per_sec']} files/s, {report['mb_per_sec']} MB/s)")
+        return report
+    
+    def _cache_signature(self):
+        """디스크 캐시 파일 목록 / 수정 시각 / 크기 해시 (어느 프로세스에서 계산해도 같은 값)"""
+        parts = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith("_info.pkl") and entry.is_file():
+                    stat = entry.stat()
+                    parts.append(f"{entry.name}:{stat.st_mtime_ns}:{stat.st_size}")
+        return hashlib.sha1("|".join(sorted(parts)).encode('utf-8')).hexdigest()[:12]
+    
+    def build_ohlcv_store(self, force=False, compact=OHLCV_COMPACT):
+        """디스크 캐시의 주가를 열 단위 OHLCV 저장소로 발행 (캐시나 저장 형식이 바뀌었을 때만, 다른 프로세스가 발행 중이면 None)"""
+        signature = self._cache_signature()
+        pointer = self.ohlcv_store.current()
+        if (not force and pointer is not None and pointer.get('data_version') == signature
+                and pointer.get('compact', False) == compact):
+            return pointer
+        if not self.ohlcv_store.acquire():
+            return None
+        try:
+            histories = self.load_all_cached(target='price_history')['price_history']
+            pointer = self.ohlcv_store.build(histories, data_version=signature, compact=compact)
+            print(f"📦 OHLCV 저장소 발행: {pointer['tickers']}개 종목, {pointer['rows']}행 ({pointer['version']})")
+            return pointer
+        except Exception as e:
+            print(f"OHLCV 저장소 발행 실패: {e}")
+            return None
+        finally:
+            self.ohlcv_store.release()
+    
+    def get_cached_price_history(self, ticker, start=None, end=None):
+        """캐시된 일봉 (OHLCV 저장소가 디스크 캐시와 같은 버전이면 그 구간을, 아니면 종목 캐시의 price_history)"""
+        view = self.ohlcv_store.open()
+        if view is not None and view['data_version'] == self._cache_signature():
+            frame = OHLCVStore.frame(view, ticker, start, end)
+            if frame is not None:
+                return frame
+        if not self.get_stock_info(ticker):
+            return None
+        hist = self.stock_data[ticker].get('price_history')
+        if hist is None or (start is None and end is None):
+            return hist
+        index = pd.to_datetime(hist.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        mask = np.ones(len(hist), dtype=bool)
+        if start is not None:
+            mask &= index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= index <= pd.Timestamp(end)
+        return hist[mask]
+    
+    def get_data_version(self, tickers=None):
+        """종목 데이터 버전 문자열 (데이터가 갱신되면 바뀜, 결과 캐시 키로 사용)"""
+        if tickers is None:
+            tickers = sorted(set(self.stock_data) | set(self.get_cached_tickers()))
+        
+        parts = []
+        for ticker in sorted(tickers):
+            data = self.stock_data.get(ticker)
+            if data and data.get('last_updated'):
+                parts.append(f"{ticker}:{data['last_updated'].isoformat()}")
+                continue
+            
+            cache_path = self._get_cache_path(ticker)
+            if cache_path.exists():
+                stat = cache_path.stat()
+                parts.append(f"{ticker}:{stat.st_mtime_ns}:{stat.st_size}")
+            else:
+                parts.append(f"{ticker}:missing")
+        
+        return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:12]
+    
+    def get_universe_analytics(self, tickers=None, benchmark="SPY"):
+        """유니버스 수익률/변동성/베타/상관계수 분석 결과 반환"""
+        # 전체 유니버스는 OHLCV 저장소가 최신이면 캐시를 메모리로 올리지 않고 종가 구간만 읽어서 계산
+        view = self.ohlcv_store.open() if tickers is None else None
+        if view is not None and view['data_version'] == self._cache_signature():
+            return self.universe_analytics.compute(
+                self.stock_data,
+                tickers=view['tickers'],
+                benchmark=benchmark,
+                data_version=view['data_version'],
+                prices=lambda: OHLCVStore.price_matrix(view)
+            )
+        
+        if tickers is None:
+            self.load_cached_universe()
+            tickers = sorted(self.stock_data.keys())
+        else:
+            for ticker in tickers:
+                self.get_stock_info(ticker)
+        
+        return self.universe_analytics.compute(
+            self.stock_data,
+            tickers=tickers,
+            benchmark=benchmark,
+            data_version=self.get_data_version(tickers)
+        )
+    
+    def publish_shared_universe(self, tickers=None):
+        """유니버스 주가 행렬을 공유 테이블로 발행 (다른 프로세스가 발행 중이면 None)
+        
+        주가 행렬은 OHLCV 저장소의 종가 구간으로 구성하므로 캐시 전체를 stock_data로 올리지 않습니다.
+        두 저장소 모두 디스크 캐시 서명을 데이터 버전으로 씁니다.
+        """
+        signature = self._cache_signature()
+        self.build_ohlcv_store()
+        view = self.ohlcv_store.open()
+        if view is None or view['data_version'] != signature:
+            # 다른 프로세스가 OHLCV 저장소를 만드는 중이면 다음 확인 때 발행
+            return None
+        if not self.shared_universe.acquire():
+            return None
+        try:
+            dates, columns, closes = OHLCVStore.price_matrix(view, tickers)
+            pointer = self.shared_universe.publish(dates, columns, closes, data_version=signature)
+            print(f"📦 공유 유니버스 발행: {pointer['tickers']}개 종목, {pointer['days']}일 ({pointer['version']})")
+            return pointer
+        except Exception as e:
+            print(f"공유 유니버스 발행 실패: {e}")
+            return None
+        finally:
+            self.shared_universe.release()
+    
+    def get_shared_universe(self):
+        """공유 유니버스 테이블 뷰 (읽기 전용 memmap), 없거나 디스크 캐시와 버전이 다르면 None"""
+        view = self.shared_universe.open()
+        if view is None or view['data_version'] != self._cache_signature():
+            return None
+        return view
+    
+    def refresh_shared_universe(self):
+        """공유 테이블이 없거나 디스크 캐시 서명과 다르면 다시 발행 후 현재 뷰 반환"""
+        pointer = self.shared_universe.current()
+        if pointer is None or pointer.get('data_version') != self._cache_signature():
+            self.publish_shared_universe()
+        return self.shared_universe.open()
+    
+    def start_shared_universe_refresher(self, interval=SHARED_UNIVERSE_INTERVAL):
+        """공유 테이블 / OHLCV 저장소 갱신 스레드 시작 (이미 실행 중이면 False)
+        
+        interval초마다 디스크 캐시 서명을 확인해서 바뀌었을 때만 OHLCV 저장소와 공유 테이블을 차례로 다시 만듭니다.
+        모든 워커가 시작해도 발행 잠금을 잡은 프로세스 하나만 실제로 다시 만들고,
+        나머지는 새 버전이 올라오면 매핑만 바꿉니다.
+        """
+        if self._shared_refresher is not None and self._shared_refresher.is_alive():
+            return False
+        
+        def run():
+            while True:
+                try:
+                    self.refresh_shared_universe()
+                    self.record_daily_snapshot()
+                except Exception as e:
+                    print(f"공유 유니버스 갱신 실패: {e}")
+                time.sleep(interval)
+        
+        self._shared_refresher = threading.Thread(target=run, name="shared-universe", daemon=True)
+        self._shared_refresher.start()
+        return True
+    
+    def get_risk_metrics(self, ticker, benchmark="SPY", top_k=5):
+        """단일 종목의 위험 지표 (연간 변동성, 베타, 상관관계 높은 종목)"""
+        try:
+            result = self.get_universe_analytics(benchmark=benchmark)
+        except Exception as e:
+            print(f"유니버스 분석 실패: {e}")
+            return None
+        
+        metrics = result['metrics']
+        if ticker not in metrics.index:
+            return None
+        
+        row = metrics.loc[ticker]
+        return {
+            'ticker': ticker,
+            'benchmark': result['benchmark'],
+            '기간수익률': row['기간수익률'],
+            '연간변동성': row['연간변동성'],
+            '베타': row['베타'],
+            '상관관계_상위': UniverseAnalytics.top_correlated(result, ticker, top_k)
+        }
+    
+    def get_statements_table(self, tickers=None):
+        """유니버스 재무제표 long-format 테이블 (ticker, statement, line_item, period, value)"""
+        if tickers is None:
+            self.load_cached_universe()
+            tickers = sorted(self.stock_data.keys())
+        else:
+            for ticker in tickers:
+                self.get_stock_info(ticker)
+        
+        version = self.get_data_version(tickers)
+        if self._statements_table is None or self._statements_version != version:
+            self._statements_table = StatementsTable.load_or_build(
+                self.stock_data, self.cache_dir / "statements", version, tickers
+            )
+            self._statements_version = version
+        return self._statements_table
+    
+    def query_statement_item(self, line_item, statement=None, tickers=None):
+        """계정 과목 하나의 종목 x 회계기간 테이블 (예: 'Total Revenue')"""
+        return self.get_statements_table(tickers).item(line_item, statement)
+    
+    def get_statement_metrics(self, tickers=None):
+        """재무제표 기반 성장성/이익의 질 지표 (종목 x 지표 DataFrame)
+        
+        아직 계산하지 않은 종목만 모아서 한 번의 long-format 변환과 벡터 연산으로 계산합니다.
+        """
+        if tickers is None:
+            tickers = sorted(self.stock_data.keys())
+        
+        with self._statement_lock:
+            known = self._statement_metrics.index if self._statement_metrics is not None else []
+        missing = [ticker for ticker in tickers if ticker in self.stock_data and ticker not in known]
+        if missing:
+            market_caps = {ticker: self.stock_data[ticker]['info'].get('marketCap') for ticker in missing}
+            market_caps = {ticker: cap for ticker, cap in market_caps.items() if isinstance(cap, (int, float))}
+            try:
+                frame = StatementsTable.from_stock_data(self.stock_data, missing).metrics(market_caps)
+                # 재무제표가 없는 종목도 다시 계산하지 않도록 빈 행으로 기록
+                frame = frame.reindex(missing)
+                with self._statement_lock:
+                    # 계산하는 동안 다른 스레드가 먼저 추가한 종목은 중복으로 넣지 않음
+                    if self._statement_metrics is None:
+                        self._statement_metrics = frame
+                    else:
+                        frame = frame[~frame.index.isin(self._statement_metrics.index)]
+                        self._statement_metrics = pd.concat([self._statement_metrics, frame])
+            except Exception as e:
+                print(f"재무제표 지표 계산 실패: {e}")
+        
+        with self._statement_lock:
+            metrics = self._statement_metrics
+        if metrics is None:
+            return pd.DataFrame(columns=METRIC_FIELDS)
+        return metrics.reindex([t for t in tickers if t in metrics.index])
+    
+    def _get_statement_ratios(self, ticker):
+        """단일 종목의 재무제표 지표 (값이 없으면 'N/A')"""
+        metrics = self.get_statement_metrics([ticker])
+        if ticker not in metrics.index:
+            return {field: 'N/A' for field in METRIC_FIELDS}
+        row = metrics.loc[ticker]
+        return {field: float(row[field]) if np.isfinite(row[field]) else 'N/A' for field in METRIC_FIELDS}
+    
     def clear_cache(self, expired_only=True):
         """캐시 파일 정리"""
         cache_files = list(self.cache_dir.glob("*.pkl"))
@@ -225,6 +865,9 @@ class StockAnalyzer:
                 ratios['52주_고점대비'] = round((ratios['현재가'] / ratios['52주_최고가']) * 100, 2)
                 ratios['52주_저점대비'] = round((ratios['현재가'] / ratios['52주_최저가']) * 100, 2)
             
+            # 재무제표 기반 성장성/이익의 질 지표
+            ratios.update(self._get_statement_ratios(ticker))
+            
             # 수익성 등급 계산
             ratios['수익성_점수'] = self._calculate_profitability_score(ratios)
             ratios['안정성_점수'] = self._calculate_stability_score(ratios)
@@ -232,21 +875,47 @@ class StockAnalyzer:
             
             # 자연어 평가 점수 계산
             if natural_language_prompt:
-                ratios['자연어평가_점수'] = self._calculate_natural_language_score(ticker, ratios, natural_language_prompt)
-                ratios['자연어평가_관점'] = natural_language_prompt
-                # 5개 항목으로 종합점수 계산
-                ratios['종합_점수'] = round((ratios['수익성_점수'] + ratios['안정성_점수'] + ratios['가치평가_점수'] + ratios['자연어평가_점수']) / 4, 1)
+                score = self._calculate_natural_language_score(ticker, ratios, natural_language_prompt)
+                self._apply_natural_language_score(ratios, score, natural_language_prompt)
             else:
-                ratios['자연어평가_점수'] = 0
-                ratios['자연어평가_관점'] = None
-                # 기존 3개 항목으로 종합점수 계산
-                ratios['종합_점수'] = round((ratios['수익성_점수'] + ratios['안정성_점수'] + ratios['가치평가_점수']) / 3, 1)
+                self._apply_natural_language_score(ratios, None, None)
             
         except Exception as e:
             print(f"재무비율 계산 중 오류: {e}")
             
         return ratios
     
+    def _apply_natural_language_score(self, ratios, score, natural_language_prompt):
+        """자연어 평가 점수를 반영해서 종합 점수 갱신 (score가 None이면 기존 3개 항목만 사용)"""
+        if natural_language_prompt and score is not None:
+            ratios['자연어평가_점수'] = score
+            ratios['자연어평가_관점'] = natural_language_prompt
+            # 4개 항목으로 종합점수 계산
+            ratios['종합_점수'] = round((ratios['수익성_점수'] + ratios['안정성_점수'] + ratios['가치평가_점수'] + ratios['자연어평가_점수']) / 4, 1)
+        else:
+            ratios['자연어평가_점수'] = 0
+            ratios['자연어평가_관점'] = None
+            # 기존 3개 항목으로 종합점수 계산
+            ratios['종합_점수'] = round((ratios['수익성_점수'] + ratios['안정성_점수'] + ratios['가치평가_점수']) / 3, 1)
+        return ratios
+    
+    def calculate_financial_ratios_batch(self, tickers, natural_language_prompt=None, batch_size=20):
+        """여러 종목의 재무비율을 한 번에 계산 (자연어 평가 점수는 묶음 요청으로 계산)"""
+        results = {}
+        tickers = [ticker for ticker in tickers if self.get_stock_info(ticker)]
+        self.get_statement_metrics(tickers)
+        for ticker in tickers:
+            ratios = self.calculate_financial_ratios(ticker)
+            if ratios:
+                results[ticker] = ratios
+        
+        if natural_language_prompt and results:
+            scores = self.calculate_natural_language_scores_batch(results, natural_language_prompt, batch_size)
+            for ticker, ratios in results.items():
+                self._apply_natural_language_score(ratios, scores.get(ticker, 50), natural_language_prompt)
+        
+        return results
+    
     def _calculate_profitability_score(self, ratios):
         """수익성 점수 계산 (0-100)"""
         score = 50  # 기본 점수
@@ -327,6 +996,158 @@ class StockAnalyzer:
                 
         return max(0, min(100, score))
     
+    def _generate(self, prompt, call_type, data_version="", validate=None):
+        """Gemini 텍스트 생성 (응답 캐시 우선 사용)
+        
+        call_type은 캐시 유효기간 구분용('description', 'opinion', 'score', 'strategy', 'tickers')이며,
+        data_version이 바뀌면 같은 프롬프트라도 새로 생성합니다. 실패한 호출이나
+        validate(text)가 False인 응답은 캐시하지 않습니다.
+        """
+        key = self.llm_cache.make_key(prompt, self.model_name, call_type, data_version)
+        cached = self.llm_cache.get(key, call_type)
+        if cached is not None:
+            self.llm_metrics.record_cache_hit(call_type)
+            return cached
+        
+        # 동시 호출 수 제한 (빈 자리를 제한 시간까지만 기다리고, 요청 자체에도 제한 시간을 걸어서
+        # 응답이 멈춘 호출이 자리를 계속 차지하지 않도록 함)
+        queued = time.perf_counter()
+        self._acquire_llm_slot(call_type)
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt, request_options={'timeout': self.llm_timeout})
+            text = response.text
+        except Exception as e:
+            self.llm_metrics.record_call(call_type, time.perf_counter() - started, prompt,
+                                         error=e, queue_wait=started - queued)
+            raise
+        finally:
+            _LLM_SEMAPHORE.release()
+        self.llm_metrics.record_call(call_type, time.perf_counter() - started, prompt, text,
+                                     usage=getattr(response, 'usage_metadata', None), queue_wait=started - queued)
+        
+        if validate is None or validate(text):
+            self.llm_cache.put(key, call_type, text)
+        else:
+            self.llm_metrics.record_parse_failure(call_type)
+        return text
+    
+    def _generate_stream(self, prompt, call_type, data_version=""):
+        """Gemini 스트리밍 생성 (텍스트 조각 제너레이터, 캐시 적중 시 전체 텍스트 한 조각)
+        
+        스트림이 끝까지 완료된 경우에만 전체 텍스트를 응답 캐시에 저장합니다.
+        동시 호출 자리는 첫 조각을 받을 때까지만 차지하고, 조각을 호출자에게 넘기기 전에 반납합니다
+        (호출자가 천천히 소비하거나 백그라운드에서 나머지를 받는 동안 다른 호출이 막히지 않도록).
+        """
+        key = self.llm_cache.make_key(prompt, self.model_name, call_type, data_version)
+        cached = self.llm_cache.get(key, call_type)
+        if cached is not None:
+            self.llm_metrics.record_cache_hit(call_type)
+            yield cached
+            return
+        
+        parts = []
+        first_chunk = None
+        queued = time.perf_counter()
+        self._acquire_llm_slot(call_type)
+        holding = True
+        started = time.perf_counter()
+        try:
+            stream = self.model.generate_content(prompt, stream=True,
+                                                 request_options={'timeout': self.llm_timeout})
+            for chunk in stream:
+                text = chunk.text
+                if text:
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+                        _LLM_SEMAPHORE.release()
+                        holding = False
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            self.llm_metrics.record_call(call_type, time.perf_counter() - started, prompt, ''.join(parts),
+                                         error=e, queue_wait=started - queued, first_chunk=first_chunk)
+            raise
+        finally:
+            if holding:
+                _LLM_SEMAPHORE.release()
+        self.llm_metrics.record_call(call_type, time.perf_counter() - started, prompt, ''.join(parts),
+                                     queue_wait=started - queued, first_chunk=first_chunk or 0.0)
+        self.llm_cache.put(key, call_type, ''.join(parts))
+    
+    def _acquire_llm_slot(self, call_type):
+        """동시 호출 자리를 llm_timeout초까지 기다려서 획득 (못 얻으면 TimeoutError)"""
+        if not _LLM_SEMAPHORE.acquire(timeout=self.llm_timeout):
+            raise TimeoutError(f"LLM 동시 호출 대기 시간 초과 ({call_type})")
+    
+    @staticmethod
+    def _is_json_response(text):
+        """코드 블록을 제거했을 때 JSON으로 파싱되는 응답인지 확인"""
+        text = text.strip()
+        if '```json' in text:
+            text = text.split('```json')[1].split('```')[0]
+        elif '```' in text:
+            text = text.split('```')[1].split('```')[0]
+        try:
+            json.loads(text)
+            return True
+        except ValueError:
+            return False
+    
+    def run_llm_tasks(self, tasks, timeout=None):
+        """독립적인 LLM 작업들을 병렬 실행하고 제한 시간 안에 끝난 결과만 사용
+        
+        tasks는 이름 → (함수, 인자 튜플, 대체값[, 제한 시간]) 딕셔너리입니다. 제한 시간을 넘기거나
+        실패한 작업은 대체값을 반환하며, 넘긴 작업도 백그라운드에서 계속 진행되어 완료되면
+        응답 캐시에 저장되므로 다음 조회에서는 바로 표시됩니다.
+        """
+        timeout = self.llm_timeout if timeout is None else timeout
+        started = time.monotonic()
+        futures = {name: self._llm_executor.submit(task[0], *task[1]) for name, task in tasks.items()}
+        
+        results = {}
+        for name, future in futures.items():
+            task = tasks[name]
+            task_timeout = task[3] if len(task) > 3 else timeout
+            results[name] = self.wait_llm_result(future, task[2], started + task_timeout, name)
+        return results
+    
+    def submit_llm_task(self, fn, *args):
+        """LLM 작업을 스레드 풀에 제출하고 Future 반환 (결과는 wait_llm_result로 받음)"""
+        return self._llm_executor.submit(fn, *args)
+    
+    def wait_llm_result(self, future, placeholder, deadline=None, name="LLM"):
+        """deadline(time.monotonic 기준)까지 결과를 기다리고, 넘기거나 실패하면 대체값 반환"""
+        if deadline is None:
+            deadline = time.monotonic() + self.llm_timeout
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeoutError:
+            print(f"⏱️ LLM 작업 시간 초과 ({name})")
+            self.llm_metrics.record_fallback(name, 'deadline')
+        except Exception as e:
+            print(f"❌ LLM 작업 실패 ({name}): {e}")
+            self.llm_metrics.record_fallback(name, 'error')
+        return placeholder
+    
+    def get_llm_cache_stats(self):
+        """Gemini 응답 캐시 통계 (적중률, 항목 수, 디스크 사용량)"""
+        return self.llm_cache.stats()
+    
+    def get_llm_metrics(self, as_frame=False):
+        """LLM 호출 계측 결과 (호출 종류별 딕셔너리, as_frame=True면 전체 지연 시간 순 DataFrame)"""
+        return self.llm_metrics.to_frame() if as_frame else self.llm_metrics.summary()
+    
+    def export_llm_metrics(self, path=None):
+        """LLM 호출 계측 결과를 JSON 파일로 저장 (기본: {cache_dir}/llm_metrics.json)"""
+        if path is None:
+            path = self.cache_dir / "llm_metrics.json"
+        try:
+            return self.llm_metrics.export(path)
+        except Exception as e:
+            print(f"LLM 계측 결과 저장 실패: {e}")
+            return None
+    
     def _calculate_natural_language_score(self, ticker, ratios, natural_language_prompt):
         """자연어 관점 기반 점수 계산 (0-100)"""
         if not self.gemini_available:
@@ -379,28 +1200,185 @@ class StockAnalyzer:
 
 점수:"""
             
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+            response_text = self._generate(prompt, 'score', self.get_data_version([ticker]),
+                                           validate=lambda text: re.search(r'\d+', text) is not None).strip()
             
             # 응답에서 숫자만 추출
-            import re
             numbers = re.findall(r'\d+', response_text)
             if numbers:
                 score = int(numbers[0])
                 return max(0, min(100, score))
             else:
+                self.llm_metrics.record_fallback('score', 'parse_failure')
                 return 50  # 파싱 실패 시 기본값
                 
         except Exception as e:
             print(f"❌ 자연어 평가 점수 계산 실패: {e}")
+            self.llm_metrics.record_fallback('score', 'error')
             return 50  # 오류 시 기본값
     
-    def get_recommendation(self, ticker, natural_language_prompt=None):
-        """종목 추천 의견 생성"""
-        ratios = self.calculate_financial_ratios(ticker, natural_language_prompt)
+    def _natural_language_score_summary(self, ticker, ratios):
+        """묶음 평가 프롬프트에 넣을 종목 한 줄 요약"""
+        def fmt(value, scale=1, suffix=''):
+            if value == 'N/A' or value is None:
+                return 'N/A'
+            return f"{value * scale:.1f}{suffix}" if isinstance(value, (int, float)) else str(value)
+        
+        sector_info = self.get_sector_info(ticker) or {'sector': 'N/A'}
+        parts = [
+            f"업종 {sector_info['sector']}",
+            f"시가총액 {fmt(ratios.get('시가총액'), 1e-9, 'B$')}",
+            f"PER {fmt(ratios.get('PER'))}",
+            f"PBR {fmt(ratios.get('PBR'))}",
+            f"PSR {fmt(ratios.get('PSR'))}",
+            f"ROE {fmt(ratios.get('ROE'), 100, '%')}",
+            f"ROA {fmt(ratios.get('ROA'), 100, '%')}",
+            f"부채비율 {fmt(ratios.get('부채비율'))}",
+            f"배당수익률 {fmt(ratios.get('배당수익률'), 1, '%')}",
+            f"52주 고점 대비 {fmt(ratios.get('52주_고점대비'), 1, '%')}",
+            f"매출성장률 {fmt(ratios.get('매출성장률'), 100, '%')}",
+        ]
+        if sector_info['sector'] != 'N/A':
+            averages = self.get_sector_averages(sector_info['sector'])
+            parts.append(f"업종 평균 PER {averages['avg_per']}, PBR {averages['avg_pbr']}, ROE {averages['avg_roe']*100:.0f}%")
+        return f"- {ticker}: " + ", ".join(parts)
+    
+    @staticmethod
+    def _parse_batch_scores(response_text, tickers):
+        """묶음 평가 응답({"티커": 점수, ...})에서 유효한 점수만 추출"""
+        text = response_text.strip()
+        if '```json' in text:
+            text = text.split('```json')[1].split('```')[0]
+        elif '```' in text:
+            text = text.split('```')[1].split('```')[0]
+        
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            return {}
+        if isinstance(parsed, dict) and isinstance(parsed.get('scores'), dict):
+            parsed = parsed['scores']
+        if not isinstance(parsed, dict):
+            return {}
+        
+        scores = {}
+        for ticker in tickers:
+            value = parsed.get(ticker)
+            try:
+                scores[ticker] = max(0, min(100, int(round(float(value)))))
+            except (TypeError, ValueError):
+                continue
+        return scores
+    
+    def calculate_natural_language_scores_batch(self, ratios_by_ticker, natural_language_prompt, batch_size=20):
+        """여러 종목의 자연어 관점 점수를 묶음 요청으로 계산 (티커 → 0-100 점수)
+        
+        batch_size개씩 종목 요약을 한 프롬프트에 담아 JSON으로 점수를 받고,
+        응답에서 빠졌거나 파싱되지 않은 종목만 개별 요청으로 다시 계산합니다.
+        """
+        tickers = list(ratios_by_ticker.keys())
+        if not self.gemini_available:
+            return {ticker: 50 for ticker in tickers}
+        
+        scores = {}
+        for start in range(0, len(tickers), batch_size):
+            chunk = tickers[start:start + batch_size]
+            summaries = "\n".join(self._natural_language_score_summary(t, ratios_by_ticker[t]) for t in chunk)
+            prompt = f"""
+당신은 전문 주식 분석가입니다. 다음 관점에서 아래 종목들을 각각 0-100점으로 평가해주세요:
+
+**평가 관점**: "{natural_language_prompt}"
+
+**종목 정보**:
+{summaries}
+
+**평가 기준**:
+- 100점: 해당 관점에서 매우 우수
+- 80-99점: 해당 관점에서 우수
+- 60-79점: 해당 관점에서 양호
+- 40-59점: 해당 관점에서 보통
+- 20-39점: 해당 관점에서 미흡
+- 0-19점: 해당 관점에서 매우 미흡
+
+**주의사항**:
+1. 제시된 관점에만 집중해서 종목별로 독립적으로 평가하세요
+2. 다음 JSON 형태로만 응답하세요 (코드블록, 설명 없이 순수 JSON만):
+{{"scores": {{"티커": 0-100 정수, ...}}}}
+3. 위에 나온 모든 티커를 빠짐없이 포함하세요
+"""
+            try:
+                response_text = self._generate(prompt, 'score', self.get_data_version(chunk),
+                                               validate=self._is_json_response)
+                scores.update(self._parse_batch_scores(response_text, chunk))
+            except Exception as e:
+                print(f"❌ 자연어 평가 묶음 요청 실패: {e}")
+        
+        # 묶음 응답에서 빠진 종목은 개별 요청으로 보완
+        missing = [ticker for ticker in tickers if ticker not in scores]
+        if missing:
+            print(f"⚠️ 묶음 평가에서 누락된 {len(missing)}개 종목 개별 평가")
+            self.llm_metrics.record_fallback('score', 'batch_missing', len(missing))
+        for ticker in missing:
+            scores[ticker] = self._calculate_natural_language_score(ticker, ratios_by_ticker[ticker], natural_language_prompt)
+        
+        return scores
+    
+    def _llm_latency_estimate(self, call_type, default=2.0):
+        """호출 종류별 예상 소요 시간 (초, 계측된 중앙값이 없으면 default)"""
+        stats = self.llm_metrics.summary().get(call_type)
+        if stats and stats['latency_p50_ms'] is not None:
+            return stats['latency_p50_ms'] / 1000
+        return default
+    
+    def get_recommendation(self, ticker, natural_language_prompt=None, budget=None):
+        """종목 추천 의견 생성
+        
+        budget(초 또는 LatencyBudget)이 주어지면 남은 시간 안에서만 자연어 평가 점수를 계산하고,
+        시간이 부족하거나 제한 시간 안에 끝나지 않으면 중립 점수(50)를 사용합니다.
+        결과의 'budget' 항목에 단계별 실행 기록과 건너뛴 단계가 들어 있습니다.
+        """
+        budget = LatencyBudget.coerce(budget)
+        
+        with budget.stage('data'):
+            loaded = ticker in self.stock_data or self.get_stock_info(ticker)
+        if not loaded:
+            return None
+        
+        with budget.stage('ratios'):
+            ratios = self.calculate_financial_ratios(ticker)
         if not ratios:
             return None
-            
+        
+        if natural_language_prompt:
+            score = self._budgeted_natural_language_score(ticker, ratios, natural_language_prompt, budget)
+            self._apply_natural_language_score(ratios, score, natural_language_prompt)
+        
+        recommendation = self._build_recommendation(ticker, ratios)
+        recommendation['budget'] = budget.report()
+        return recommendation
+    
+    def _budgeted_natural_language_score(self, ticker, ratios, natural_language_prompt, budget):
+        """남은 시간 안에서 자연어 평가 점수 계산 (건너뛰거나 시간 초과면 중립 점수 50)"""
+        stage = 'natural_language_score'
+        if not budget.allows(stage, self._llm_latency_estimate('score')):
+            self.llm_metrics.record_fallback('score', 'budget_skipped')
+            return 50
+        
+        if budget.deadline is None:
+            with budget.stage(stage):
+                return self._calculate_natural_language_score(ticker, ratios, natural_language_prompt)
+        
+        started = time.monotonic()
+        future = self._llm_executor.submit(self._calculate_natural_language_score, ticker, ratios, natural_language_prompt)
+        score = self.wait_llm_result(future, None, budget.deadline, 'score')
+        if score is None:
+            budget.record(stage, 'degraded', time.monotonic() - started, "시간 초과로 중립 점수 사용")
+            return 50
+        budget.record(stage, 'done', time.monotonic() - started)
+        return score
+    
+    def _build_recommendation(self, ticker, ratios):
+        """종합 점수로 추천 의견 구성"""
         score = ratios.get('종합_점수', 0)
         
         if score >= 80:
@@ -427,28 +1405,48 @@ class StockAnalyzer:
             'ratios': ratios
         }
     
-    def compare_stocks(self, tickers):
-        """여러 종목 비교 분석"""
-        results = []
-        
-        for ticker in tickers:
-            if self.get_stock_info(ticker):
-                recommendation = self.get_recommendation(ticker)
-                if recommendation:
-                    results.append(recommendation)
+    def compare_stocks(self, tickers, natural_language_prompt=None):
+        """여러 종목 비교 분석 (자연어 관점이 있으면 묶음 요청으로 평가)"""
+        ratios_by_ticker = self.calculate_financial_ratios_batch(tickers, natural_language_prompt)
+        results = [self._build_recommendation(ticker, ratios) for ticker, ratios in ratios_by_ticker.items()]
         
         # 점수 순으로 정렬
         results.sort(key=lambda x: x['score'], reverse=True)
         
         return results
     
-    def strategy_recommend(self, tickers, strategy='comprehensive'):
-        """투자 전략별 종목 추천"""
-        results = []
+    def iter_strategy_recommend(self, tickers, strategy='comprehensive', top_k=10):
+        """투자 전략별 종목 추천을 종목이 처리될 때마다 반환하는 제너레이터
+        
+        메모리에 있는 종목, 유효한 디스크 캐시가 있는 종목, 새로 받아야 하는 종목(캐시가 없거나 만료) 순서로
+        처리해서 캐시가 일부만 있어도 첫 결과가 바로 나옵니다. 매번 {'ticker', 'result'(실패 시 None),
+        'done', 'total', 'top'(지금까지의 상위 top_k개, top_k가 None이면 전체)}를 반환합니다.
+        같은 점수는 입력 순서를 유지하므로 마지막 'top'은 한 번에 계산한 결과와 같습니다.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        position = {ticker: i for i, ticker in enumerate(tickers)}
+        in_memory = [ticker for ticker in tickers if ticker in self.stock_data]
+        # get_stock_info는 만료된 캐시를 다시 받으므로, 유효한 캐시만 디스크 묶음으로 분류
+        # (만료된 종목을 큰 묶음에 넣으면 묶음 안에서 하나씩 받느라 첫 결과가 늦어짐)
+        on_disk = [ticker for ticker in tickers
+                   if ticker not in self.stock_data and self._is_cache_valid(self._get_cache_path(ticker))]
+        queued = set(in_memory) | set(on_disk)
+        remote = [ticker for ticker in tickers if ticker not in queued]
+        
+        # 재무제표 지표는 호출마다 고정 비용이 커서 묶음 단위로 계산
+        # (디스크 캐시 종목은 첫 결과용 작은 묶음과 나머지 전체, 새로 받는 종목은 하나씩)
+        batches = [in_memory, on_disk[:SCREEN_FIRST_CHUNK], on_disk[SCREEN_FIRST_CHUNK:]] + [[ticker] for ticker in remote]
         
-        for ticker in tickers:
-            if self.get_stock_info(ticker):
-                ratios = self.calculate_financial_ratios(ticker)
+        results = []
+        done = 0
+        for batch in filter(None, batches):
+            loaded = [ticker for ticker in batch if self.get_stock_info(ticker)]
+            self.get_statement_metrics(loaded)
+            
+            for ticker in batch:
+                done += 1
+                result = None
+                ratios = self.calculate_financial_ratios(ticker) if ticker in self.stock_data else None
                 if ratios:
                     result = {
                         'ticker': ticker,
@@ -456,12 +1454,37 @@ class StockAnalyzer:
                         'score': self._calculate_strategy_score(ratios, strategy)
                     }
                     results.append(result)
-        
-        # 전략별 점수 순으로 정렬
-        results.sort(key=lambda x: x['score'], reverse=True)
-        
-        # 상위 10개만 반환
-        return results[:10]
+                    # 전략별 점수 순으로 정렬
+                    results.sort(key=lambda x: (-x['score'], position[x['ticker']]))
+                yield {
+                    'ticker': ticker,
+                    'result': result,
+                    'done': done,
+                    'total': len(tickers),
+                    'top': results[:top_k] if top_k else list(results),
+                }
+    
+    def strategy_recommend(self, tickers, strategy='comprehensive', progress=None):
+        """투자 전략별 종목 추천 (상위 10개)
+        
+        progress가 주어지면 종목 하나를 처리할 때마다 progress(처리 수, 전체 수, 현재 상위 10개)를 호출합니다.
+        """
+        snapshot = None
+        for snapshot in self.iter_strategy_recommend(tickers, strategy, top_k=10):
+            if progress:
+                progress(snapshot['done'], snapshot['total'], snapshot['top'])
+        return snapshot['top'] if snapshot else []
+    
+    def rank_by_total_score(self, tickers, progress=None):
+        """종목들을 종합 점수 순으로 정렬 (자연어 전략 후보 순위용)
+        
+        progress가 주어지면 종목 하나를 처리할 때마다 progress(처리 수, 전체 수, 현재까지 정렬된 결과)를 호출합니다.
+        """
+        snapshot = None
+        for snapshot in self.iter_strategy_recommend(tickers, 'comprehensive', top_k=None):
+            if progress:
+                progress(snapshot['done'], snapshot['total'], snapshot['top'])
+        return snapshot['top'] if snapshot else []
     
     def _calculate_strategy_score(self, ratios, strategy):
         """전략별 점수 계산"""
@@ -579,12 +1602,40 @@ class StockAnalyzer:
     def _growth_strategy(self, ratios):
         """성장 투자 전략"""
         score = 50
-        
-        # ROE 기반 성장성 평가
-        roe = ratios.get('ROE', 'N/A')
-        if roe != 'N/A' and roe is not None and roe > 0.15:
-            score += 20
-        
+
+        revenue_growth = ratios.get('매출성장률', 'N/A')
+        eps_growth = ratios.get('EPS성장률', 'N/A')
+
+        if revenue_growth != 'N/A' or eps_growth != 'N/A':
+            # 재무제표 기반 실제 성장률 평가
+            if revenue_growth != 'N/A':
+                if revenue_growth > 0.20:
+                    score += 20
+                elif revenue_growth > 0.10:
+                    score += 15
+                elif revenue_growth > 0.05:
+                    score += 5
+                elif revenue_growth < 0:
+                    score -= 15
+
+            if eps_growth != 'N/A':
+                if eps_growth > 0.20:
+                    score += 15
+                elif eps_growth > 0.10:
+                    score += 10
+                elif eps_growth < 0:
+                    score -= 10
+        else:
+            # 재무제표가 없으면 ROE로 성장성 대체 평가
+            roe = ratios.get('ROE', 'N/A')
+            if roe != 'N/A' and roe is not None and roe > 0.15:
+                score += 20
+
+        # 현금 뒷받침이 약한 이익 성장은 감점 (발생액비율 10% 초과)
+        accruals = ratios.get('발생액비율', 'N/A')
+        if accruals != 'N/A' and accruals > 0.10:
+            score -= 10
+
         # PSR로 성장주 특성 확인 (높은 PSR은 성장 기대)
         psr = ratios.get('PSR', 'N/A')
         if psr != 'N/A' and psr is not None:
@@ -600,6 +1651,70 @@ class StockAnalyzer:
         
         return max(0, min(100, score))
     
+    def backtest_strategy(self, strategy='comprehensive', tickers=None, top_k=10, rebalance='M',
+                          cost_bps=10.0, start=None, end=None):
+        """투자 전략 백테스트 (기본 전략 이름 또는 커스텀 전략 설정)
+        
+        저장된 주가 히스토리로 리밸런싱 시점마다 전략 점수 상위 top_k 종목을 동일가중으로 보유하고,
+        수익률/최대낙폭/회전율을 반환합니다. 재무비율은 히스토리 저장소의 시점별 스냅샷만 사용하며,
+        기간 내 스냅샷이 2개 미만이면 현재 재무비율을 과거 날짜에 쓰게 되어 미래 정보가 섞이므로 실행하지 않고 None을 반환합니다.
+        재무제표 지표(성장률/마진 등)는 시점별 히스토리가 없으므로 사용하지 않고, 이 지표를 필수 조건으로 쓰는
+        커스텀 전략도 실행하지 않습니다.
+        """
+        criteria = (strategy.get('criteria') or {}) if isinstance(strategy, dict) else {}
+        statement_keys = [key for key in STATEMENT_CRITERIA if criteria.get(key) is not None]
+        if statement_keys:
+            print(f"재무제표 지표 조건({', '.join(statement_keys)})은 시점별 히스토리가 없어 백테스트할 수 없습니다.")
+            return None
+        
+        # 전체 유니버스는 공유 테이블(없으면 OHLCV 저장소)이 최신이면 캐시 전체를 메모리로 올리지 않고 매핑된 데이터 사용
+        shared = self.get_shared_universe() if tickers is None else None
+        view = self.ohlcv_store.open() if tickers is None and shared is None else None
+        if shared is not None:
+            dates, columns, closes = SharedUniverse.price_matrix(shared)
+        elif view is not None and view['data_version'] == self._cache_signature():
+            dates, columns, closes = OHLCVStore.price_matrix(view)
+        else:
+            if tickers is None:
+                self.load_cached_universe()
+                tickers = sorted(self.stock_data.keys())
+            else:
+                tickers = [ticker for ticker in tickers if self.get_stock_info(ticker)]
+            dates, columns, closes = build_price_matrix(self.stock_data, tickers)
+        if start is not None or end is not None:
+            mask = np.ones(len(dates), dtype=bool)
+            if start is not None:
+                mask &= dates >= pd.Timestamp(start)
+            if end is not None:
+                mask &= dates <= pd.Timestamp(end)
+            dates, closes = dates[mask], closes[mask]
+        
+        if len(dates) < 2 or not columns:
+            print("백테스트에 사용할 주가 데이터가 부족합니다.")
+            return None
+        
+        # 시점별(point-in-time) 재무비율 스냅샷이 2개 이상 있어야 실행
+        fundamentals = self.fundamentals_store.panel(dates[0], dates[-1], fields=RATIO_FIELDS)
+        if not fundamentals or len(fundamentals['PER'].index) < 2:
+            print("시점별 재무비율 스냅샷이 2개 미만이라 백테스트를 실행하지 않습니다 (현재 값을 쓰면 미래 정보가 섞임).")
+            return None
+        # 첫 스냅샷 이전 구간은 재무비율을 알 수 없으므로 제외
+        mask = dates >= fundamentals['PER'].index[0]
+        dates, closes = dates[mask], closes[mask]
+        
+        result = run_backtest(
+            dates, columns, closes,
+            fundamentals=fundamentals,
+            strategy=strategy,
+            top_k=top_k,
+            rebalance=rebalance,
+            cost_bps=cost_bps
+        )
+        if result:
+            result['point_in_time'] = True
+            result['excluded_fields'] = list(STATEMENT_FIELDS)
+        return result
+    
     def get_strategy_description(self, strategy):
         """전략 설명 반환"""
         descriptions = {
@@ -626,7 +1741,7 @@ class StockAnalyzer:
             'growth': {
                 'name': '성장주 투자',
                 'description': '높은 성장 잠재력을 가진 기업을 찾는 전략',
-                'criteria': 'ROE > 15%, 현재가가 52주 최고가 근처'
+                'criteria': '매출/EPS 성장률 > 10% (재무제표 없으면 ROE > 15%), 현재가가 52주 최고가 근처'
             },
             'comprehensive': {
                 'name': '종합 투자',
@@ -642,6 +1757,7 @@ class StockAnalyzer:
             if ticker not in self.stock_data:
                 self.get_stock_info(ticker)
             
+            import yfinance as yf
             stock = yf.Ticker(ticker)
             hist_data = stock.history(period=period)
             
@@ -656,6 +1772,26 @@ class StockAnalyzer:
             print(f"주가 데이터 수집 실패 ({ticker}): {e}")
             return None
     
+    def get_chart_data(self, ticker, period="3mo", width=None):
+        """캔들스틱 차트용 OHLCV (봉 데이터, 봉 크기)
+        
+        기간과 차트 너비(px)에 맞춰 일봉/주봉/월봉을 자동으로 고르고, 티커별로 세 단계를 미리 만들어 둔
+        피라미드에서 기간만큼 잘라서 반환합니다. 주가를 받지 못하면 캐시된 1년 주가로 대신합니다.
+        """
+        bar_size = choose_bar_size(period, width)
+        entry = self.chart_pyramids.get(ticker, period)
+        if entry is None:
+            hist_data = self.get_price_history(ticker, period)
+            covered = period
+            if hist_data is None:
+                # 캐시된 주가는 최근 1년치
+                hist_data = self.get_cached_price_history(ticker)
+                covered = '1y'
+            if hist_data is None or hist_data.empty:
+                return None, bar_size
+            entry = self.chart_pyramids.put(ticker, covered, hist_data)
+        return ResamplePyramid.slice(entry, period, bar_size), bar_size
+    
     def print_analysis(self, ticker):
         """분석 결과 출력"""
         # 먼저 데이터 수집
@@ -736,69 +1872,60 @@ class StockAnalyzer:
         
         return sector_averages.get(sector, {'avg_per': 18.0, 'avg_pbr': 2.5, 'avg_roe': 0.14})
     
-    def get_natural_language_investment_opinion(self, ticker, natural_language_prompt=None):
-        """자연어 기반 투자 의견 생성"""
-        if not self.gemini_available:
-            return "Gemini API가 설정되지 않아 투자 의견을 생성할 수 없습니다."
-        
-        try:
-            # 재무 데이터 가져오기
-            ratios = self.calculate_financial_ratios(ticker)
-            if not ratios:
-                return "재무 데이터를 가져올 수 없어 투자 의견을 생성할 수 없습니다."
-            
-            # 업종 정보 가져오기
-            sector_info = self.get_sector_info(ticker)
-            sector_averages = None
-            
-            if sector_info and sector_info['sector'] != 'N/A':
-                sector_averages = self.get_sector_averages(sector_info['sector'])
+    def _build_investment_opinion_prompt(self, ticker, ratios, natural_language_prompt=None):
+        """투자 의견 생성 프롬프트 구성 (일반/스트리밍 생성에서 공통 사용)"""
+        # 업종 정보 가져오기
+        sector_info = self.get_sector_info(ticker)
+        sector_averages = None
+        
+        if sector_info and sector_info['sector'] != 'N/A':
+            sector_averages = self.get_sector_averages(sector_info['sector'])
+        
+        # 업종 비교 분석 텍스트 생성
+        sector_comparison = ""
+        if sector_averages:
+            per = ratios.get('PER', 'N/A')
+            pbr = ratios.get('PBR', 'N/A')
+            roe = ratios.get('ROE', 'N/A')
             
-            # 업종 비교 분석 텍스트 생성
-            sector_comparison = ""
-            if sector_averages:
-                per = ratios.get('PER', 'N/A')
-                pbr = ratios.get('PBR', 'N/A')
-                roe = ratios.get('ROE', 'N/A')
-                
-                sector_comparison = f"""
+            sector_comparison = f"""
 업종 비교:
 - 업종: {sector_info['sector']}
 - PER: {per} (업종평균: {sector_averages['avg_per']})
 - PBR: {pbr} (업종평균: {sector_averages['avg_pbr']})
 - ROE: {roe*100 if roe != 'N/A' and roe is not None else 'N/A'}% (업종평균: {sector_averages['avg_roe']*100}%)
 """
+        
+        # 자연어 관점 요청이 있으면 추가
+        natural_language_section = ""
+        if natural_language_prompt and natural_language_prompt.strip():
+            prompt_lower = natural_language_prompt.lower()
             
-            # 자연어 관점 요청이 있으면 추가
-            natural_language_section = ""
-            if natural_language_prompt and natural_language_prompt.strip():
-                prompt_lower = natural_language_prompt.lower()
-                
-                # 배당 관련 키워드 확인
-                dividend_keywords = ['배당', 'dividend', '디비던드', '배당금', '배당수익률']
-                is_dividend_focused = any(keyword in prompt_lower for keyword in dividend_keywords)
-                
-                # ESG 관련 키워드 확인
-                esg_keywords = ['esg', '환경', '지배구조', '사회', '지속가능', '윤리', '책임경영']
-                is_esg_focused = any(keyword in prompt_lower for keyword in esg_keywords)
-                
-                # 성장성 관련 키워드 확인
-                growth_keywords = ['성장', '성장성', 'growth', '확장', '발전', '혁신', '미래']
-                is_growth_focused = any(keyword in prompt_lower for keyword in growth_keywords)
-                
-                # 안정성 관련 키워드 확인
-                stability_keywords = ['안정', '안정성', 'stability', '리스크', '위험', '부채', '재무건전성']
-                is_stability_focused = any(keyword in prompt_lower for keyword in stability_keywords)
-                
-                # 밸류에이션 관련 키워드 확인
-                valuation_keywords = ['밸류', '가치', 'valuation', 'per', 'pbr', '저평가', '고평가', '적정가']
-                is_valuation_focused = any(keyword in prompt_lower for keyword in valuation_keywords)
+            # 배당 관련 키워드 확인
+            dividend_keywords = ['배당', 'dividend', '디비던드', '배당금', '배당수익률']
+            is_dividend_focused = any(keyword in prompt_lower for keyword in dividend_keywords)
+            
+            # ESG 관련 키워드 확인
+            esg_keywords = ['esg', '환경', '지배구조', '사회', '지속가능', '윤리', '책임경영']
+            is_esg_focused = any(keyword in prompt_lower for keyword in esg_keywords)
+            
+            # 성장성 관련 키워드 확인
+            growth_keywords = ['성장', '성장성', 'growth', '확장', '발전', '혁신', '미래']
+            is_growth_focused = any(keyword in prompt_lower for keyword in growth_keywords)
+            
+            # 안정성 관련 키워드 확인
+            stability_keywords = ['안정', '안정성', 'stability', '리스크', '위험', '부채', '재무건전성']
+            is_stability_focused = any(keyword in prompt_lower for keyword in stability_keywords)
+            
+            # 밸류에이션 관련 키워드 확인
+            valuation_keywords = ['밸류', '가치', 'valuation', 'per', 'pbr', '저평가', '고평가', '적정가']
+            is_valuation_focused = any(keyword in prompt_lower for keyword in valuation_keywords)
+            
+            if is_dividend_focused:
+                dividend_yield = ratios.get('배당수익률', 'N/A')
+                dividend_info = f"\n- 현재 배당수익률: {dividend_yield:.2f}%" if dividend_yield != 'N/A' and dividend_yield is not None else "\n- 배당수익률: 정보 없음"
                 
-                if is_dividend_focused:
-                    dividend_yield = ratios.get('배당수익률', 'N/A')
-                    dividend_info = f"\n- 현재 배당수익률: {dividend_yield:.2f}%" if dividend_yield != 'N/A' and dividend_yield is not None else "\n- 배당수익률: 정보 없음"
-                    
-                    natural_language_section = f"""
+                natural_language_section = f"""
 
 특별 요청 관점: "{natural_language_prompt}"
 {dividend_info}
@@ -809,9 +1936,9 @@ class StockAnalyzer:
 - 배당 정책의 안정성
 위 관점에서의 상세한 평가를 포함해서 답변해주세요.
 """
-                
-                elif is_esg_focused:
-                    natural_language_section = f"""
+            
+            elif is_esg_focused:
+                natural_language_section = f"""
 
 특별 요청 관점: "{natural_language_prompt}"
 
@@ -822,16 +1949,22 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
 - 현재 재무 지표가 ESG 경영과 어떻게 연관되는지
 위 관점에서의 평가를 포함해서 답변해주세요.
 """
-                
-                elif is_growth_focused:
-                    price_vs_high = ratios.get('52주_고점대비', 'N/A')
-                    roe = ratios.get('ROE', 'N/A')
-                    roe_display = f"{roe*100:.1f}%" if roe != 'N/A' and roe is not None else "정보 없음"
-                    growth_info = f"""
+            
+            elif is_growth_focused:
+                price_vs_high = ratios.get('52주_고점대비', 'N/A')
+                roe = ratios.get('ROE', 'N/A')
+                roe_display = f"{roe*100:.1f}%" if roe != 'N/A' and roe is not None else "정보 없음"
+                revenue_growth = ratios.get('매출성장률', 'N/A')
+                eps_growth = ratios.get('EPS성장률', 'N/A')
+                revenue_display = f"{revenue_growth*100:.1f}%" if revenue_growth != 'N/A' else "정보 없음"
+                eps_display = f"{eps_growth*100:.1f}%" if eps_growth != 'N/A' else "정보 없음"
+                growth_info = f"""
 - 52주 최고가 대비: {price_vs_high}%
-- ROE (수익성 지표): {roe_display}"""
-                    
-                    natural_language_section = f"""
+- ROE (수익성 지표): {roe_display}
+- 매출 성장률 (전년 대비): {revenue_display}
+- EPS 성장률 (전년 대비): {eps_display}"""
+                
+                natural_language_section = f"""
 
 특별 요청 관점: "{natural_language_prompt}"
 {growth_info}
@@ -843,12 +1976,12 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
 - 향후 확장 및 혁신 가능성
 위 관점에서의 평가를 포함해서 답변해주세요.
 """
+            
+            elif is_stability_focused:
+                debt_ratio = ratios.get('부채비율', 'N/A')
+                stability_info = f"\n- 부채비율: {debt_ratio:.1f}" if debt_ratio != 'N/A' and debt_ratio is not None else "\n- 부채비율: 정보 없음"
                 
-                elif is_stability_focused:
-                    debt_ratio = ratios.get('부채비율', 'N/A')
-                    stability_info = f"\n- 부채비율: {debt_ratio:.1f}" if debt_ratio != 'N/A' and debt_ratio is not None else "\n- 부채비율: 정보 없음"
-                    
-                    natural_language_section = f"""
+                natural_language_section = f"""
 
 특별 요청 관점: "{natural_language_prompt}"
 {stability_info}
@@ -860,15 +1993,15 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
 - 리스크 대비 수익률의 적정성
 위 관점에서의 평가를 포함해서 답변해주세요.
 """
-                
-                elif is_valuation_focused:
-                    per = ratios.get('PER', 'N/A')
-                    pbr = ratios.get('PBR', 'N/A')
-                    valuation_info = f"""
+            
+            elif is_valuation_focused:
+                per = ratios.get('PER', 'N/A')
+                pbr = ratios.get('PBR', 'N/A')
+                valuation_info = f"""
 - PER: {per} (업종평균: {sector_averages.get('avg_per', 'N/A') if sector_averages else 'N/A'})
 - PBR: {pbr} (업종평균: {sector_averages.get('avg_pbr', 'N/A') if sector_averages else 'N/A'})"""
-                    
-                    natural_language_section = f"""
+                
+                natural_language_section = f"""
 
 특별 요청 관점: "{natural_language_prompt}"
 {valuation_info}
@@ -880,15 +2013,15 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
 - 향후 재평가 가능성
 위 관점에서의 평가를 포함해서 답변해주세요.
 """
-                
-                else:
-                    natural_language_section = f"""
+            
+            else:
+                natural_language_section = f"""
 
 특별 요청 관점: "{natural_language_prompt}"
 위 관점에서의 평가도 포함해서 답변해주세요.
 """
-            
-            prompt = f"""
+        
+        prompt = f"""
 당신은 전문 투자 분석가입니다. {ticker} 종목에 대한 2-3줄의 간결한 투자 의견을 작성해주세요.
 
 재무 지표:
@@ -921,62 +2054,243 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
 
 {ticker} 투자 의견:
 """
+        return prompt
+    
+    def get_natural_language_investment_opinion(self, ticker, natural_language_prompt=None):
+        """자연어 기반 투자 의견 생성"""
+        if not self.gemini_available:
+            return "Gemini API가 설정되지 않아 투자 의견을 생성할 수 없습니다."
+        
+        try:
+            # 재무 데이터 가져오기
+            ratios = self.calculate_financial_ratios(ticker)
+            if not ratios:
+                return "재무 데이터를 가져올 수 없어 투자 의견을 생성할 수 없습니다."
             
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # 응답 정리
-            lines = response_text.split('\n')
-            filtered_lines = [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
-            
-            # 2-3줄로 제한
-            if len(filtered_lines) > 3:
-                filtered_lines = filtered_lines[:3]
+            prompt = self._build_investment_opinion_prompt(ticker, ratios, natural_language_prompt)
+            response_text = self._generate(prompt, 'opinion', self.get_data_version([ticker]))
             
-            return ' '.join(filtered_lines)
+            # 응답 정리 ('#' 제목 줄과 빈 줄 제외, 2-3줄로 제한)
+            return ''.join(self._trim_opinion_chunks([response_text]))
             
         except Exception as e:
             print(f"❌ 투자 의견 생성 실패: {e}")
+            self.llm_metrics.record_fallback('opinion', 'error')
             return "투자 의견을 생성하는 중 오류가 발생했습니다."
-
-    def get_company_description(self, ticker):
-        """Gemini AI를 사용한 회사 설명 생성"""
+    
+    def stream_natural_language_investment_opinion(self, ticker, natural_language_prompt=None, budget=None):
+        """자연어 기반 투자 의견을 생성되는 대로 조각 단위로 반환하는 제너레이터
+        
+        get_natural_language_investment_opinion과 같은 프롬프트와 줄 정리 규칙을 쓰며,
+        조각들을 이어 붙이면 일반 생성 결과와 같은 문자열이 됩니다.
+        budget(LatencyBudget)의 남은 시간이 예상 소요 시간보다 적으면 생성하지 않고 안내 문구만 반환하며,
+        생성 도중 예산이 끝나면 그때까지의 조각만 내보내고 단계를 'degraded'로 기록합니다.
+        """
         if not self.gemini_available:
-            return "Gemini API가 설정되지 않아 회사 설명을 생성할 수 없습니다."
+            yield "Gemini API가 설정되지 않아 투자 의견을 생성할 수 없습니다."
+            return
+        
+        if budget is not None and not budget.allows('opinion', self._llm_latency_estimate('opinion')):
+            yield "시간 예산이 부족해 AI 투자 의견을 생략했습니다. 잠시 후 다시 분석하면 표시됩니다."
+            return
+        started = time.monotonic()
+        
+        ratios = self.calculate_financial_ratios(ticker)
+        if not ratios:
+            yield "재무 데이터를 가져올 수 없어 투자 의견을 생성할 수 없습니다."
+            return
         
+        emitted = False
         try:
-            prompt = f"""
-{ticker} 종목에 대해서 간단하고 명확한 회사 설명을 3-4줄로 작성해주세요.
-
-다음 내용을 포함해주세요:
-1. 회사의 주요 사업 분야
-2. 어떤 제품이나 서비스를 제공하는지
-3. 업계에서의 위치나 특징
-
-한국어로 작성하고, 투자자가 이해하기 쉽게 간결하고 명확하게 설명해주세요.
-예시 형태: "Apple Inc.(AAPL)은 아이폰, 맥, 아이패드 등의 혁신적인 전자제품을 설계, 제조, 판매하는 글로벌 기술 기업입니다. iOS와 macOS 운영체제, App Store 등의 소프트웨어 플랫폼도 운영하며, 전 세계적으로 강력한 브랜드 충성도를 보유하고 있습니다."
+            prompt = self._build_investment_opinion_prompt(ticker, ratios, natural_language_prompt)
+            chunks = self._generate_stream(prompt, 'opinion', self.get_data_version([ticker]))
+            expired = False
+            for piece in self._trim_opinion_chunks(chunks):
+                emitted = True
+                yield piece
+                if budget is not None and budget.expired():
+                    expired = True
+                    break
+            # 줄 제한이나 시간 예산으로 먼저 끝나면 나머지는 백그라운드에서 받아서 전체 응답이 캐시에 저장되도록 함
+            self._llm_executor.submit(self._drain_stream, chunks)
+            if expired:
+                budget.record('opinion', 'degraded', time.monotonic() - started, "시간 초과로 생성 중단")
+                self.llm_metrics.record_fallback('opinion', 'deadline')
+                yield " (시간 예산 초과로 여기까지만 표시합니다)"
+            elif budget is not None:
+                budget.record('opinion', 'done', time.monotonic() - started)
+        except Exception as e:
+            print(f"❌ 투자 의견 스트리밍 실패: {e}")
+            self.llm_metrics.record_fallback('opinion', 'error')
+            if budget is not None:
+                budget.record('opinion', 'degraded', time.monotonic() - started, "생성 실패로 대체 문구 사용")
+            yield (" " if emitted else "") + "투자 의견을 생성하는 중 오류가 발생했습니다."
+    
+    @staticmethod
+    def _drain_stream(chunks):
+        """스트림의 남은 조각을 끝까지 소비 (완료된 응답만 캐시에 저장되므로)"""
+        try:
+            for _ in chunks:
+                pass
+        except Exception as e:
+            print(f"❌ 스트림 나머지 수신 실패: {e}")
+    
+    @staticmethod
+    def _trim_opinion_chunks(chunks, max_lines=3):
+        """생성 텍스트 조각에서 '#'으로 시작하는 줄과 빈 줄을 빼고 최대 max_lines줄을 공백으로 이어서 반환
+        
+        줄의 첫 글자가 들어오는 즉시 포함 여부를 판단하므로 스트리밍 중에도 바로 출력할 수 있고,
+        줄 끝 공백은 다음 글자가 올 때까지 보류해서 전체 결과가 줄 단위 strip과 같아지도록 합니다.
+        """
+        emitted_lines = 0
+        state = None     # 현재 줄 상태: None(판단 전), 'emit', 'skip'
+        pending = ""     # 판단 전 줄 앞부분 (앞 공백)
+        held = ""        # 출력 보류 중인 공백
+        
+        for chunk in chunks:
+            for i, piece in enumerate(chunk.split('\n')):
+                if i > 0:
+                    # 줄바꿈: 현재 줄 종료
+                    if state == 'emit':
+                        emitted_lines += 1
+                        if emitted_lines >= max_lines:
+                            return
+                    state, pending, held = None, "", ""
+                
+                if state is None:
+                    pending += piece
+                    stripped = pending.lstrip()
+                    if not stripped:
+                        continue
+                    if stripped.startswith('#'):
+                        state = 'skip'
+                        continue
+                    state = 'emit'
+                    piece = (" " if emitted_lines else "") + stripped
+                elif state == 'skip':
+                    continue
+                else:
+                    piece = held + piece
+                
+                body = piece.rstrip()
+                held = piece[len(body):]
+                if body:
+                    yield body
 
-{ticker} 회사 설명:
-"""
-            
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # 응답이 너무 길면 줄여서 반환
-            lines = response_text.split('\n')
-            filtered_lines = [line.strip() for line in lines if line.strip() and not line.strip().startswith('##')]
-            
-            if len(filtered_lines) > 4:
-                filtered_lines = filtered_lines[:4]
+    def _description_version(self, ticker):
+        """회사 설명 데이터 버전 (종목 데이터 갱신 시각)"""
+        data = self.stock_data.get(ticker)
+        if data and data.get('last_updated'):
+            return data['last_updated'].isoformat()
+        return self.get_data_version([ticker])
+    
+    def precompute_company_descriptions(self, tickers=None, batch_size=10, force=False):
+        """유니버스 회사 설명을 캐시된 사업 설명으로 한 번에 생성해 저장 (데이터 갱신 후 한 번 실행)
+        
+        데이터 버전이 바뀌었거나 아직 임시(template) 설명만 있는 종목만 batch_size개씩 묶어
+        Gemini에 요청하고, 응답에서 빠진 종목은 캐시 필드로 만든 설명을 저장합니다.
+        """
+        if tickers is None:
+            self.load_cached_universe()
+            tickers = sorted(self.stock_data.keys())
+        tickers = [ticker for ticker in tickers if ticker in self.stock_data]
+        
+        pending = []
+        for ticker in tickers:
+            entry = self.description_store.get(ticker, self._description_version(ticker))
+            if force or entry is None or entry.get('source') != 'llm':
+                pending.append(ticker)
+        
+        generated = 0
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            infos = {ticker: self.stock_data[ticker]['info'] for ticker in chunk}
             
-            return ' '.join(filtered_lines)
+            descriptions = {}
+            if self.gemini_available:
+                try:
+                    response_text = self._generate(build_description_prompt(infos), 'description',
+                                                   self.get_data_version(chunk), validate=self._is_json_response)
+                    descriptions = parse_descriptions(response_text, chunk)
+                except Exception as e:
+                    print(f"❌ 회사 설명 묶음 생성 실패: {e}")
+                missing = len(chunk) - len(descriptions)
+                if missing:
+                    self.llm_metrics.record_fallback('description', 'template', missing)
             
-        except Exception as e:
-            print(f"❌ Gemini API 회사 설명 생성 실패: {e}")
+            entries = {}
+            for ticker in chunk:
+                if ticker in descriptions:
+                    entries[ticker] = {'text': descriptions[ticker], 'source': 'llm'}
+                    generated += 1
+                else:
+                    entries[ticker] = {'text': template_description(ticker, infos[ticker]), 'source': 'template'}
+                entries[ticker]['version'] = self._description_version(ticker)
+            self.description_store.put_many(entries)
+        
+        if pending:
+            print(f"✅ 회사 설명 생성: {generated}/{len(pending)}개 (나머지는 기본 설명)")
+        return {'checked': len(tickers), 'pending': len(pending), 'generated': generated}
+    
+    def get_company_description(self, ticker):
+        """회사 설명 (LLM 호출 없이 저장소에서 바로 반환)
+        
+        미리 생성된 설명이 없거나 데이터가 갱신되었으면 캐시된 info로 만든 기본 설명을 반환하고,
+        Gemini를 사용할 수 있으면 백그라운드에서 생성해 다음 조회부터 사용합니다.
+        """
+        if ticker not in self.stock_data and not self.get_stock_info(ticker):
             return f"{ticker} 종목에 대한 상세 정보를 불러오는 중 오류가 발생했습니다."
+        
+        entry = self.description_store.get(ticker, self._description_version(ticker))
+        if entry is not None and entry.get('source') == 'llm':
+            return entry['text']
+        
+        if self.gemini_available:
+            future = None
+            with self._description_lock:
+                if ticker not in self._description_jobs:
+                    self._description_jobs.add(ticker)
+                    future = self._llm_executor.submit(self.precompute_company_descriptions, [ticker])
+            # 이미 끝난 작업이면 콜백이 이 스레드에서 바로 실행되므로 잠금을 놓은 뒤에 등록
+            if future is not None:
+                future.add_done_callback(lambda _: self._finish_description_job(ticker))
+        
+        if entry is not None:
+            return entry['text']
+        return template_description(ticker, self.stock_data[ticker]['info'])
+
+    def _finish_description_job(self, ticker):
+        """백그라운드 회사 설명 생성이 끝난 종목을 진행 중 목록에서 제거"""
+        with self._description_lock:
+            self._description_jobs.discard(ticker)
 
     def analyze_natural_language_strategy(self, user_input):
-        """Gemini AI를 사용한 투자 전략 분석 (LLM 전용)"""
+        """투자 전략 분석 (수치 조건만 있으면 로컬 규칙으로, 해석되지 않는 표현이 있으면 Gemini로)"""
+        parsed = parse_strategy_text(user_input)
+        if parsed['complete']:
+            strategy_config = build_strategy_config(parsed['criteria'])
+            strategy_config['source'] = 'local'
+            print(f"✅ 로컬 규칙 분석 성공: {strategy_config['description']}")
+            return strategy_config
+        
+        strategy_config = self._analyze_natural_language_strategy_llm(user_input) if self.gemini_available else None
+        if strategy_config is None:
+            # LLM 분석이 실패해도 로컬에서 해석한 조건이 있으면 그것만으로 전략 구성
+            if parsed['criteria']:
+                strategy_config = build_strategy_config(parsed['criteria'])
+                strategy_config['source'] = 'local'
+                print(f"⚠️ 일부 표현 해석 불가 ({parsed['unparsed']}), 로컬 조건만 사용")
+                if self.gemini_available:
+                    self.llm_metrics.record_fallback('strategy', 'local_criteria')
+            elif not self.gemini_available:
+                strategy_config = self._analyze_natural_language_strategy_llm(user_input)
+            return strategy_config
+        
+        # 입력 일부만 해석된 경우 로컬 조건이 문맥(부정, 범위 등)을 놓쳤을 수 있으므로 LLM 결과를 그대로 사용
+        return strategy_config
+    
+    def _analyze_natural_language_strategy_llm(self, user_input):
+        """Gemini AI를 사용한 투자 전략 분석"""
         if not self.gemini_available:
             return {
                 "strategy_name": "API 없음",
@@ -1004,7 +2318,12 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
         "dividend_min": null or 0.0-1.0 사이 소수 (예: 0.045는 4.5%),
         "debt_ratio_max": null or 0.0-1.0 사이 소수,
         "market_cap_min": null or 숫자 (십억달러 단위),
-        "price_to_52week_high_min": null or 0.0-1.0 사이 소수
+        "price_to_52week_high_min": null or 0.0-1.0 사이 소수,
+        "revenue_growth_min": null or 소수 (전년 대비 매출 성장률, 예: 0.1은 10%),
+        "eps_growth_min": null or 소수 (전년 대비 EPS 성장률),
+        "fcf_yield_min": null or 소수 (잉여현금흐름 / 시가총액),
+        "operating_margin_min": null or 0.0-1.0 사이 소수 (영업이익률),
+        "interest_coverage_min": null or 숫자 (이자보상배율, 배)
     }},
     "weights": {{
         "value_focus": 0-100 정수,
@@ -1023,6 +2342,8 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
 - ROE: "15%" → roe_min: 0.15
 - ROA: "8%" → roa_min: 0.08
 - 부채비율: "60%" → debt_ratio_max: 0.6
+- 매출 성장률: "10% 이상" → revenue_growth_min: 0.1
+- 영업이익률: "20% 이상" → operating_margin_min: 0.2
 
 *** 정확한 예시 ***
 1. "배당수익률 3% 이상인 안정 대형주"
@@ -1045,8 +2366,7 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
 퍼센트(%)를 소수로 정확히 변환하는 것이 가장 중요합니다!
 """
             
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+            response_text = self._generate(prompt, 'strategy', validate=self._is_json_response).strip()
             
             # 코드 블록 제거
             if '```json' in response_text:
@@ -1069,59 +2389,84 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
                 for key in strategy_config['weights']:
                     strategy_config['weights'][key] = int(strategy_config['weights'][key] * 100 / total_weight)
             
+            strategy_config['source'] = 'llm'
             print(f"✅ Gemini 분석 성공: {strategy_config.get('strategy_name', '커스텀 전략')}")
             return strategy_config
             
         except json.JSONDecodeError as e:
             print(f"❌ JSON 파싱 오류: {e}")
             print(f"응답 텍스트: {response_text[:200]}...")
+            self.llm_metrics.record_fallback('strategy', 'parse_failure')
             return None
             
         except Exception as e:
             print(f"❌ Gemini API 분석 실패: {e}")
+            self.llm_metrics.record_fallback('strategy', 'error')
             return None
 
-    def get_suitable_tickers_for_strategy(self, user_input, available_tickers=None):
-        """자연어 전략을 분석하여 적합한 종목들을 LLM이 직접 추천"""
-        if not self.gemini_available:
-            # Gemini가 없으면 기본 대형주 반환
-            default_tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX", 
-                              "CRM", "ADBE", "JPM", "JNJ", "PG", "KO", "V", "MA", "HD", "UNH", "PFE", "WMT"]
-            return default_tickers[:15]
-        
-        if available_tickers is None:
-            # 기본 종목 풀 (주요 S&P 500 종목들)
-            available_tickers = [
-                "AAPL", "MSFT", "GOOGL", "GOOG", "AMZN", "NVDA", "TSLA", "META", "BRK-B", "UNH",
-                "JNJ", "XOM", "JPM", "V", "PG", "MA", "CVX", "HD", "ABBV", "PFE", "KO", "PEP",
-                "AVGO", "TMO", "COST", "WMT", "MRK", "BAC", "NFLX", "CRM", "ACN", "LLY", "ORCL",
-                "ADBE", "DHR", "ABT", "VZ", "NKE", "TXN", "QCOM", "RTX", "PM", "NEE", "HON",
-                "UPS", "LOW", "IBM", "AMGN", "MDT", "GS", "T", "BMY", "C", "CHTR", "CVS",
-                "CAT", "MO", "BA", "GE", "MMM", "GILD", "USB", "AXP", "DE", "INTC", "SPGI",
-                "BLK", "AMD", "ISRG", "NOW", "INTU", "ZTS", "SYK", "BSX", "CME", "MU",
-                "REGN", "ADI", "TMUS", "PYPL", "AON", "EL", "DUK", "PLD", "SO", "SHW",
-                "CI", "TJX", "ICE", "EQIX", "PGR", "CL", "NOC", "MMC", "COF", "EMR",
-                "FCX", "NSC", "DG", "ROST", "PSA", "ITW", "GM", "TGT", "ECL", "HUM",
-                "KLAC", "APD", "AMT", "WFC", "LRCX", "CDNS", "KMB", "SNPS", "GIS", "MCD"
-            ]
+    def get_ticker_index(self, tickers=None):
+        """캐시된 종목의 로컬 후보 검색 색인 (데이터 버전이 바뀔 때만 다시 생성)"""
+        if tickers is None:
+            self.load_cached_universe()
+            tickers = sorted(self.stock_data.keys())
+        
+        version = self.get_data_version(tickers)
+        if self._ticker_index is None or self._ticker_index_version != version:
+            self._ticker_index = TickerIndex.build(self.stock_data, tickers, self.get_statement_metrics(tickers))
+            self._ticker_index_version = version
+        return self._ticker_index
+    
+    def get_suitable_tickers_for_strategy(self, user_input, available_tickers=None, limit=20, rerank=False):
+        """자연어 전략에 적합한 후보 종목 선별
+        
+        캐시된 종목 정보(섹터, 업종, 사업 설명 키워드, 재무비율)의 로컬 색인에서 후보를 고르고,
+        rerank=True이고 Gemini를 사용할 수 있으면 후보 안에서만 LLM이 순서를 다시 정합니다.
+        """
+        default_result = {
+            'tickers': DEFAULT_LARGE_CAPS[:limit],
+            'reasoning': '캐시된 종목 정보가 없어 기본 대형주 선별',
+            'strategy_focus': '종합'
+        }
         
         try:
-            # 티커 리스트를 문자열로 변환
-            ticker_list_str = ", ".join(available_tickers)
-            
-            prompt = f"""
-당신은 전문 투자 분석가입니다. 사용자의 투자 전략에 가장 적합한 종목들을 선별해주세요.
+            if available_tickers is not None:
+                self.load_cached_universe()
+                available_tickers = [ticker for ticker in available_tickers if ticker in self.stock_data]
+            index = self.get_ticker_index(available_tickers)
+            if len(index) == 0:
+                return default_result
+            result = index.query(user_input, limit=limit * 2 if rerank else limit)
+        except Exception as e:
+            print(f"❌ 로컬 종목 선별 실패: {e}")
+            return default_result
+        
+        if not result['tickers']:
+            return default_result
+        
+        print(f"✅ 로컬 종목 선별 완료: {len(result['tickers'])}개 종목")
+        print(f"📊 선별 이유: {result['reasoning']}")
+        
+        if rerank and self.gemini_available:
+            result = self._rerank_tickers_for_strategy(user_input, result)
+        
+        result['tickers'] = result['tickers'][:limit]
+        return result
+    
+    def _rerank_tickers_for_strategy(self, user_input, result):
+        """로컬 후보 종목의 순서를 LLM으로 재정렬 (실패하면 로컬 순서 유지)"""
+        candidates = result['tickers']
+        candidate_lines = []
+        for ticker in candidates:
+            info = self.stock_data.get(ticker, {}).get('info', {})
+            candidate_lines.append(f"- {ticker}: {info.get('sector', 'N/A')} / {info.get('industry', 'N/A')}")
+        
+        prompt = f"""
+당신은 전문 투자 분석가입니다. 사용자의 투자 전략에 가장 적합한 순서로 후보 종목을 정렬해주세요.
 
 사용자 투자 전략: "{user_input}"
 
-다음 종목 풀에서 사용자 전략에 가장 적합한 15-20개 종목을 선별하세요:
-{ticker_list_str}
-
-선별 기준:
-1. 사용자가 언급한 구체적인 조건들 (PER, PBR, ROE, 배당수익률, 부채비율 등)
-2. 투자 스타일 (가치투자, 성장투자, 배당투자, 안정성 중시 등)
-3. 섹터 선호도 (기술주, 금융주, 헬스케어, 소비재 등)
-4. 시가총액 선호도 (대형주, 중형주)
+후보 종목 (로컬 조건 검색 결과, 이 목록 밖의 종목은 추가하지 마세요):
+{chr(10).join(candidate_lines)}
 
 다음 JSON 형태로만 응답하세요 (설명이나 주석 없이):
 {{
@@ -1129,28 +2474,11 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
     "reasoning": "선별 이유 간단 설명",
     "strategy_focus": "가치/성장/배당/품질 등 주요 전략"
 }}
-
-*** 선별 예시 ***
-1. "배당수익률 3% 이상인 안정 대형주" 
-   → 배당 우수한 대형주: JNJ, PG, KO, PEP, VZ, T, XOM, CVX 등
-
-2. "PER 15 이하 가치주"
-   → 저평가된 가치주: BAC, WFC, XOM, CVX, GM, F 등
-
-3. "ROE 20% 이상 고수익성 기업"
-   → 고수익성 기업: AAPL, MSFT, NVDA, GOOGL, META 등
-
-4. "성장 가능성 높은 기술주"
-   → 성장 기술주: NVDA, GOOGL, MSFT, CRM, NOW, AMD 등
-
-5. "안정적인 헬스케어주"
-   → 헬스케어: JNJ, UNH, PFE, ABBV, TMO, DHR, ABT 등
-
-사용자 전략에 정확히 맞는 종목들을 선별하되, 다양성도 고려하세요.
 """
-            
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+        
+        response_text = ""
+        try:
+            response_text = self._generate(prompt, 'tickers', validate=self._is_json_response).strip()
             
             # 코드 블록 제거
             if '```json' in response_text:
@@ -1158,125 +2486,61 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
             elif '```' in response_text:
                 response_text = response_text.split('```')[1].split('```')[0]
             
-            # JSON 파싱
-            result = json.loads(response_text)
-            
-            recommended_tickers = result.get('recommended_tickers', [])
-            reasoning = result.get('reasoning', '')
-            strategy_focus = result.get('strategy_focus', '')
-            
-            # 유효한 티커들만 필터링
-            valid_tickers = [ticker for ticker in recommended_tickers if ticker in available_tickers]
-            
-            print(f"✅ LLM 종목 선별 완료: {len(valid_tickers)}개 종목")
-            print(f"📊 선별 이유: {reasoning}")
-            print(f"🎯 전략 포커스: {strategy_focus}")
-            
-            return {
-                'tickers': valid_tickers[:20],  # 최대 20개로 제한
-                'reasoning': reasoning,
-                'strategy_focus': strategy_focus
-            }
+            parsed = json.loads(response_text)
+            ranked = [ticker for ticker in parsed.get('recommended_tickers', []) if ticker in candidates]
+            ranked = list(dict.fromkeys(ranked))
+            if not ranked:
+                self.llm_metrics.record_fallback('tickers', 'no_valid_tickers')
+                return result
             
+            # LLM이 고른 순서 뒤에 나머지 후보를 로컬 순서대로 붙임
+            result = dict(result)
+            result['tickers'] = ranked + [ticker for ticker in candidates if ticker not in ranked]
+            result['reasoning'] = parsed.get('reasoning') or result['reasoning']
+            result['strategy_focus'] = parsed.get('strategy_focus') or result['strategy_focus']
+            print(f"✅ LLM 재정렬 완료: {len(ranked)}개 종목")
+            return result
+        
         except json.JSONDecodeError as e:
             print(f"❌ JSON 파싱 오류: {e}")
             print(f"응답 텍스트: {response_text[:200]}...")
-            # 오류 시 기본 종목들 반환
-            default_tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX", 
-                              "CRM", "ADBE", "JPM", "JNJ", "PG", "KO", "V", "MA", "HD", "UNH", "PFE", "WMT"]
-            return {
-                'tickers': default_tickers,
-                'reasoning': 'LLM 분석 실패로 기본 대형주 선별',
-                'strategy_focus': '종합'
-            }
-            
+            self.llm_metrics.record_fallback('tickers', 'parse_failure')
+            return result
+        
         except Exception as e:
-            print(f"❌ LLM 종목 선별 실패: {e}")
-            # 오류 시 기본 종목들 반환
-            default_tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX", 
-                              "CRM", "ADBE", "JPM", "JNJ", "PG", "KO", "V", "MA", "HD", "UNH", "PFE", "WMT"]
-            return {
-                'tickers': default_tickers,
-                'reasoning': 'LLM 분석 실패로 기본 대형주 선별',
-                'strategy_focus': '종합'
-            }
+            print(f"❌ LLM 재정렬 실패: {e}")
+            self.llm_metrics.record_fallback('tickers', 'error')
+            return result
     
 
     def _meets_required_criteria(self, ratios, strategy_config):
         """필수 조건을 만족하는지 체크"""
-        criteria = strategy_config.get('criteria', {})
-        
-        # PER 최대값 체크
-        if 'per_max' in criteria and criteria['per_max'] is not None:
-            per = ratios.get('PER', 'N/A')
-            if per == 'N/A' or per is None or per <= 0 or per > criteria['per_max']:
-                return False
-        
-        # PER 최소값 체크
-        if 'per_min' in criteria and criteria['per_min'] is not None:
-            per = ratios.get('PER', 'N/A')
-            if per == 'N/A' or per is None or per <= 0 or per < criteria['per_min']:
-                return False
-        
-        # PBR 최대값 체크
-        if 'pbr_max' in criteria and criteria['pbr_max'] is not None:
-            pbr = ratios.get('PBR', 'N/A')
-            if pbr == 'N/A' or pbr is None or pbr <= 0 or pbr > criteria['pbr_max']:
-                return False
-        
-        # PBR 최소값 체크
-        if 'pbr_min' in criteria and criteria['pbr_min'] is not None:
-            pbr = ratios.get('PBR', 'N/A')
-            if pbr == 'N/A' or pbr is None or pbr <= 0 or pbr < criteria['pbr_min']:
-                return False
-        
-        # ROE 최소값 체크
-        if 'roe_min' in criteria and criteria['roe_min'] is not None:
-            roe = ratios.get('ROE', 'N/A')
-            if roe == 'N/A' or roe is None or roe < criteria['roe_min']:
-                return False
-        
-        # ROA 최소값 체크
-        if 'roa_min' in criteria and criteria['roa_min'] is not None:
-            roa = ratios.get('ROA', 'N/A')
-            if roa == 'N/A' or roa is None or roa < criteria['roa_min']:
-                return False
-        
-        # 배당수익률 최소값 체크 (퍼센트 단위)
-        if 'dividend_min' in criteria and criteria['dividend_min'] is not None:
-            dividend = ratios.get('배당수익률', 'N/A')
-            dividend_min_percent = criteria['dividend_min'] * 100  # 소수를 퍼센트로 변환
-            if dividend == 'N/A' or dividend is None or dividend < dividend_min_percent:
-                return False
-        
-        # 부채비율 최대값 체크
-        if 'debt_ratio_max' in criteria and criteria['debt_ratio_max'] is not None:
-            debt_ratio = ratios.get('부채비율', 'N/A')
-            if debt_ratio == 'N/A' or debt_ratio is None:
-                return False, "부채비율 데이터 없음"
-            # criteria의 debt_ratio_max는 소수 형태(0.6)이므로 100을 곱해서 퍼센트로 변환
-            debt_ratio_max_percent = criteria['debt_ratio_max'] * 100
-            if debt_ratio > debt_ratio_max_percent:
-                return False, f"부채비율 높음 ({debt_ratio:.1f}% > {debt_ratio_max_percent:.1f}%)"
-        
-        # 시가총액 최소값 체크 (십억 달러 단위)
-        if 'market_cap_min' in criteria and criteria['market_cap_min'] is not None:
-            market_cap = ratios.get('시가총액', 'N/A')
-            if market_cap == 'N/A' or market_cap is None:
-                return False, "시가총액 데이터 없음"
-            market_cap_b = market_cap / 1e9  # 십억 단위로 변환
-            if market_cap_b < criteria['market_cap_min']:
-                return False, f"시가총액 작음 (${market_cap_b:.1f}B < ${criteria['market_cap_min']:.1f}B)"
-        
-        # 52주 최고가 대비 현재가 최소값 체크
-        if 'price_to_52week_high_min' in criteria and criteria['price_to_52week_high_min'] is not None:
-            price_ratio = ratios.get('52주_고점대비', 'N/A')
-            if price_ratio == 'N/A' or price_ratio is None:
-                return False, "52주 가격비율 데이터 없음"
-            if price_ratio / 100 < criteria['price_to_52week_high_min']:
-                return False, f"52주 가격비율 낮음 ({price_ratio:.1f}% < {criteria['price_to_52week_high_min']*100:.1f}%)"
-        
-        return True, "모든 조건 만족"  # 모든 조건을 만족함
+        return self._meets_required_criteria_with_reason(ratios, strategy_config)[0]
+    
+    @staticmethod
+    def _check_statement_criteria(ratios, criteria):
+        """재무제표 기반 최소값 체크 (매출/EPS 성장률, FCF수익률, 영업이익률, 이자보상배율), (만족 여부, 이유) 반환"""
+        for key, field in STATEMENT_CRITERIA.items():
+            if key in criteria and criteria[key] is not None:
+                value = ratios.get(field, 'N/A')
+                if value == 'N/A' or value is None:
+                    return False, f"{field} 데이터 없음"
+                if value < criteria[key]:
+                    if field == '이자보상배율':
+                        return False, f"{field} 낮음 ({value:.1f}배 < {criteria[key]:.1f}배)"
+                    return False, f"{field} 낮음 ({value*100:.1f}% < {criteria[key]*100:.1f}%)"
+        return True, None
+    
+    @staticmethod
+    def _statement_criteria_points(ratios, criteria, weights):
+        """재무제표 기반 기준을 만족한 항목의 가산점 합계"""
+        score = 0
+        for key, field in STATEMENT_CRITERIA.items():
+            points, weight_key = STATEMENT_POINTS[key]
+            value = ratios.get(field, 'N/A')
+            if value != 'N/A' and value is not None and criteria.get(key) and value >= criteria[key]:
+                score += points * (weights.get(weight_key, 25) / 100)
+        return score
     
     def _meets_required_criteria_with_reason(self, ratios, strategy_config):
         """필수 조건을 만족하는지 체크하고 실패 이유도 반환"""
@@ -1366,6 +2630,11 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
             if price_ratio / 100 < criteria['price_to_52week_high_min']:
                 return False, f"52주 가격비율 낮음 ({price_ratio:.1f}% < {criteria['price_to_52week_high_min']*100:.1f}%)"
         
+        # 재무제표 기반 최소값 체크
+        ok, reason = self._check_statement_criteria(ratios, criteria)
+        if not ok:
+            return False, reason
+        
         return True, "모든 조건 만족"  # 모든 조건을 만족함
     
     def _calculate_custom_strategy_score(self, ratios, strategy_config):
@@ -1451,6 +2720,9 @@ ESG 관점에서 다음 사항들을 중심으로 평가해주세요:
                 if price_ratio / 100 >= criteria['price_to_52week_high_min']:
                     score += 15 * (weights.get('growth_focus', 25) / 100)
         
+        # 재무제표 기반 기준
+        score += self._statement_criteria_points(ratios, criteria, weights)
+        
         return max(0, min(100, score))
 
 def main():
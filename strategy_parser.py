@@ -0,0 +1,290 @@
+import re
+
+# 지표 이름 → (별칭 목록, 값 종류). 별칭은 긴 것부터 매칭되므로 '배당수익률'이 '배당'보다 우선합니다.
+# 값 종류: 'multiple'(배수 그대로), 'percent'(소수로 변환), 'market_cap'(십억 달러 단위)
+METRICS = {
+    'per': (['주가수익비율', 'p/e', 'per', 'pe'], 'multiple'),
+    'pbr': (['주가순자산비율', 'p/b', 'pbr', 'pb'], 'multiple'),
+    'roe': (['자기자본이익률', 'return on equity', 'roe'], 'percent'),
+    'roa': (['총자산이익률', 'return on assets', 'roa'], 'percent'),
+    'dividend': (['배당수익률', '배당률', '배당', 'dividend yield', 'dividend', 'yield'], 'percent'),
+    'debt_ratio': (['부채비율', '부채', 'debt to equity', 'debt-to-equity', 'debt ratio', 'debt'], 'percent'),
+    'market_cap': (['시가총액', '시총', 'market capitalization', 'market cap', 'mkt cap'], 'market_cap'),
+    'price_to_52week_high': (['52주 최고가 대비', '52주 고점 대비', '52주 최고가', '52주 고점', '52-week high', '52 week high'], 'percent'),
+    'revenue_growth': (['매출 성장률', '매출성장률', '매출 성장', '매출성장', 'revenue growth', 'sales growth', '성장률'], 'percent'),
+    'eps_growth': (['eps 성장률', 'eps성장률', 'eps 성장', 'eps growth', 'earnings growth', '이익 성장률'], 'percent'),
+    'fcf_yield': (['fcf 수익률', 'fcf수익률', '잉여현금흐름 수익률', 'fcf yield', 'free cash flow yield'], 'percent'),
+    'operating_margin': (['영업이익률', 'operating margin'], 'percent'),
+    'interest_coverage': (['이자보상배율', 'interest coverage'], 'multiple'),
+}
+
+# analyze_natural_language_strategy가 반환하는 criteria 스키마
+CRITERIA_KEYS = [
+    'per_max', 'per_min', 'pbr_max', 'pbr_min', 'roe_min', 'roa_min', 'dividend_min', 'debt_ratio_max',
+    'market_cap_min', 'price_to_52week_high_min', 'revenue_growth_min', 'eps_growth_min',
+    'fcf_yield_min', 'operating_margin_min', 'interest_coverage_min',
+]
+
+# 비교 표현 (긴 것부터 검사)
+MAX_WORDS = ['보다 낮은', '보다 작은', 'less than', 'lower than', 'at most', 'maximum', 'below', 'under',
+             '이하', '미만', '이내', '아래', '최대', 'max', '<=', '≤', '<']
+MIN_WORDS = ['보다 높은', '보다 큰', 'greater than', 'higher than', 'more than', 'at least', 'minimum', 'above', 'over',
+             '이상', '초과', '넘는', '넘게', '최소', 'min', '>=', '≥', '>', '+']
+
+# 조건 사이 구분자
+SEPARATORS = r",|;|\n|\band\b|그리고|이면서|이고|이며|및|&"
+
+# 부정/제외 표현 (이 표현이 들어간 조건은 규칙으로 해석하지 않고 LLM에 넘김)
+NEGATION_RE = re.compile(r"제외|아닌|아니|말고|빼고|없는|(?<![a-z])(?:not|no|without|except|excluding)(?![a-z])")
+
+# 조건 외에 남아도 되는 단어 (이외의 단어가 남으면 LLM 분석 필요)
+FILLER_WORDS = {
+    '종목', '주식', '기업', '회사', '주', '찾아줘', '찾아', '찾기', '추천', '추천해줘', '보여줘', '알려줘', '원해', '원함',
+    '조건', '정도', '수준', '배', '퍼센트', '달러', '있는', '되는', '인', '중', '에서', '것',
+    'stocks', 'stock', 'companies', 'company', 'with', 'find', 'show', 'me', 'that', 'have', 'has', 'a', 'an',
+    'the', 'of', 'in', 'is', 'are', 'x', 'times', 'percent', 'and', 'or', 'please', 'ratio',
+}
+PARTICLES = ('으로', '이고', '이며', '을', '를', '이', '가', '은', '는', '인', '의', '로', '과', '와', '도', '만')
+
+# 숫자 (음수 부호는 숫자 바로 앞에 붙은 경우만, 예: -5% / 범위 '10-20'의 '-'는 구분자)
+_NUMBER = r"((?<![\d.])[-−]?\d[\d,]*(?:\.\d+)?)"
+_UNIT = r"\s*(%|퍼센트|percent|조\s*(?:달러|\$)?|십억\s*(?:달러|\$)?|억\s*(?:달러|\$)?|trillion|billion|million|bn|b|t|m|배|x)?"
+
+
+def _alias_pattern():
+    """모든 지표 별칭을 하나의 정규식으로 (영문 별칭은 단어 경계 적용)"""
+    aliases = []
+    for metric, (names, _) in METRICS.items():
+        for name in names:
+            aliases.append((name, metric))
+    aliases.sort(key=lambda item: len(item[0]), reverse=True)
+
+    parts = []
+    for name, _ in aliases:
+        escaped = re.escape(name).replace(r'\ ', r'\s*')
+        if re.match(r'[a-z0-9]', name):
+            escaped = rf"(?<![a-z]){escaped}(?![a-z])"
+        parts.append(escaped)
+    return re.compile("|".join(parts)), {name: metric for name, metric in aliases}
+
+
+_ALIAS_RE, _ALIAS_METRIC = _alias_pattern()
+
+
+def _metric_for(matched):
+    """매칭된 별칭 문자열 → 지표 이름"""
+    normalized = re.sub(r'\s+', ' ', matched)
+    if normalized in _ALIAS_METRIC:
+        return _ALIAS_METRIC[normalized]
+    for name, metric in _ALIAS_METRIC.items():
+        if re.sub(r'\s+', '', name) == re.sub(r'\s+', '', normalized):
+            return metric
+    return None
+
+
+def _comparator(text):
+    """텍스트에 포함된 비교 방향 ('max' / 'min' / None)"""
+    best = None
+    for words, direction in ((MAX_WORDS, 'max'), (MIN_WORDS, 'min')):
+        for word in words:
+            pos = text.find(word)
+            if pos >= 0 and (best is None or pos < best[0]):
+                best = (pos, direction)
+    return best[1] if best else None
+
+
+def _number(text):
+    """정규식으로 찾은 숫자 문자열 → float (천 단위 쉼표, 유니코드 마이너스 처리)"""
+    return float(text.replace(',', '').replace('−', '-'))
+
+
+def _convert(value, unit, kind):
+    """숫자와 단위를 criteria 스키마 단위로 변환 (단위를 확정할 수 없으면 None)"""
+    unit = re.sub(r'\s+', '', unit or '')
+    if kind == 'percent':
+        # 단위 없는 값도 퍼센트로 보고 소수로 변환 (예: 15% → 0.15, ROE 15 → 0.15, -5 → -0.05)
+        # 단위 없이 1 미만인 값은 0.5%인지 50%인지 알 수 없으므로 해석하지 않음 (예: 배당 0.5 이상)
+        if unit in ('%', '퍼센트', 'percent') or abs(value) >= 1 or value == 0:
+            return round(value / 100, 6)
+        return None
+    if kind == 'market_cap':
+        # 십억 달러 단위 (단위가 없으면 십억 달러로 간주)
+        # 조/십억/억은 '달러'나 '$'가 붙은 경우만 해석 (원화 금액일 수 있으므로)
+        if unit[:1] in ('조', '십', '억') and not unit.endswith(('달러', '$')):
+            return None
+        if unit.startswith('조') or unit in ('trillion', 't'):
+            return value * 1000
+        if unit.startswith('십억') or unit in ('billion', 'bn', 'b', ''):
+            return value
+        if unit.startswith('억'):
+            return value / 10
+        if unit in ('million', 'm'):
+            return value / 1000
+        return value
+    return value
+
+
+def _parse_bound(clause, metric, kind):
+    """비교 표현이 붙은 기준값 하나 추출 → ({키: 값}, 소비한 끝 위치) 또는 None"""
+    match = re.search(rf"\$?{_NUMBER}{_UNIT}", clause)
+    if not match:
+        return None
+    value = _convert(_number(match.group(1)), match.group(2), kind)
+    if value is None:
+        return None
+
+    # 숫자 앞 (예: under 12, > 15%) 또는 뒤 (예: 12 이하, 3% 이상)의 비교 표현
+    # (앞쪽을 먼저 봐야 'under 3 over 1'에서 3 뒤의 over를 3의 조건으로 잘못 읽지 않음)
+    before, after = clause[:match.start()], clause[match.end():]
+    direction = _comparator(before) or _comparator(after[:12])
+    if direction is None:
+        return None
+
+    key = f"{metric}_{direction}"
+    if key not in CRITERIA_KEYS:
+        return None
+
+    span_end = match.end()
+    for word in (MAX_WORDS if direction == 'max' else MIN_WORDS):
+        pos = after[:12].find(word)
+        if pos >= 0:
+            span_end = max(span_end, match.end() + pos + len(word))
+    return {key: value}, span_end
+
+
+def _parse_clause(clause, metric, kind):
+    """지표 하나가 포함된 조건 구간에서 기준값 추출 → (criteria 딕셔너리, 소비한 텍스트 구간) 또는 None"""
+    # 범위 표현 (예: PER 10~20, P/E 10 to 20)
+    match = re.search(rf"\$?{_NUMBER}{_UNIT}\s*(?:~|-|–|to|에서)\s*\$?{_NUMBER}{_UNIT}(?:\s*(?:사이|between))?", clause)
+    if match:
+        low = _convert(_number(match.group(1)), match.group(2) or match.group(4), kind)
+        high = _convert(_number(match.group(3)), match.group(4) or match.group(2), kind)
+        if low is None or high is None:
+            return None
+        result = {}
+        for direction, value in (('min', low), ('max', high)):
+            key = f"{metric}_{direction}"
+            if key in CRITERIA_KEYS:
+                result[key] = value
+        return (result, match.span()) if result else None
+
+    parsed = _parse_bound(clause, metric, kind)
+    if parsed is None:
+        return None
+    result, span_end = parsed
+
+    # 같은 지표에 반대 방향 조건이 이어지는 경우 (예: PER 5 이상 15 이하)
+    second = _parse_bound(clause[span_end:], metric, kind)
+    if second is not None and not second[0].keys() & result.keys():
+        result.update(second[0])
+        span_end += second[1]
+    return result, (0, span_end)
+
+
+def _is_filler(token):
+    """조건 외에 남아도 되는 단어인지 (조사를 떼고 확인)"""
+    if not token or token in FILLER_WORDS:
+        return True
+    for particle in PARTICLES:
+        if token.endswith(particle) and token[:-len(particle)] in FILLER_WORDS | {''}:
+            return True
+    return False
+
+
+def parse_strategy_text(user_input):
+    """자연어 전략 문장에서 수치 조건을 규칙 기반으로 추출
+
+    반환값의 criteria는 analyze_natural_language_strategy의 스키마와 같고, complete는 입력 전체가
+    조건으로 해석되었는지(남은 단어가 조사/불용어뿐인지), unparsed는 해석하지 못한 부분입니다.
+    """
+    text = (user_input or '').strip().lower()
+    criteria = {}
+    leftovers = []
+
+    for clause in re.split(SEPARATORS, text):
+        clause = clause.strip()
+        if not clause:
+            continue
+
+        matches = list(_ALIAS_RE.finditer(clause))
+        if not matches or NEGATION_RE.search(clause):
+            # 부정 표현이 있는 조건은 기준값을 뒤집어 해석할 위험이 있으므로 통째로 미해석으로 남김
+            leftovers.append(clause)
+            continue
+
+        leftovers.append(clause[:matches[0].start()])
+        for i, alias in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(clause)
+            metric = _metric_for(alias.group(0))
+            segment = clause[alias.end():end]
+            parsed = _parse_clause(segment, metric, METRICS[metric][1]) if metric else None
+            if parsed is None:
+                leftovers.append(clause[alias.start():end])
+                continue
+            values, (_, consumed) = parsed
+            criteria.update(values)
+            leftovers.append(segment[consumed:])
+
+    unparsed = [token for token in re.split(r"[\s\.\?!\(\)]+", " ".join(leftovers)) if not _is_filler(token)]
+    return {
+        'criteria': criteria,
+        'complete': bool(criteria) and not unparsed,
+        'unparsed': " ".join(unparsed),
+    }
+
+
+# 조건 키 → 전략 성향 (가중치 계산용)
+FOCUS_BY_KEY = {
+    'per_max': 'value_focus', 'per_min': 'value_focus', 'pbr_max': 'value_focus', 'pbr_min': 'value_focus',
+    'fcf_yield_min': 'value_focus',
+    'revenue_growth_min': 'growth_focus', 'eps_growth_min': 'growth_focus', 'price_to_52week_high_min': 'growth_focus',
+    'dividend_min': 'dividend_focus',
+    'roe_min': 'quality_focus', 'roa_min': 'quality_focus', 'debt_ratio_max': 'quality_focus',
+    'market_cap_min': 'quality_focus', 'operating_margin_min': 'quality_focus', 'interest_coverage_min': 'quality_focus',
+}
+FOCUS_NAMES = {'value_focus': '가치', 'growth_focus': '성장', 'dividend_focus': '배당', 'quality_focus': '우량'}
+
+# 전략 설명에 쓰는 조건 표기
+CRITERIA_LABELS = {
+    'per_max': ('PER', '≤', 'multiple'), 'per_min': ('PER', '≥', 'multiple'),
+    'pbr_max': ('PBR', '≤', 'multiple'), 'pbr_min': ('PBR', '≥', 'multiple'),
+    'roe_min': ('ROE', '≥', 'percent'), 'roa_min': ('ROA', '≥', 'percent'),
+    'dividend_min': ('배당수익률', '≥', 'percent'), 'debt_ratio_max': ('부채비율', '≤', 'percent'),
+    'market_cap_min': ('시가총액', '≥', 'market_cap'), 'price_to_52week_high_min': ('52주 고점 대비', '≥', 'percent'),
+    'revenue_growth_min': ('매출성장률', '≥', 'percent'), 'eps_growth_min': ('EPS성장률', '≥', 'percent'),
+    'fcf_yield_min': ('FCF수익률', '≥', 'percent'), 'operating_margin_min': ('영업이익률', '≥', 'percent'),
+    'interest_coverage_min': ('이자보상배율', '≥', 'multiple'),
+}
+
+
+def build_strategy_config(criteria):
+    """추출한 조건으로 analyze_natural_language_strategy와 같은 형태의 전략 설정 생성"""
+    counts = {focus: 0 for focus in FOCUS_NAMES}
+    for key in criteria:
+        counts[FOCUS_BY_KEY[key]] += 1
+
+    # 조건이 있는 성향에 가중치를 더 주되, 없는 성향도 최소 비중은 유지
+    raw = {focus: 10 + 30 * count for focus, count in counts.items()}
+    total = sum(raw.values())
+    weights = {focus: int(value * 100 / total) for focus, value in raw.items()}
+
+    focused = [FOCUS_NAMES[focus] for focus, count in sorted(counts.items(), key=lambda item: -item[1]) if count]
+    descriptions = []
+    for key in CRITERIA_KEYS:
+        if key not in criteria:
+            continue
+        label, sign, kind = CRITERIA_LABELS[key]
+        value = criteria[key]
+        if kind == 'percent':
+            descriptions.append(f"{label} {sign} {value * 100:g}%")
+        elif kind == 'market_cap':
+            descriptions.append(f"{label} {sign} ${value:g}B")
+        else:
+            descriptions.append(f"{label} {sign} {value:g}")
+
+    return {
+        'strategy_name': f"{' + '.join(focused)} 전략" if focused else "커스텀 전략",
+        'criteria': dict(criteria),
+        'weights': weights,
+        'description': ", ".join(descriptions),
+    }
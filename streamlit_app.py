@@ -1,11 +1,20 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-from stock_analyzer import StockAnalyzer
+from stock_analyzer import StockAnalyzer, ANALYSIS_BUDGET, DEFAULT_LARGE_CAPS
+from latency_budget import LatencyBudget
+from job_queue import JobQueue
+from chart_resampling import BAR_LABELS
+import os
 import time
 
+def _go():
+    """plotly.graph_objects 모듈 (차트를 실제로 그릴 때 import, 차트가 없는 첫 화면은 plotly 로딩을 기다리지 않음)"""
+    import plotly.graph_objects as go
+    return go
+
+# 종목 분석 탭 캔들스틱 차트 너비 (px, 넓은 레이아웃의 2/3 열 기준, 봉 크기 선택에 사용)
+CHART_WIDTH = 800
+
 # 페이지 설정
 st.set_page_config(
     page_title="미국 주식 분석기",
@@ -138,17 +147,134 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # 애플리케이션 초기화
+# 앱 시작 시 알려진 종목 데이터 워밍업 ('full': 디스크 캐시 로드 + 없는 종목 API 수집, 'disk': 디스크만, 'off')
+WARMUP_MODE = os.getenv('STOCK_ANALYZER_WARMUP', 'full').lower()
+# 워커 프로세스 간 공유 유니버스 테이블 ('on': 갱신 스레드 실행, 'off': 프로세스별로 직접 계산)
+SHARED_UNIVERSE_MODE = os.getenv('STOCK_ANALYZER_SHARED_UNIVERSE', 'on').lower()
+
 @st.cache_resource
-def get_analyzer(version="v9"):  # 버전을 업데이트하여 캐시 무효화
+def get_analyzer(version="v10"):  # 버전을 업데이트하여 캐시 무효화
     # Streamlit Cloud secrets에서 API 키 가져오기
     try:
         api_key = st.secrets.get("GEMINI_API_KEY", None)
-        return StockAnalyzer(api_key=api_key)
+        analyzer = StockAnalyzer(api_key=api_key)
     except Exception as e:
-        return StockAnalyzer()
+        analyzer = StockAnalyzer()
+    
+    # 종목 선택 목록과 기본 종목 풀은 백그라운드에서 미리 메모리로 로드 (첫 화면은 기다리지 않음)
+    if WARMUP_MODE != 'off':
+        analyzer.start_warmup(MAJOR_TICKERS + DEFAULT_LARGE_CAPS + EXTENDED_TICKERS, prefetch=WARMUP_MODE == 'full')
+    # 유니버스 주가 행렬 / 재무비율은 한 프로세스만 발행하고 나머지 워커는 같은 파일을 매핑해서 사용
+    if SHARED_UNIVERSE_MODE != 'off':
+        analyzer.start_shared_universe_refresher()
+    return analyzer
 
 analyzer = get_analyzer()
 
+# 분석 결과 캐시 설정 (위젯을 바꿀 때마다 스크립트 전체가 다시 실행되므로 같은 입력의 결과는 재사용)
+RESULT_CACHE_TTL = 600          # 초
+RESULT_CACHE_MAX_ENTRIES = 128
+
+class _DegradedResult(Exception):
+    """시간 예산 때문에 일부 단계를 건너뛴 결과 (캐시하지 않고 그대로 반환)"""
+    def __init__(self, result):
+        super().__init__("degraded result")
+        self.result = result
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_recommendation(_analyzer, ticker, nl_prompt, data_version):
+    recommendation = _analyzer.get_recommendation(ticker, nl_prompt, budget=ANALYSIS_BUDGET)
+    if recommendation and recommendation['budget']['skipped']:
+        raise _DegradedResult(recommendation)
+    return recommendation
+
+def cached_recommendation(ticker, nl_prompt):
+    """종목 추천 의견 (티커, 평가 관점, 데이터 버전 기준 캐시, 시간 예산으로 생략된 결과는 캐시하지 않음)"""
+    if not analyzer.get_stock_info(ticker):
+        return None
+    try:
+        return _cached_recommendation(analyzer, ticker, nl_prompt, analyzer.get_data_version([ticker]))
+    except _DegradedResult as degraded:
+        return degraded.result
+
+# 종목 스크리닝 / AI 전략 분석은 백그라운드 작업으로 실행 (화면이 끊겨도 작업은 계속되고 결과는 보관)
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 0.5  # 초 (캐시된 종목부터 처리하므로 첫 결과는 보통 첫 갱신에 표시)
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue(max_workers=JOB_WORKERS, ttl=RESULT_CACHE_TTL, max_jobs=RESULT_CACHE_MAX_ENTRIES)
+
+job_queue = get_job_queue()
+
+def _run_strategy_screen(job, tickers, strategy):
+    return analyzer.strategy_recommend(list(tickers), strategy,
+                                       progress=lambda done, total, partial: job.update(done, total, partial, message="종목 분석"))
+
+def _run_custom_strategy(job, user_input, rerank):
+    job.update(message="1단계: 종목 선별")
+    selection = analyzer.get_suitable_tickers_for_strategy(user_input, rerank=rerank)
+    tickers = selection['tickers'] if selection and isinstance(selection, dict) else DEFAULT_LARGE_CAPS
+    job.update(0, len(tickers), message="2단계: 종목 분석")
+    recommendations = analyzer.rank_by_total_score(
+        tickers, progress=lambda done, total, partial: job.update(done, total, partial)
+    )
+    return {'selection': selection, 'recommendations': recommendations}
+
+def session_job(kind, request, func, version_tickers=None):
+    """이 세션에서 같은 요청으로 제출한 작업 상태 (없거나 정리됐으면 새로 제출)
+    
+    작업 키는 요청과 제출 시점의 데이터 버전이라, 다른 세션의 같은 요청과는 작업을 공유합니다.
+    실패하거나 취소된 작업은 한 번 화면에 보여준 뒤 다음 실행에서 다시 제출합니다
+    (끝나자마자 다시 제출하면 계속 실패하는 작업이 쉬지 않고 재실행되므로).
+    """
+    jobs = st.session_state.setdefault('jobs', {})
+    job_id = jobs.get((kind, request))
+    job = job_queue.poll(job_id) if job_id else None
+    if job is not None and job['status'] in ('failed', 'cancelled'):
+        reported = st.session_state.setdefault('reported_jobs', set())
+        if job_id in reported:
+            reported.discard(job_id)
+            job = None
+        else:
+            reported.add(job_id)
+    if job is None:
+        key = request + (analyzer.get_data_version(version_tickers),)
+        job_id = jobs[(kind, request)] = job_queue.submit(kind, key, func, *request)
+        job = job_queue.poll(job_id)
+    return job
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def show_job_progress(job_id, title):
+    """진행 중인 작업의 진행률과 중간 결과 표시 (끝나면 전체 화면을 다시 그림)"""
+    job = job_queue.poll(job_id)
+    if job is None or job['status'] not in ('queued', 'running'):
+        st.rerun()
+    
+    total = job['total'] or 0
+    label = f"{title} ({job['message'] or '대기 중'} {job['done']}/{total})" if total else f"{title} ({job['message'] or '대기 중'})"
+    st.progress(job['progress'], text=label)
+    
+    if job['partial']:
+        top = job['partial'][:10]
+        st.caption(f"⏳ 지금까지 분석된 상위 {len(top)}개 종목 (진행 중)")
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            partial = pd.DataFrame([
+                {'순위': f"{i + 1}위", '티커': rec['ticker'], '점수': f"{rec['score']:.1f}"}
+                for i, rec in enumerate(top)
+            ])
+            st.dataframe(partial, hide_index=True, use_container_width=True)
+        with col2:
+            go = _go()
+            fig = go.Figure(data=go.Bar(
+                x=[rec['ticker'] for rec in top],
+                y=[rec['score'] for rec in top],
+                marker_color='#1f77b4'
+            ))
+            fig.update_layout(yaxis_range=[0, 100], height=300, showlegend=False, margin=dict(t=10, b=10))
+            st.plotly_chart(fig, use_container_width=True)
+
 # # 사이드바에 API 상태 표시
 # with st.sidebar:
 #     st.markdown("### 🔧 시스템 상태")
@@ -163,15 +289,57 @@ analyzer = get_analyzer()
 # 메인 헤더
 st.markdown('<h1 class="main-header"> 미국 주식 분석기</h1>', unsafe_allow_html=True)
 
+# 워밍업 진행 중이면 진행 상황 표시
+warmup = analyzer.warmup_status()
+if warmup['status'] == 'running':
+    st.caption(f"⏳ 종목 데이터를 미리 불러오는 중입니다 ({warmup['done']}/{warmup['total']}) - 아직 불러오지 않은 종목은 분석 시 바로 불러옵니다")
+
 # 상단 탭 네비게이션
 tab1, tab2, tab3 = st.tabs(["종목 분석", "투자 전략", "AI 분석"])
 
+# 회사 소개 / AI 투자 의견 카드
+def company_description_html(company_description):
+    """회사 소개 카드 HTML"""
+    return f"""
+    <div style="background: linear-gradient(135deg, #f8f9fa, #e9ecef); 
+                padding: 1.5rem; border-radius: 15px; margin: 1.5rem 0; 
+                border-left: 4px solid #17a2b8;">
+        <h4 style="color: #495057; margin-bottom: 1rem; display: flex; align-items: center;">
+            <span style="margin-right: 0.5rem;">🏢</span>
+            회사 소개
+        </h4>
+        <p style="color: #6c757d; font-size: 1.1rem; line-height: 1.6; margin: 0;">
+            {company_description}
+        </p>
+    </div>
+    """
+
+def investment_opinion_html(investment_opinion):
+    """AI 투자 의견 카드 HTML"""
+    return f"""
+    <div style="background: linear-gradient(135deg, #e3f2fd, #bbdefb); 
+                padding: 1.5rem; border-radius: 15px; margin: 1.5rem 0; 
+                border-left: 4px solid #2196f3;">
+        <h4 style="color: #1565c0; margin-bottom: 1rem; display: flex; align-items: center;">
+            <span style="margin-right: 0.5rem;">🤖</span>
+            AI 투자 의견
+        </h4>
+        <p style="color: #1976d2; font-size: 1.1rem; line-height: 1.6; margin: 0; font-weight: 500;">
+            {investment_opinion}
+        </p>
+        <p style="color: #64b5f6; font-size: 0.9rem; margin-top: 0.8rem; font-style: italic;">
+            ※ 이 의견은 업종별 평균 대비 분석을 포함한 AI 생성 내용으로, 투자 결정의 참고용입니다.
+        </p>
+    </div>
+    """
+
 # 캔들스틱 차트 생성 함수
-def create_candlestick_chart(ticker, period="3mo"):
-    """캔들스틱 차트 생성"""
-    hist_data = analyzer.get_price_history(ticker, period)
+def create_candlestick_chart(ticker, period="3mo", width=CHART_WIDTH):
+    """캔들스틱 차트 생성 (기간이 길면 주봉/월봉으로 줄여서 전송)"""
+    hist_data, bar_size = analyzer.get_chart_data(ticker, period, width)
     
     if hist_data is not None and not hist_data.empty:
+        go = _go()
         fig = go.Figure()
         
         # 캔들스틱 차트
@@ -185,7 +353,7 @@ def create_candlestick_chart(ticker, period="3mo"):
         ))
         
         fig.update_layout(
-            title=f"{ticker} 주가 차트 ({period})",
+            title=f"{ticker} 주가 차트 ({period}, {BAR_LABELS[bar_size]})",
             xaxis_title="날짜",
             yaxis_title="주가 ($)",
             xaxis_rangeslider_visible=False,
@@ -193,12 +361,13 @@ def create_candlestick_chart(ticker, period="3mo"):
             showlegend=False
         )
         
-        # 주말 빈 공간 제거
-        fig.update_xaxes(
-            rangebreaks=[
-                dict(bounds=["sat", "mon"]),  # 토요일-월요일 (주말) 제거
-            ]
-        )
+        # 주말 빈 공간 제거 (일봉만 해당)
+        if bar_size == 'D':
+            fig.update_xaxes(
+                rangebreaks=[
+                    dict(bounds=["sat", "mon"]),  # 토요일-월요일 (주말) 제거
+                ]
+            )
         
         return fig
     
@@ -265,9 +434,9 @@ with tab1:
         # 차트 기간 선택
         chart_period = st.selectbox(
             "📈 차트 기간 설정",
-            ["1mo", "3mo", "6mo", "1y", "2y"],
+            ["1mo", "3mo", "6mo", "1y", "2y", "5y"],
             index=1,
-            format_func=lambda x: {"1mo": "1개월", "3mo": "3개월", "6mo": "6개월", "1y": "1년", "2y": "2년"}[x]
+            format_func=lambda x: {"1mo": "1개월", "3mo": "3개월", "6mo": "6개월", "1y": "1년", "2y": "2년", "5y": "5년"}[x]
         )
         
         # 분석 버튼을 크고 눈에 띄게
@@ -324,12 +493,28 @@ with tab1:
         st.session_state.natural_language_prompt = natural_language_prompt
     
     if analyze_btn and ticker:
+        # 자연어 관점이 있으면 전달, 없으면 None (session_state에서 안전하게 가져오기)
+        natural_language_prompt = st.session_state.get('natural_language_prompt', '')
+        nl_prompt = natural_language_prompt.strip() if natural_language_prompt and natural_language_prompt.strip() else None
+        st.session_state.tab1_request = {'ticker': ticker, 'prompt': nl_prompt}
+        st.session_state.pop('tab1_result', None)
+    
+    # 마지막 분석 요청은 다시 실행될 때도 유지하고, 결과는 캐시에서 다시 그림 (차트 기간 변경 등)
+    tab1_request = st.session_state.get('tab1_request')
+    if tab1_request:
+        ticker = tab1_request['ticker']
+        nl_prompt = tab1_request['prompt']
         with st.spinner(f"📡 {ticker} 데이터 수집 및 분석 중..."):
             if analyzer.get_stock_info(ticker):
-                # 자연어 관점이 있으면 전달, 없으면 None (session_state에서 안전하게 가져오기)
-                natural_language_prompt = st.session_state.get('natural_language_prompt', '')
-                nl_prompt = natural_language_prompt.strip() if natural_language_prompt and natural_language_prompt.strip() else None
-                recommendation = analyzer.get_recommendation(ticker, nl_prompt)
+                # 데이터 수집부터 AI 투자 의견까지 하나의 시간 예산 안에서 실행 (캐시된 추천 결과는 시간을 쓰지 않음)
+                budget = LatencyBudget(ANALYSIS_BUDGET)
+                recommendation = cached_recommendation(ticker, nl_prompt)
+                
+                # 투자 의견과 위험 지표는 (티커, 평가 관점, 데이터 버전)별로 보관해서 다시 실행될 때는 스트리밍/재계산 없이 표시
+                result_key = (ticker, nl_prompt, analyzer.get_data_version([ticker]))
+                tab1_result = st.session_state.get('tab1_result')
+                if tab1_result is not None and tab1_result['key'] != result_key:
+                    tab1_result = None
                 
                 if recommendation:
                     ratios = recommendation['ratios']
@@ -345,44 +530,29 @@ with tab1:
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    # 회사 설명 추가
-                    with st.spinner(f"🏢 {ticker} 회사 정보 생성 중..."):
-                        company_description = analyzer.get_company_description(ticker)
-                    
-                    st.markdown(f"""
-                    <div style="background: linear-gradient(135deg, #f8f9fa, #e9ecef); 
-                                padding: 1.5rem; border-radius: 15px; margin: 1.5rem 0; 
-                                border-left: 4px solid #17a2b8;">
-                        <h4 style="color: #495057; margin-bottom: 1rem; display: flex; align-items: center;">
-                            <span style="margin-right: 0.5rem;">🏢</span>
-                            회사 소개
-                        </h4>
-                        <p style="color: #6c757d; font-size: 1.1rem; line-height: 1.6; margin: 0;">
-                            {company_description}
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    # 회사 설명은 미리 생성된 설명을 바로 표시 (없으면 기본 설명, 생성은 백그라운드)
+                    company_description = analyzer.get_company_description(ticker)
+                    st.markdown(company_description_html(company_description), unsafe_allow_html=True)
                     
-                    # 자연어 기반 투자 의견 추가
-                    with st.spinner(f"🤖 {ticker} AI 투자 의견 생성 중..."):
-                        investment_opinion = analyzer.get_natural_language_investment_opinion(ticker, nl_prompt)
+                    # 자연어 기반 투자 의견 추가 (생성되는 대로 표시)
+                    opinion_placeholder = st.empty()
+                    if tab1_result is None:
+                        opinion_placeholder.markdown(investment_opinion_html("⏳ AI 투자 의견 생성 중..."), unsafe_allow_html=True)
+                        investment_opinion = ""
+                        for piece in analyzer.stream_natural_language_investment_opinion(ticker, nl_prompt, budget=budget):
+                            investment_opinion += piece
+                            opinion_placeholder.markdown(investment_opinion_html(investment_opinion + " ▌"), unsafe_allow_html=True)
+                        # 시간 예산 때문에 잘린 의견은 보관하지 않고 다음 실행에서 다시 생성
+                        if not budget.skipped():
+                            tab1_result = {'key': result_key, 'opinion': investment_opinion}
+                            st.session_state.tab1_result = tab1_result
+                    else:
+                        investment_opinion = tab1_result['opinion']
+                    opinion_placeholder.markdown(investment_opinion_html(investment_opinion), unsafe_allow_html=True)
                     
-                    st.markdown(f"""
-                    <div style="background: linear-gradient(135deg, #e3f2fd, #bbdefb); 
-                                padding: 1.5rem; border-radius: 15px; margin: 1.5rem 0; 
-                                border-left: 4px solid #2196f3;">
-                        <h4 style="color: #1565c0; margin-bottom: 1rem; display: flex; align-items: center;">
-                            <span style="margin-right: 0.5rem;">🤖</span>
-                            AI 투자 의견
-                        </h4>
-                        <p style="color: #1976d2; font-size: 1.1rem; line-height: 1.6; margin: 0; font-weight: 500;">
-                            {investment_opinion}
-                        </p>
-                        <p style="color: #64b5f6; font-size: 0.9rem; margin-top: 0.8rem; font-style: italic;">
-                            ※ 이 의견은 업종별 평균 대비 분석을 포함한 AI 생성 내용으로, 투자 결정의 참고용입니다.
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    skipped_stages = recommendation['budget']['skipped'] + budget.skipped()
+                    if skipped_stages:
+                        st.caption(f"⏱️ 시간 예산({ANALYSIS_BUDGET:.0f}초) 때문에 생략되거나 대체된 단계: {', '.join(skipped_stages)}")
                     
                     # 기본 정보를 카드 스타일로 표시
                     col1, col2, col3, col4 = st.columns(4)
@@ -472,7 +642,8 @@ with tab1:
                         st.subheader("📋 주요 재무비율")
                         
                         financial_data = {
-                            "지표": ["PER", "PBR", "PSR", "ROE (%)", "ROA (%)", "부채비율 (%)", "배당수익률 (%)"],
+                            "지표": ["PER", "PBR", "PSR", "ROE (%)", "ROA (%)", "부채비율 (%)", "배당수익률 (%)",
+                                   "매출성장률 (%)", "EPS성장률 (%)", "영업이익률 (%)", "FCF수익률 (%)"],
                             "값": [
                                 f"{ratios.get('PER', 'N/A'):.2f}" if ratios.get('PER') != 'N/A' and ratios.get('PER') is not None else 'N/A',
                                 f"{ratios.get('PBR', 'N/A'):.2f}" if ratios.get('PBR') != 'N/A' and ratios.get('PBR') is not None else 'N/A',
@@ -480,7 +651,11 @@ with tab1:
                                 f"{ratios.get('ROE', 'N/A')*100:.1f}" if ratios.get('ROE') != 'N/A' and ratios.get('ROE') is not None else 'N/A',
                                 f"{ratios.get('ROA', 'N/A')*100:.1f}" if ratios.get('ROA') != 'N/A' and ratios.get('ROA') is not None else 'N/A',
                                 f"{ratios.get('부채비율', 'N/A'):.1f}" if ratios.get('부채비율') != 'N/A' and ratios.get('부채비율') is not None else 'N/A',
-                                f"{ratios.get('배당수익률', 'N/A'):.2f}" if ratios.get('배당수익률') != 'N/A' and ratios.get('배당수익률') is not None else 'N/A'
+                                f"{ratios.get('배당수익률', 'N/A'):.2f}" if ratios.get('배당수익률') != 'N/A' and ratios.get('배당수익률') is not None else 'N/A',
+                                f"{ratios.get('매출성장률', 'N/A')*100:.1f}" if ratios.get('매출성장률', 'N/A') != 'N/A' else 'N/A',
+                                f"{ratios.get('EPS성장률', 'N/A')*100:.1f}" if ratios.get('EPS성장률', 'N/A') != 'N/A' else 'N/A',
+                                f"{ratios.get('영업이익률', 'N/A')*100:.1f}" if ratios.get('영업이익률', 'N/A') != 'N/A' else 'N/A',
+                                f"{ratios.get('FCF수익률', 'N/A')*100:.1f}" if ratios.get('FCF수익률', 'N/A') != 'N/A' else 'N/A'
                             ]
                         }
                         
@@ -506,6 +681,7 @@ with tab1:
                             scores['AI맞춤평가'] = natural_score
                             colors.append('#9c27b0')  # 보라색
                         
+                        go = _go()
                         fig = go.Figure(data=go.Bar(
                             x=list(scores.keys()),
                             y=list(scores.values()),
@@ -542,7 +718,32 @@ with tab1:
                                 st.warning("📉 조정 구간")
                             else:
                                 st.info("📊 중간 구간")
-                
+
+                    # 유니버스 기준 위험 지표
+                    if tab1_result is not None and 'risk_metrics' in tab1_result:
+                        risk_metrics = tab1_result['risk_metrics']
+                    else:
+                        risk_metrics = analyzer.get_risk_metrics(ticker)
+                        if tab1_result is not None:
+                            tab1_result['risk_metrics'] = risk_metrics
+                    if risk_metrics:
+                        st.subheader("📉 위험 지표 (유니버스 기준)")
+
+                        col1, col2, col3 = st.columns(3)
+
+                        with col1:
+                            st.metric("연간 변동성", f"{risk_metrics['연간변동성']*100:.1f}%")
+
+                        with col2:
+                            st.metric(f"베타 ({risk_metrics['benchmark']} 대비)", f"{risk_metrics['베타']:.2f}")
+
+                        with col3:
+                            st.metric("기간 수익률", f"{risk_metrics['기간수익률']*100:.1f}%")
+
+                        if risk_metrics['상관관계_상위']:
+                            correlated = ", ".join(f"{t} ({c:.2f})" for t, c in risk_metrics['상관관계_상위'])
+                            st.caption(f"🔗 주가 흐름이 비슷한 종목: {correlated}")
+
                 else:
                     st.error(f"❌ {ticker} 분석에 실패했습니다.")
             else:
@@ -694,11 +895,21 @@ with tab2:
     
 
     
-    # 기본 전략 분석 처리
+    # 분석한 종목 풀을 기억해 두고, 전략 카드를 바꾸거나 다시 실행될 때는 캐시된 결과로 바로 표시
     if recommend_btn and ticker_pool_list:
+        st.session_state.tab2_request = list(ticker_pool_list)
+    
+    # 기본 전략 분석 처리
+    if ticker_pool_list and st.session_state.get('tab2_request') == list(ticker_pool_list):
         
-        with st.spinner(f"🔍 {strategy_info['name']} 전략으로 {len(ticker_pool_list)}개 종목 분석 중..."):
-            recommendations = analyzer.strategy_recommend(ticker_pool_list, selected_strategy)
+        screen_request = (tuple(dict.fromkeys(ticker_pool_list)), selected_strategy)
+        screen_job = session_job('screen', screen_request, _run_strategy_screen, version_tickers=screen_request[0])
+        if screen_job['status'] in ('queued', 'running'):
+            show_job_progress(screen_job['id'], f"🔍 {strategy_info['name']} 전략으로 {len(ticker_pool_list)}개 종목 분석 중")
+        elif screen_job['status'] != 'done':
+            st.error(f"❌ 분석 작업이 실패했습니다: {screen_job['error']}")
+        else:
+            recommendations = screen_job['result']
             
             if recommendations:
                 # 결과 헤더
@@ -816,6 +1027,7 @@ with tab2:
                         else:
                             colors.append('#dc3545')
                     
+                    go = _go()
                     fig_recommendations = go.Figure(data=go.Bar(
                         x=[rec['ticker'] for rec in recommendations],
                         y=[rec['score'] for rec in recommendations],
@@ -880,6 +1092,55 @@ with tab2:
             else:
                 st.error("❌ 추천할 종목이 없습니다.")
 
+    # 전략 백테스트
+    with st.expander(f"🧪 {strategy_info['name']} 백테스트 (저장된 주가 기준)"):
+        col1, col2 = st.columns(2)
+        with col1:
+            backtest_top_k = st.slider("보유 종목 수", 3, 20, 10, key="tab2_backtest_top_k")
+        with col2:
+            backtest_rebalance = st.selectbox(
+                "리밸런싱 주기",
+                ["W", "M", "Q"],
+                index=1,
+                format_func=lambda x: {"W": "매주", "M": "매월", "Q": "분기"}[x],
+                key="tab2_backtest_rebalance"
+            )
+
+        if st.button("🧪 백테스트 실행", key="tab2_backtest_btn", use_container_width=True):
+            with st.spinner("📈 과거 데이터로 전략을 검증하는 중..."):
+                backtest = analyzer.backtest_strategy(
+                    selected_strategy,
+                    tickers=ticker_pool_list or None,
+                    top_k=backtest_top_k,
+                    rebalance=backtest_rebalance
+                )
+
+            if backtest:
+                metrics = backtest['metrics']
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("총 수익률", f"{metrics['총수익률']:.1f}%")
+                col2.metric("최대 낙폭", f"{metrics['최대낙폭']:.1f}%")
+                col3.metric("평균 회전율", f"{metrics['평균회전율']:.1f}%")
+                col4.metric("샤프 지수", f"{metrics['샤프지수']:.2f}")
+
+                go = _go()
+                fig_backtest = go.Figure()
+                fig_backtest.add_trace(go.Scatter(
+                    x=backtest['equity'].index, y=backtest['equity'].values,
+                    name=strategy_info['name'], line=dict(color=strategy_info['color'])
+                ))
+                fig_backtest.add_trace(go.Scatter(
+                    x=backtest['benchmark_equity'].index, y=backtest['benchmark_equity'].values,
+                    name="동일가중 유니버스", line=dict(color='#adb5bd', dash='dash')
+                ))
+                fig_backtest.update_layout(height=350, yaxis_title="누적 가치", hovermode="x unified")
+                st.plotly_chart(fig_backtest, use_container_width=True)
+
+                st.caption("ℹ️ 재무제표 지표(성장률/마진 등)는 시점별 히스토리가 없어 백테스트에서 제외했습니다.")
+            else:
+                st.error("❌ 백테스트에 사용할 주가 데이터 또는 시점별 재무비율 스냅샷(2개 이상)이 부족합니다. "
+                         "현재 재무비율을 과거에 적용하면 미래 정보가 섞이므로 스냅샷이 쌓인 뒤 실행됩니다.")
+
 
 
 # 탭 3: 나만의 전략 만들기
@@ -954,6 +1215,15 @@ with tab3:
             help="Gemini AI가 당신의 전략을 분석하여 최적의 종목을 찾아드립니다",
             key="tab4_natural_btn"
         )
+        
+        # 후보 종목은 로컬 색인에서 선별하고, 원하면 Gemini로 순서만 재정렬
+        llm_rerank = st.checkbox(
+            "🤖 AI로 후보 종목 재정렬",
+            value=False,
+            disabled=not analyzer.gemini_available,
+            help="로컬 조건 검색으로 고른 후보 종목의 순서를 Gemini가 전략에 맞게 다시 정합니다",
+            key="tab4_llm_rerank"
+        )
     
     with col2:
         # 입력 예시를 컨테이너로 감싸서 스타일링
@@ -1023,14 +1293,26 @@ with tab3:
     # 기본 종목 풀 (100개 주요 종목 - 자동으로 사용)
     ticker_pool_list_tab4 = EXTENDED_TICKERS
     
-    # 자연어 전략 분석 처리
+    # 마지막 전략 입력을 기억해 두고, 다시 실행될 때는 캐시된 결과로 표시
     if natural_strategy_btn:
         if not user_strategy_input.strip():
             st.warning("⚠️ 투자 전략을 입력해주세요.")
+            st.session_state.pop('tab3_request', None)
         else:
-            # 1단계: LLM이 적합한 종목들을 선별
-            with st.spinner("🤖 1단계: AI가 당신의 전략에 적합한 종목들을 선별하고 있습니다..."):
-                ticker_selection_result = analyzer.get_suitable_tickers_for_strategy(user_strategy_input)
+            st.session_state.tab3_request = {'input': user_strategy_input.strip(), 'rerank': llm_rerank}
+    
+    # 자연어 전략 분석 처리
+    tab3_request = st.session_state.get('tab3_request')
+    if tab3_request:
+        strategy_job = session_job('custom_strategy', (tab3_request['input'], tab3_request['rerank']), _run_custom_strategy)
+        if strategy_job['status'] in ('queued', 'running'):
+            show_job_progress(strategy_job['id'], "🔎 당신의 전략에 적합한 종목들을 선별하고 분석하고 있습니다")
+        elif strategy_job['status'] != 'done':
+            st.error(f"❌ 전략 분석 작업이 실패했습니다: {strategy_job['error']}")
+        else:
+            # 1단계: 로컬 색인에서 적합한 종목들을 선별 (선택 시 AI 재정렬)
+            with st.container():
+                ticker_selection_result = strategy_job['result']['selection']
                 
                 if ticker_selection_result and isinstance(ticker_selection_result, dict):
                     selected_tickers = ticker_selection_result['tickers']
@@ -1043,7 +1325,7 @@ with tab3:
                                 border-left: 5px solid #2196f3; 
                                 padding: 1.5rem; border-radius: 10px; margin: 2rem 0;">
                         <h3 style="color: #1565c0; margin-bottom: 1rem;">
-                            🎯 1단계 완료: AI 종목 선별 결과
+                            🎯 1단계 완료: 종목 선별 결과
                         </h3>
                         <p style="font-size: 1.1rem; margin-bottom: 0.5rem; color: #333;">
                             <strong>선별된 종목 수:</strong> {len(selected_tickers)}개
@@ -1062,31 +1344,16 @@ with tab3:
                     
                 else:
                     # 오류 시 기본 종목들 사용
-                    selected_tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX", 
-                                       "CRM", "ADBE", "JPM", "JNJ", "PG", "KO", "V", "MA", "HD", "UNH", "PFE", "WMT"]
-                    reasoning = "AI 분석 오류로 기본 대형주 사용"
+                    selected_tickers = DEFAULT_LARGE_CAPS
+                    reasoning = "종목 선별 오류로 기본 대형주 사용"
                     strategy_focus = "종합"
                     
-                    st.warning("⚠️ AI 종목 선별에 실패했습니다. 기본 대형주로 분석을 진행합니다.")
+                    st.warning("⚠️ 종목 선별에 실패했습니다. 기본 대형주로 분석을 진행합니다.")
             
             # 2단계: 선별된 종목들만 분석하여 순위 매기기
-            with st.spinner(f"🔍 2단계: 선별된 {len(selected_tickers)}개 종목을 분석하여 순위를 매기고 있습니다..."):
-                # 선별된 종목들만 분석
-                custom_recommendations = []
-                
-                for ticker in selected_tickers:
-                    if analyzer.get_stock_info(ticker):
-                        ratios = analyzer.calculate_financial_ratios(ticker)
-                        if ratios:
-                            score = ratios.get('종합_점수', 50)
-                            custom_recommendations.append({
-                                'ticker': ticker,
-                                'ratios': ratios,
-                                'score': score
-                            })
-                
-                # 점수 순으로 정렬
-                custom_recommendations.sort(key=lambda x: x['score'], reverse=True)
+            with st.container():
+                # 선별된 종목들만 분석한 결과 (점수 순 정렬)
+                custom_recommendations = strategy_job['result']['recommendations']
                 
             # 항상 결과를 표시하도록 조건문 변경
             if True:  # 항상 True로 설정하여 오류 메시지가 나오지 않도록 함
@@ -1175,6 +1442,7 @@ with tab3:
                         else:
                             colors.append('#dc3545')
                 
+                    go = _go()
                     fig_custom = go.Figure(data=go.Bar(
                         x=[rec['ticker'] for rec in custom_recommendations],
                         y=[rec['score'] for rec in custom_recommendations],
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+백테스트 테스트 스크립트 (자산 곡선 손계산 비교, 시점별 재무비율 스냅샷의 미래 정보 차단)
+"""
+
+import tempfile
+import numpy as np
+import pandas as pd
+from backtester import run_backtest, build_field_panel
+
+# 2024-01-29(월) ~ 2024-02-02(금): 월별 리밸런싱이면 1/29, 2/1 두 번
+DATES = pd.bdate_range("2024-01-29", "2024-02-02")
+TICKERS = ["AAA", "BBB"]
+CLOSES = np.array([
+    [10.0, 20.0],
+    [11.0, 20.0],
+    [12.0, 20.0],
+    [12.0, 22.0],
+    [6.0, 24.0],
+])
+
+
+def per_snapshots(rows):
+    """날짜 → (AAA PER, BBB PER) 목록으로 백테스트 입력용 재무비율 패널 생성"""
+    index = pd.DatetimeIndex([day for day, _ in rows])
+    return {'PER': pd.DataFrame([values for _, values in rows], index=index, columns=TICKERS)}
+
+
+def test_equity_matches_hand_calculation():
+    """저PER 상위 1종목 월별 리밸런싱 자산 곡선을 손으로 계산한 값과 비교"""
+    # 1/29 스냅샷은 AAA가 저PER, 2/1 스냅샷은 BBB가 저PER
+    fundamentals = per_snapshots([("2024-01-29", [5.0, 25.0]), ("2024-02-01", [25.0, 5.0])])
+    result = run_backtest(DATES, TICKERS, CLOSES, fundamentals=fundamentals, strategy='low_per',
+                          top_k=1, rebalance='M', cost_bps=10.0)
+
+    assert list(result['holdings']) == [["AAA"], ["BBB"]]
+
+    # 첫 매수(현금 → AAA) 회전 1.0, 2/1 교체(AAA → BBB) 회전 2.0 → 거래비용 10bp씩
+    first_cost, second_cost = 1 - 1.0 * 0.001, 1 - 2.0 * 0.001
+    expected = [
+        first_cost * 10 / 10,
+        first_cost * 11 / 10,
+        first_cost * 12 / 10,
+        first_cost * 12 / 10,                        # 2/1 종가까지는 AAA 보유 구간
+        first_cost * 12 / 10 * second_cost * 24 / 22,  # 2/2는 BBB (2/1 종가 기준)
+    ]
+    np.testing.assert_allclose(result['equity'].to_numpy(), expected, rtol=1e-12)
+    np.testing.assert_allclose(result['turnover'].to_numpy(), [0.5, 1.0])
+
+    metrics = result['metrics']
+    assert metrics['총수익률'] == round((expected[-1] / expected[0] - 1) * 100, 2)
+    assert metrics['최대낙폭'] == 0.0
+    assert metrics['평균회전율'] == 100.0
+    assert metrics['리밸런싱횟수'] == 2
+
+
+def test_panel_never_uses_snapshot_before_its_date():
+    """스냅샷 값은 스냅샷 날짜부터만 보이고, 그 이전 날짜는 직전 스냅샷(없으면 NaN)을 사용"""
+    fundamentals = per_snapshots([("2024-01-31", [7.0, 9.0]), ("2024-02-02", [30.0, 40.0])])
+    panel = build_field_panel(fundamentals, DATES, TICKERS, CLOSES)
+
+    per = panel['PER']
+    assert np.isnan(per[:2]).all()                 # 1/29, 1/30: 아직 스냅샷 없음
+    np.testing.assert_array_equal(per[2], [7.0, 9.0])
+    np.testing.assert_array_equal(per[3], [7.0, 9.0])  # 2/1은 2/2 스냅샷을 미리 보지 않음
+    np.testing.assert_array_equal(per[4], [30.0, 40.0])
+
+
+def test_rebalance_ignores_later_snapshot():
+    """리밸런싱 다음 날 나온 스냅샷은 그 리밸런싱 종목 선택에 영향을 주지 않음"""
+    fundamentals = per_snapshots([("2024-01-29", [5.0, 25.0]), ("2024-02-02", [25.0, 5.0])])
+    result = run_backtest(DATES, TICKERS, CLOSES, fundamentals=fundamentals, strategy='low_per',
+                          top_k=1, rebalance='M', cost_bps=0.0)
+    assert list(result['holdings']) == [["AAA"], ["AAA"]]
+    np.testing.assert_allclose(result['equity'].to_numpy(), CLOSES[:, 0] / CLOSES[0, 0])
+
+
+def test_backtest_strategy_starts_at_first_snapshot():
+    """StockAnalyzer.backtest_strategy는 첫 스냅샷 이전 구간을 제외하고, 스냅샷이 1개뿐이면 실행하지 않음"""
+    from stock_analyzer import StockAnalyzer
+
+    dates = pd.bdate_range("2024-01-02", periods=60)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        analyzer = StockAnalyzer(cache_dir=cache_dir, llm_backend='offline')
+        for i, ticker in enumerate(TICKERS):
+            closes = 50 * np.cumprod(1 + rng.normal(0, 0.01, len(dates))) + i
+            analyzer.stock_data[ticker] = {'info': {}, 'price_history': pd.DataFrame({'Close': closes}, index=dates)}
+
+        first = dates[20].date()
+        analyzer.fundamentals_store.append({"AAA": {'PER': 5.0}, "BBB": {'PER': 25.0}}, first)
+        assert analyzer.backtest_strategy('low_per', tickers=TICKERS, top_k=1) is None
+
+        analyzer.fundamentals_store.append({"AAA": {'PER': 25.0}, "BBB": {'PER': 5.0}}, dates[40].date())
+        result = analyzer.backtest_strategy('low_per', tickers=TICKERS, top_k=1)
+        assert result['point_in_time']
+        assert result['equity'].index[0] == pd.Timestamp(first)
+        switch = pd.Timestamp(dates[40])
+        holdings = result['holdings']
+        assert (holdings.index >= switch).any()
+        assert all(h == ["AAA"] for h in holdings[holdings.index < switch])
+        assert all(h == ["BBB"] for h in holdings[holdings.index >= switch])
+
+
+if __name__ == "__main__":
+    print("🚀 백테스트 테스트")
+    print("=" * 50)
+
+    test_equity_matches_hand_calculation()
+    test_panel_never_uses_snapshot_before_its_date()
+    test_rebalance_ignores_later_snapshot()
+    test_backtest_strategy_starts_at_first_snapshot()
+
+    print("✅ 테스트 완료!")
@@ -0,0 +1,340 @@
+import re
+import numpy as np
+import pandas as pd
+from backtester import RATIO_FIELDS, STATEMENT_FIELDS, STRATEGY_SCORERS, custom_strategy_score, custom_criteria_mask
+from fundamentals_store import FIELDS, project_fundamentals
+from strategy_parser import parse_strategy_text, build_strategy_config
+
+# 섹터 표현 → yfinance sector 값 (별칭은 긴 것부터 매칭)
+SECTOR_ALIASES = {
+    'Technology': ['정보기술', '기술주', '테크주', '기술', '테크', 'it', 'tech', 'technology'],
+    'Healthcare': ['헬스케어', '건강관리', '의료', '바이오', '제약', 'healthcare', 'health care', 'pharma'],
+    'Financial Services': ['금융주', '금융', '은행', '보험', 'financials', 'financial', 'banks', 'bank'],
+    'Consumer Cyclical': ['경기소비재', '임의소비재', 'consumer cyclical', 'consumer discretionary'],
+    'Consumer Defensive': ['필수소비재', '생활필수품', 'consumer defensive', 'consumer staples', 'staples'],
+    'Communication Services': ['커뮤니케이션', '통신', '미디어', 'communication services', 'communication', 'telecom', 'media'],
+    'Industrials': ['산업재', '산업', '방산', '항공우주', 'industrials', 'industrial'],
+    'Energy': ['에너지', '정유', '석유', 'energy', 'oil'],
+    'Utilities': ['유틸리티', '전력', '공공', 'utilities', 'utility'],
+    'Real Estate': ['부동산', '리츠', 'real estate', 'reits', 'reit'],
+    'Basic Materials': ['소재', '원자재', '화학', '철강', 'basic materials', 'materials'],
+}
+
+# 한글 업종 키워드 → 사업 설명 검색어
+KEYWORD_ALIASES = {
+    '반도체': 'semiconductor', '소프트웨어': 'software', '클라우드': 'cloud', '인공지능': 'artificial intelligence',
+    '전기차': 'electric vehicles', '게임': 'gaming', '결제': 'payments', '카드': 'credit card', '보험': 'insurance',
+    '은행': 'bank', '제약': 'drug', '바이오': 'biotechnology', '의료기기': 'medical devices', '리츠': 'reit',
+    '석유': 'oil', '가스': 'gas', '항공': 'aerospace', '방산': 'defense', '음료': 'beverages', '식품': 'food',
+    '담배': 'tobacco', '소매': 'retail', '유통': 'retail', '철도': 'railroad', '물류': 'logistics', '통신': 'wireless',
+    '광고': 'advertising', '스트리밍': 'streaming', '데이터센터': 'data center', '전력': 'electric',
+}
+
+# 규모 표현 → 시가총액 범위 (십억 달러)
+SIZE_RANGES = [
+    (['초대형', 'mega cap', 'mega-cap'], (200, None)),
+    (['대형', 'large cap', 'large-cap', 'blue chip', '블루칩'], (10, None)),
+    (['중형', 'mid cap', 'mid-cap'], (2, 10)),
+    (['소형', 'small cap', 'small-cap'], (None, 2)),
+]
+
+# 투자 성향 표현 → (성향, 기본 전략 점수 함수 이름)
+STYLE_WORDS = [
+    (['저평가', '가치', '싼', 'value', 'cheap', 'undervalued'], 'value_focus', 'low_per'),
+    (['성장', '모멘텀', 'growth', 'momentum'], 'growth_focus', 'growth'),
+    (['고배당', '배당', '인컴', 'dividend', 'income'], 'dividend_focus', 'high_dividend'),
+    (['우량', '안정', '수익성', '퀄리티', 'quality', 'stable', 'profitable'], 'quality_focus', 'high_roe'),
+]
+FOCUS_LABELS = {'value_focus': '가치', 'growth_focus': '성장', 'dividend_focus': '배당', 'quality_focus': '품질'}
+
+# 사업 설명 색인에서 제외하는 흔한 단어
+STOPWORDS = {
+    'the', 'and', 'for', 'its', 'with', 'that', 'from', 'this', 'which', 'also', 'through', 'other', 'such',
+    'company', 'companies', 'inc', 'corporation', 'corp', 'ltd', 'offers', 'provides', 'products', 'services',
+    'operates', 'segment', 'segments', 'well', 'including', 'headquartered', 'founded', 'incorporated', 'was',
+    'are', 'has', 'have', 'into', 'under', 'brand', 'brands', 'name', 'names', 'worldwide', 'united',
+    'states', 'international', 'various', 'based', 'related', 'their', 'our', 'not',
+}
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9&\-]+")
+
+
+def tokenize(text):
+    """영문 텍스트를 색인용 토큰으로 분리 (소문자, 복수형 's' 제거, 불용어 제외)"""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        token = token.strip('-')
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        if len(token) > 2 and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def _find_aliases(text, aliases):
+    """텍스트에 포함된 별칭 목록 (영문 별칭은 단어 경계로 매칭)"""
+    found = []
+    for alias in sorted(aliases, key=len, reverse=True):
+        if re.match(r'[a-z]', alias):
+            if re.search(rf"(?<![a-z]){re.escape(alias)}(?![a-z])", text):
+                found.append(alias)
+        elif alias in text:
+            found.append(alias)
+    return found
+
+
+def parse_retrieval_query(user_input):
+    """자연어 전략을 검색 조건으로 분해
+
+    수치 조건은 parse_strategy_text로 추출하고, 해석되지 않은 부분에서 섹터 / 규모 / 투자 성향 /
+    업종 키워드를 찾습니다.
+    """
+    parsed = parse_strategy_text(user_input)
+    text = (user_input or '').lower()
+    rest = parsed['unparsed'].lower()
+
+    sectors = [sector for sector, aliases in SECTOR_ALIASES.items() if _find_aliases(rest, aliases)]
+
+    size = None
+    for words, bounds in SIZE_RANGES:
+        if _find_aliases(rest, words):
+            size = bounds
+            break
+
+    styles = [(focus, scorer) for words, focus, scorer in STYLE_WORDS if _find_aliases(text, words)]
+
+    # 섹터 / 규모 / 성향 표현으로 이미 쓰인 단어는 키워드에서 제외
+    used = set()
+    for aliases in list(SECTOR_ALIASES.values()) + [words for words, _ in SIZE_RANGES] + [words for words, _, _ in STYLE_WORDS]:
+        used.update(token for alias in aliases for token in tokenize(alias))
+    keywords = [KEYWORD_ALIASES[word] for word in KEYWORD_ALIASES if word in rest]
+    keywords += [token for token in tokenize(rest) if token not in used and token not in ('cap', 'stock', 'stocks')]
+
+    return {
+        'criteria': parsed['criteria'],
+        'sectors': sectors,
+        'size': size,
+        'styles': styles,
+        'keywords': list(dict.fromkeys(keywords)),
+    }
+
+
+class TickerIndex:
+    """캐시된 종목 정보(섹터, 업종, 사업 설명, 재무비율)에 대한 로컬 후보 검색 색인
+
+    섹터/업종은 정수 코드 배열, 재무비율은 필드별 float 배열, 사업 설명은 토큰 → 종목 위치
+    역색인으로 보관하므로 후보 선별은 종목 수와 관계없이 몇 번의 배열 연산으로 끝납니다.
+    """
+
+    def __init__(self, tickers, sectors, industries, fields, postings, industry_postings=None):
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.sectors = sectors          # pd.Categorical
+        self.industries = industries    # pd.Categorical
+        self.fields = fields            # 필드 → float 배열
+        self.postings = postings        # 토큰 → 종목 위치 배열
+        self.industry_postings = industry_postings or {}  # 업종/섹터 이름 토큰 → 종목 위치 배열
+
+    @classmethod
+    def build(cls, stock_data, tickers=None, statement_metrics=None):
+        """종목 데이터 딕셔너리로 색인 생성 (statement_metrics는 종목 x 재무제표 지표 DataFrame)"""
+        if tickers is None:
+            tickers = sorted(stock_data.keys())
+        tickers = [ticker for ticker in tickers if stock_data.get(ticker) and stock_data[ticker].get('info')]
+
+        rows, sectors, industries = [], [], []
+        postings, industry_postings = {}, {}
+        for position, ticker in enumerate(tickers):
+            info = stock_data[ticker]['info']
+            rows.append(project_fundamentals(info))
+            sectors.append(info.get('sector'))
+            industries.append(info.get('industry'))
+
+            text = " ".join(str(info.get(key) or '') for key in ('sector', 'industry', 'longName', 'longBusinessSummary'))
+            for token in set(tokenize(text)):
+                postings.setdefault(token, []).append(position)
+            for token in set(tokenize(f"{info.get('sector') or ''} {info.get('industry') or ''}")):
+                industry_postings.setdefault(token, []).append(position)
+
+        frame = pd.DataFrame(rows, index=tickers, columns=FIELDS, dtype='float64')
+        fields = {field: frame[field].to_numpy() for field in RATIO_FIELDS}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fields['52주_고점대비'] = fields['현재가'] / frame['52주_최고가'].to_numpy() * 100
+
+        metrics = statement_metrics.reindex(tickers) if statement_metrics is not None else pd.DataFrame(index=tickers)
+        for field in STATEMENT_FIELDS:
+            fields[field] = metrics[field].to_numpy(dtype='float64') if field in metrics else np.full(len(tickers), np.nan)
+
+        return cls(
+            tickers,
+            pd.Categorical(sectors),
+            pd.Categorical(industries),
+            fields,
+            {token: np.asarray(positions, dtype=np.int32) for token, positions in postings.items()},
+            {token: np.asarray(positions, dtype=np.int32) for token, positions in industry_postings.items()},
+        )
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def keyword_scores(self, keywords):
+        """키워드 관련도 (드문 단어일수록 높은 가중치, 여러 단어 키워드는 모든 단어가 있어야 일치)
+
+        업종/섹터 이름에 나오는 단어는 사업 설명에만 나오는 경우보다 두 배로 계산합니다.
+        """
+        scores = np.zeros(len(self))
+        for keyword in keywords:
+            terms = tokenize(keyword)
+            if not terms:
+                continue
+            hits = None
+            for term in terms:
+                positions = self._lookup(self.postings, term)
+                hits = positions if hits is None else np.intersect1d(hits, positions)
+            if len(hits):
+                weight = np.log((len(self) + 1) / len(hits))
+                scores[hits] += weight
+                in_industry = np.isin(hits, self._industry_hits(terms))
+                scores[hits[in_industry]] += weight
+        return scores
+
+    @staticmethod
+    def _lookup(postings, term):
+        """토큰의 종목 위치 (정확히 없으면 접두어 일치, 예: pharma → pharmaceutical)"""
+        positions = postings.get(term)
+        if positions is not None:
+            return positions
+        matched = [p for token, p in postings.items() if token.startswith(term)]
+        return np.unique(np.concatenate(matched)) if matched else np.array([], dtype=np.int32)
+
+    def _industry_hits(self, terms):
+        """업종/섹터 이름에 모든 단어가 들어 있는 종목 위치"""
+        hits = None
+        for term in terms:
+            positions = self._lookup(self.industry_postings, term)
+            hits = positions if hits is None else np.intersect1d(hits, positions)
+        return hits
+
+    def _filter_mask(self, sectors=None, size=None):
+        """섹터 / 시가총액 범위(십억 달러) 필터"""
+        mask = np.ones(len(self), dtype=bool)
+        if sectors:
+            mask &= np.isin(np.asarray(self.sectors, dtype=object), sectors)
+        if size:
+            caps = self.fields['시가총액'] / 1e9
+            low, high = size
+            with np.errstate(invalid='ignore'):
+                if low is not None:
+                    mask &= caps >= low
+                if high is not None:
+                    mask &= caps < high
+        return mask
+
+    def search(self, criteria=None, sectors=None, size=None, keywords=None, styles=None, limit=20):
+        """조건에 맞는 후보 종목 검색
+
+        섹터와 규모는 필수 조건으로 거르되 맞는 종목이 없으면 규모, 섹터 순으로 조건을 풉니다.
+        수치 조건을 모두 만족하는 종목을 먼저, 그 안에서는 키워드 관련도, 커스텀 전략 점수,
+        투자 성향 기본 전략 점수, 종합 점수 순으로 정렬합니다. 반환값은 (티커 목록, 후보 정보 딕셔너리)입니다.
+        """
+        n = len(self)
+        criteria = criteria or {}
+        keywords = keywords or []
+        styles = styles or []
+
+        relaxed = []
+        mask = self._filter_mask(sectors, size)
+        if size and not mask.any():
+            relaxed.append('규모')
+            mask = self._filter_mask(sectors)
+        if sectors and not mask.any():
+            relaxed.append('섹터')
+            mask = self._filter_mask()
+
+        relevance = self.keyword_scores(keywords)
+        if keywords and (relevance[mask] > 0).any():
+            mask &= relevance > 0
+
+        config = build_strategy_config(criteria)
+        for focus, _ in styles:
+            config['weights'][focus] += 30
+
+        # 수치 조건만으로는 동점이 많으므로 투자 성향(없으면 가장 비중이 큰 성향)의 기본 전략 점수로 구분
+        if styles:
+            scorer = styles[0][1]
+        elif criteria:
+            focus = max(config['weights'], key=config['weights'].get)
+            scorer = next(name for _, f, name in STYLE_WORDS if f == focus)
+        else:
+            scorer = 'comprehensive'
+        base_scores = np.nan_to_num(np.asarray(STRATEGY_SCORERS[scorer](self.fields), dtype='float64'), nan=0.0)
+        overall_scores = np.nan_to_num(np.asarray(STRATEGY_SCORERS['comprehensive'](self.fields), dtype='float64'), nan=0.0)
+
+        if criteria:
+            custom_scores = np.nan_to_num(np.asarray(custom_strategy_score(self.fields, config), dtype='float64'), nan=0.0)
+            passes = custom_criteria_mask(self.fields, config)
+        else:
+            custom_scores = base_scores
+            passes = np.ones(n, dtype=bool)
+
+        candidates = np.flatnonzero(mask)
+        order = np.lexsort((-overall_scores[candidates], -base_scores[candidates], -custom_scores[candidates],
+                            -relevance[candidates], ~passes[candidates]))
+        selected = candidates[order][:limit]
+
+        return list(self.tickers[selected]), {
+            'matched': int(len(candidates)),
+            'passed': int(passes[candidates].sum()),
+            'relaxed': relaxed,
+            'scores': {self.tickers[i]: float(custom_scores[i]) for i in selected},
+            'config': config,
+        }
+
+    def query(self, user_input, limit=20):
+        """자연어 전략으로 후보 종목 선별 (get_suitable_tickers_for_strategy와 같은 형태의 결과)"""
+        query = parse_retrieval_query(user_input)
+        tickers, details = self.search(
+            criteria=query['criteria'],
+            sectors=query['sectors'],
+            size=query['size'],
+            keywords=query['keywords'],
+            styles=query['styles'],
+            limit=limit,
+        )
+
+        conditions = []
+        if query['sectors']:
+            conditions.append(f"섹터 {', '.join(query['sectors'])}")
+        if query['size']:
+            low, high = query['size']
+            if high is None:
+                conditions.append(f"시가총액 ≥ ${low}B")
+            elif low is None:
+                conditions.append(f"시가총액 < ${high}B")
+            else:
+                conditions.append(f"시가총액 ${low}B ~ ${high}B")
+        if query['keywords']:
+            conditions.append(f"키워드 {', '.join(query['keywords'])}")
+        if query['criteria']:
+            conditions.append(details['config']['description'])
+
+        focuses = [FOCUS_LABELS[focus] for focus, _ in query['styles']]
+        if query['criteria']:
+            focuses += [label for focus, label in FOCUS_LABELS.items()
+                        if details['config']['weights'][focus] > 25 and label not in focuses]
+
+        reasoning = f"{len(self)}개 종목 중 {details['matched']}개 후보"
+        if conditions:
+            reasoning += f" ({' · '.join(conditions)})"
+        if details['relaxed']:
+            reasoning += f", 맞는 종목이 없어 {'/'.join(details['relaxed'])} 조건 제외"
+        if query['criteria']:
+            reasoning += f", 수치 조건 충족 {details['passed']}개"
+        reasoning += " → 전략 점수 상위 종목 선별"
+
+        return {
+            'tickers': tickers,
+            'reasoning': reasoning,
+            'strategy_focus': "/".join(focuses) if focuses else "종합",
+            'criteria': query['criteria'],
+            'scores': details['scores'],
+        }
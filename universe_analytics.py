@@ -0,0 +1,302 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import pickle
+import warnings
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+# 연간 거래일 수 (변동성 연율화에 사용)
+TRADING_DAYS = 252
+
+# 벤치마크 종목이 캐시에 없을 때 사용하는 동일가중 시장 평균 이름
+MARKET_AVERAGE = "시장평균"
+
+
+@contextmanager
+def _ignore_nan_warnings():
+    """전부 결측인 열에서 발생하는 numpy 경고 무시"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        yield
+
+
+def build_price_matrix(stock_data, tickers=None, min_coverage=0.8, max_fill_days=5):
+    """캐시된 price_history 종가를 (날짜 x 종목) 밀집 float 행렬로 정렬"""
+    if tickers is None:
+        tickers = sorted(stock_data.keys())
+
+    closes = {}
+    for ticker in tickers:
+        data = stock_data.get(ticker)
+        if not data:
+            continue
+        hist = data.get('price_history')
+        if hist is None or hist.empty or 'Close' not in hist:
+            continue
+
+        close = hist['Close'].astype('float64')
+        index = pd.to_datetime(close.index)
+        # 타임존을 제거하고 날짜 단위로 정규화 (종목 간 정렬 기준 통일)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        close.index = index.normalize()
+        closes[ticker] = close[~close.index.duplicated(keep='last')]
+
+    return align_closes(closes, min_coverage, max_fill_days)
+
+
+def align_closes(closes, min_coverage=0.8, max_fill_days=5):
+    """티커 → 종가 Series(날짜 정규화된 인덱스)를 (날짜 x 종목) 행렬로 정렬"""
+    if not closes:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0))
+
+    frame = pd.DataFrame(closes).sort_index()
+
+    # 거래 정지 등으로 비는 구간은 짧게만 앞 값으로 채움
+    frame = frame.ffill(limit=max_fill_days)
+
+    # 관측치가 부족한 종목은 제외
+    coverage = frame.notna().mean()
+    frame = frame.loc[:, coverage >= min_coverage]
+
+    return frame.index, list(frame.columns), frame.to_numpy(dtype='float64')
+
+
+def compute_returns(closes):
+    """종가 행렬에서 일간 수익률 행렬 계산 (결측은 NaN 유지)"""
+    if closes.shape[0] < 2:
+        return np.empty((0, closes.shape[1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = closes[1:] / closes[:-1] - 1.0
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+
+def annualized_volatility(returns, periods=TRADING_DAYS):
+    """종목별 연율화 변동성 계산"""
+    with _ignore_nan_warnings():
+        return np.nanstd(returns, axis=0, ddof=1) * np.sqrt(periods)
+
+
+def annualized_return(returns, periods=TRADING_DAYS):
+    """종목별 연율화 평균 수익률 계산"""
+    with _ignore_nan_warnings():
+        return np.nanmean(returns, axis=0) * periods
+
+
+def compute_beta(returns, benchmark_returns):
+    """벤치마크 대비 종목별 베타 계산 (결측이 없는 날짜만 사용)"""
+    bench = benchmark_returns.reshape(-1, 1)
+    mask = np.isfinite(returns) & np.isfinite(bench)
+    count = mask.sum(axis=0)
+
+    r = np.where(mask, returns, 0.0)
+    b = np.where(mask, bench, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_mean = r.sum(axis=0) / count
+        b_mean = b.sum(axis=0) / count
+        cov = (np.where(mask, (r - r_mean) * (b - b_mean), 0.0)).sum(axis=0) / (count - 1)
+        var = (np.where(mask, (b - b_mean) ** 2, 0.0)).sum(axis=0) / (count - 1)
+        beta = cov / var
+
+    beta[count < 3] = np.nan
+    return beta
+
+
+def blocked_correlation(returns, block_size=512, out=None, dtype='float32'):
+    """블록 단위 상관계수 행렬 계산 (종목 쌍마다 둘 다 관측된 날짜만 사용)
+
+    block_size 열씩 잘라 곱하므로 작업 메모리는 (일수 x block_size) 수준으로 제한됩니다.
+    결측을 0으로 채우고 전체 일수로 나누면 결측이 많은 종목의 상관계수가 0 쪽으로 줄어들기 때문에,
+    관측 여부 마스크끼리 곱해서 쌍별 공통 관측일 수와 합계를 구해 계산합니다.
+    out에 np.memmap을 넘기면 결과 행렬도 디스크에 기록되어 5,000개 이상 종목에서도 메모리 사용량이 일정하게 유지됩니다.
+    """
+    n_days, n_tickers = returns.shape
+    if out is None:
+        out = np.empty((n_tickers, n_tickers), dtype=dtype)
+
+    # 종목 평균을 빼서 합계 계산 시 자릿수 손실을 줄이고, 결측은 0 + 마스크로 표현
+    mask = np.isfinite(returns)
+    with _ignore_nan_warnings():
+        mean = np.nanmean(returns, axis=0)
+    x = np.where(mask, returns - np.nan_to_num(mean), 0.0)
+    m = mask.astype('float64')
+    xx = x * x
+
+    for start_i in range(0, n_tickers, block_size):
+        stop_i = min(start_i + block_size, n_tickers)
+        x_i, m_i, xx_i = x[:, start_i:stop_i], m[:, start_i:stop_i], xx[:, start_i:stop_i]
+        for start_j in range(start_i, n_tickers, block_size):
+            stop_j = min(start_j + block_size, n_tickers)
+            x_j, m_j, xx_j = x[:, start_j:stop_j], m[:, start_j:stop_j], xx[:, start_j:stop_j]
+            count = m_i.T @ m_j
+            sum_i = x_i.T @ m_j
+            sum_j = m_i.T @ x_j
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cov = x_i.T @ x_j - sum_i * sum_j / count
+                var_i = xx_i.T @ m_j - sum_i ** 2 / count
+                var_j = m_i.T @ xx_j - sum_j ** 2 / count
+                block = cov / np.sqrt(var_i * var_j)
+            # 공통 관측일이 너무 적거나 구간 내 변동이 없으면 정의할 수 없음
+            block[(count < 3) | ~np.isfinite(block)] = np.nan
+            np.clip(block, -1.0, 1.0, out=block)
+            out[start_i:stop_i, start_j:stop_j] = block
+            if start_j != start_i:
+                out[start_j:stop_j, start_i:stop_i] = block.T
+
+    # 변동이 있는 종목의 자기 상관계수는 1
+    idx = np.flatnonzero(np.isfinite(out[np.arange(n_tickers), np.arange(n_tickers)]))
+    out[idx, idx] = 1.0
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+class UniverseAnalytics:
+    """종목 유니버스 전체의 수익률, 변동성, 베타, 상관계수 분석 및 캐시"""
+
+    def __init__(self, cache_dir, block_size=512, memmap_threshold=2000, max_results=4):
+        self.cache_dir = Path(cache_dir)
+        self.block_size = block_size
+        # 이 종목 수 이상이면 상관계수 행렬을 메모리 대신 디스크(memmap)에 기록
+        self.memmap_threshold = memmap_threshold
+        # 데이터 버전마다 키가 바뀌므로 최근 사용한 max_results개 결과만 메모리와 디스크에 보관
+        self.max_results = max_results
+        self._results = OrderedDict()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _result_key(self, tickers, benchmark, data_version):
+        """결과 캐시 키 생성"""
+        raw = f"{','.join(sorted(tickers))}|{benchmark}|{data_version}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+    def compute(self, stock_data, tickers=None, benchmark="SPY", data_version="", prices=None):
+        """유니버스 분석 결과 계산 (메모리 → 디스크 캐시 → 재계산 순)
+
+        prices에 정렬된 (날짜, 종목, 종가 행렬)을 돌려주는 함수를 주면 재계산할 때만 호출해서 stock_data 대신 사용합니다.
+        """
+        if tickers is None:
+            tickers = sorted(stock_data.keys())
+
+        key = self._result_key(tickers, benchmark, data_version)
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+
+        result = self._load(key)
+        if result is None:
+            result = self._compute(stock_data, tickers, benchmark, key, prices)
+            self._save(key, result)
+
+        self._results[key] = result
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        self._prune(key)
+        return result
+
+    def _prune(self, key):
+        """디스크 캐시에서 최근 사용한 max_results개 키만 남기고 정리 (파일 수정 시각 기준)"""
+        try:
+            (self.cache_dir / f"analytics_{key}.pkl").touch()
+            paths = sorted(self.cache_dir.glob("analytics_*.pkl"), key=lambda path: path.stat().st_mtime, reverse=True)
+            keep = {path.stem[len("analytics_"):] for path in paths[:self.max_results]} | set(self._results)
+            for path in paths[self.max_results:]:
+                if path.stem[len("analytics_"):] not in keep:
+                    path.unlink(missing_ok=True)
+            for path in self.cache_dir.glob("corr_*.npy"):
+                if path.stem[len("corr_"):] not in keep:
+                    path.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"유니버스 분석 캐시 정리 실패: {e}")
+
+    def _compute(self, stock_data, tickers, benchmark, key, prices=None):
+        """가격 행렬 정렬부터 상관계수까지 실제 계산"""
+        dates, columns, closes = prices() if prices is not None else build_price_matrix(stock_data, tickers)
+        returns = compute_returns(closes)
+
+        # 벤치마크 수익률 (캐시에 없으면 동일가중 시장 평균으로 대체)
+        if benchmark in columns:
+            bench_returns = returns[:, columns.index(benchmark)]
+            benchmark_name = benchmark
+        else:
+            with _ignore_nan_warnings():
+                bench_returns = np.nanmean(returns, axis=1) if returns.size else np.empty(0)
+            benchmark_name = MARKET_AVERAGE
+
+        total_return = np.full(len(columns), np.nan)
+        if closes.shape[0] >= 2:
+            with _ignore_nan_warnings():
+                first = pd.DataFrame(closes).bfill().to_numpy()[0]
+                last = pd.DataFrame(closes).ffill().to_numpy()[-1]
+                total_return = last / first - 1.0
+
+        metrics = pd.DataFrame({
+            '기간수익률': total_return,
+            '연간수익률': annualized_return(returns),
+            '연간변동성': annualized_volatility(returns),
+            '베타': compute_beta(returns, bench_returns) if returns.size else np.nan,
+        }, index=pd.Index(columns, name='ticker'))
+
+        # 종목 수가 많으면 상관계수 행렬을 디스크에 기록
+        corr_path = None
+        if len(columns) >= self.memmap_threshold:
+            corr_path = self.cache_dir / f"corr_{key}.npy"
+            out = np.lib.format.open_memmap(corr_path, mode='w+', dtype='float32',
+                                            shape=(len(columns), len(columns)))
+            corr = blocked_correlation(returns, self.block_size, out=out)
+            del corr
+            corr = np.load(corr_path, mmap_mode='r')
+        else:
+            corr = blocked_correlation(returns, self.block_size)
+
+        return {
+            'dates': dates,
+            'tickers': columns,
+            'benchmark': benchmark_name,
+            'metrics': metrics,
+            'correlation': corr,
+            'correlation_path': str(corr_path) if corr_path else None,
+        }
+
+    def _load(self, key):
+        """디스크 캐시에서 결과 로드"""
+        path = self.cache_dir / f"analytics_{key}.pkl"
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            if result.get('correlation_path'):
+                result['correlation'] = np.load(result['correlation_path'], mmap_mode='r')
+            return result
+        except Exception as e:
+            print(f"유니버스 분석 캐시 로드 실패: {e}")
+            return None
+
+    def _save(self, key, result):
+        """결과를 디스크 캐시에 저장 (memmap 상관계수는 경로만 저장)"""
+        try:
+            payload = dict(result)
+            if payload.get('correlation_path'):
+                payload['correlation'] = None
+            with open(self.cache_dir / f"analytics_{key}.pkl", 'wb') as f:
+                pickle.dump(payload, f)
+        except Exception as e:
+            print(f"유니버스 분석 캐시 저장 실패: {e}")
+
+    @staticmethod
+    def top_correlated(result, ticker, k=5):
+        """특정 종목과 상관계수가 가장 높은 종목들 반환"""
+        tickers = result['tickers']
+        if ticker not in tickers:
+            return []
+        row = np.asarray(result['correlation'][tickers.index(ticker)], dtype='float64')
+        row = np.where(np.isfinite(row), row, -np.inf)
+        row[tickers.index(ticker)] = -np.inf
+
+        order = np.argsort(row)[::-1][:k]
+        return [(tickers[i], round(float(row[i]), 3)) for i in order if np.isfinite(row[i])]